@@ -0,0 +1,226 @@
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+
+
+# Numbers of requests to time for each content size.
+SIZES = {
+    1024: 50,
+    64 * 1024: 20,
+    1024 * 1024: 5,
+}
+
+# Same, for the sizes only timed if the BENCHMARK_LARGE_SIZES environment
+# variable is set, as they take several minutes.
+LARGE_SIZES = {
+    10 * 1024 * 1024: 2,
+}
+
+LANGUAGES = ['python', None]
+
+LIST_SNIPPETS = 1000
+
+PAGE_SIZE = 100
+
+_LINE = 'def item_{i}(value):\n    return value * {i} + {j}  # item {i}\n'
+
+
+def _source(size):
+    """Return Python-like content of the given size, without any hints of
+    its language but the code itself.
+    """
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        line = _LINE.format(i=i, j=i * 7 % 100)
+        lines.append(line)
+        length += len(line)
+        i += 1
+    return ''.join(lines)[:size]
+
+
+def _setup():
+    """Configure Django with an in-memory database and the app's URLs, and
+    create the tables.
+    """
+    settings.configure(
+        SECRET_KEY=' ',
+        ALLOWED_HOSTS=['testserver'],
+        DATA_UPLOAD_MAX_MEMORY_SIZE=None,
+        ROOT_URLCONF='paste.urls',
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'rest_framework',
+            'paste.apps.PasteConfig',
+        ],
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }},
+        PASTE={'PAGE_SIZE': PAGE_SIZE},
+    )
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+def _consume(response):
+    """Read the whole body of the response, streamed or not."""
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def _percentile(timings, percent):
+    """Return the given percentile of the sorted timings, by nearest rank."""
+    return timings[max(math.ceil(len(timings) * percent / 100) - 1, 0)]
+
+
+def _measure(send, count):
+    """Send `count` requests by calling the function with the index of each
+    one, and return their throughput, latencies, the most queries any of
+    them made and the peak memory one more of them allocates.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    queries = 0
+    for i in range(count):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = _consume(send(i))
+            timings.append(time.perf_counter() - start)
+        assert response.status_code < 300, response.status_code
+        queries = max(queries, len(context.captured_queries))
+
+    tracemalloc.start()
+    _consume(send(count))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'requests': count,
+        'throughput': count / sum(timings),
+        'p50_seconds': statistics.median(timings),
+        'p99_seconds': _percentile(timings, 99),
+        'queries': queries,
+        'peak_bytes': peak,
+    }
+
+
+def _snippet_results(client, size, count, language):
+    """Benchmark creating, retrieving and highlighting snippets of the given
+    size, in the given language or in one to be guessed.
+    """
+    from django.urls import reverse
+
+    content = _source(size)
+    data = {'content': content}
+    if language is not None:
+        data['language'] = language
+    created = []
+
+    def create(i):
+        response = client.post(reverse('snippet-list'), data, format='json')
+        created.append(response.data['id'])
+        return response
+
+    results = {'create': _measure(create, count)}
+    pk = created[0]
+    for name, url in [
+            ('retrieve', reverse('snippet-detail', kwargs={'pk': pk})),
+            ('highlight', reverse('snippet-highlight', kwargs={'pk': pk}))]:
+        results[name] = _measure(lambda i: client.get(url), count)
+    return results
+
+
+def _list_results(client, user):
+    """Benchmark fetching every page of the snippet list and of the user
+    snippet list, with as many snippets as the relative constant indicates.
+    """
+    from django.urls import reverse
+
+    from paste.models import Snippet
+
+    for i in range(LIST_SNIPPETS):
+        Snippet.objects.create(
+            content=_source(1024), title=f'item {i}', language='python',
+            owner=user)
+
+    results = {}
+    for name, url in [
+            ('list', reverse('snippet-list')),
+            ('user', reverse('snippet-user', kwargs={'pk': user.pk}))]:
+        pages = [url]
+
+        def fetch(i):
+            response = client.get(pages[i])
+            if i + 1 == len(pages):
+                pages.append(response.data['next'] or url)
+            return response
+
+        results[name] = _measure(fetch, LIST_SNIPPETS // PAGE_SIZE)
+    return results
+
+
+def main():
+    """Benchmark the snippet API's hot paths through the test client, and
+    print the results as JSON, one entry per operation and case.
+    """
+    _setup()
+
+    from django.contrib.auth import get_user_model
+
+    import rest_framework
+    from rest_framework.test import APIClient
+
+    import pygments
+
+    user = get_user_model().objects.create_user('benchmark')
+    client = APIClient()
+    client.force_authenticate(user)
+
+    sizes = dict(SIZES)
+    if os.environ.get('BENCHMARK_LARGE_SIZES'):
+        sizes.update(LARGE_SIZES)
+
+    results = []
+    for size, count in sizes.items():
+        for language in LANGUAGES:
+            cases = _snippet_results(client, size, count, language)
+            for operation, result in cases.items():
+                results.append({'operation': operation, 'size': size,
+                                'language': language, **result})
+    for operation, result in _list_results(client, user).items():
+        results.append({'operation': operation, 'page_size': PAGE_SIZE,
+                        **result})
+
+    json.dump({
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'djangorestframework': rest_framework.VERSION,
+            'pygments': pygments.__version__,
+        },
+        'results': results,
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import json
+import statistics
+import sys
+import time
+
+import django
+from django.conf import settings
+
+
+REPEAT = 50
+
+SIZES = [1024, 64 * 1024, 1024 * 1024]
+
+_LINE = ('2021-03-{day:02d} 12:{minute:02d}:{second:02d} INFO '
+         '[worker-{worker}] GET /api/items/{item}/ 200 {ms}ms\n')
+
+
+def _log(size):
+    """Return log-like content of about the given size."""
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        line = _LINE.format(
+            day=i % 28 + 1, minute=i % 60, second=i * 7 % 60, worker=i % 8,
+            item=i * 31 % 10007, ms=i * 13 % 500)
+        lines.append(line)
+        length += len(line)
+        i += 1
+    return ''.join(lines)[:size]
+
+
+def _setup():
+    """Configure Django with an in-memory database holding the snippet
+    table.
+    """
+    settings.configure(
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'rest_framework',
+            'paste.apps.PasteConfig',
+        ],
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }},
+    )
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from paste.models import Snippet
+    with connection.schema_editor() as editor:
+        editor.create_model(get_user_model())
+        editor.create_model(Snippet)
+
+
+def _read_seconds(pk):
+    """Return the median seconds reading the content of the snippet with the
+    given primary key takes, from the database.
+    """
+    from paste.models import Snippet
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        Snippet.objects.get(pk=pk).content
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    """Compare the stored size and read latency of log-like content, stored
+    as is and compressed, and print the results as JSON.
+    """
+    _setup()
+
+    from django.db import connection
+
+    from paste import constants, fields
+    from paste.models import Snippet
+
+    results = {'codec': 'zstd' if fields.codec() == fields.ZSTD else 'zlib'}
+    for size in SIZES:
+        content = _log(size)
+        result = {}
+        for name, compress in [('plain', False), ('compressed', True)]:
+            constants.COMPRESS_CONTENT = compress
+            snippet = Snippet.objects.create(content=content, language='text')
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT length(CAST(content AS BLOB)) FROM paste_snippet '
+                    'WHERE id = %s', [snippet.pk])
+                stored_bytes = cursor.fetchone()[0]
+            result[name] = {
+                'stored_bytes': stored_bytes,
+                'read_seconds': _read_seconds(snippet.pk),
+            }
+        result['ratio'] = (
+            result['plain']['stored_bytes']
+            / result['compressed']['stored_bytes'])
+        results[str(size)] = result
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
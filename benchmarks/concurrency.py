@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+import django
+from django.conf import settings
+
+
+HEAVY = 16
+SIZE = 128 * 1024
+
+_LINE = 'def item_{i}(value):\n    return value * {i} + {j}  # item {i}\n'
+
+
+def _source(size):
+    """Return Python-like content of about the given size."""
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        line = _LINE.format(i=i, j=i * 7 % 100)
+        lines.append(line)
+        length += len(line)
+        i += 1
+    return ''.join(lines)
+
+
+def _urls():
+    """Return a URL configuration serving the synchronous views under
+    `sync/` and the asynchronous ones under `async/`.
+    """
+    from django.urls import include, path
+
+    from rest_framework.routers import SimpleRouter
+
+    from paste.async_views import AsyncSnippetViewSet
+    from paste.views import SnippetViewSet
+
+    sync_router = SimpleRouter()
+    sync_router.register('', SnippetViewSet, basename='sync-snippet')
+    async_router = SimpleRouter()
+    async_router.register('', AsyncSnippetViewSet, basename='async-snippet')
+    module = types.ModuleType('urls')
+    module.urlpatterns = [
+        path('sync/', include(sync_router.urls)),
+        path('async/', include(async_router.urls)),
+    ]
+    return module
+
+
+def _setup(directory):
+    """Configure Django with a database in the given directory, shared by
+    the threads requests are handled in, and create the tables.
+    """
+    settings.configure(
+        SECRET_KEY=' ',
+        ALLOWED_HOSTS=['*'],
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'rest_framework',
+            'paste.apps.PasteConfig',
+        ],
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+            },
+        },
+        PASTE={'HIGHLIGHT_CACHE': None, 'PRERENDER': False},
+    )
+    django.setup()
+    settings.ROOT_URLCONF = _urls()
+
+    from django.core.management import call_command
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+async def _get(application, path):
+    """Send a GET request for the path to the ASGI application and return
+    the seconds until its response is complete.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    done = asyncio.Event()
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            assert message['status'] == 200, message['status']
+        elif not message.get('more_body'):
+            done.set()
+
+    start = time.perf_counter()
+    await application(scope, receive, send)
+    return time.perf_counter() - start
+
+
+async def _run(application, prefix, heavy, cheap):
+    """Request the highlighted large snippet a few times at once, and the
+    small snippet once after another until those are done. Return the
+    latencies of the latter and the seconds all requests take.
+    """
+    start = time.perf_counter()
+    loaded = [
+        asyncio.ensure_future(
+            _get(application, f'/{prefix}/{heavy}/highlight/'))
+        for _ in range(HEAVY)]
+    latencies = []
+    while not latencies or not all(task.done() for task in loaded):
+        latencies.append(await _get(application, f'/{prefix}/{cheap}/'))
+    await asyncio.gather(*loaded)
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'cheap_requests': len(latencies),
+        'cheap_p50_seconds': statistics.median(latencies),
+        'cheap_p95_seconds': latencies[int(len(latencies) * 0.95) - 1],
+        'cheap_max_seconds': latencies[-1],
+        'total_seconds': seconds,
+    }
+
+
+def main():
+    """Compare the latency of cheap requests while large snippets get
+    highlighted, under the synchronous and the asynchronous views, and print
+    the results as JSON.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        _setup(directory)
+
+        from django.core.handlers.asgi import ASGIHandler
+
+        from paste.models import Snippet
+
+        heavy = Snippet.objects.create(
+            content=_source(SIZE), language='python').pk
+        cheap = Snippet.objects.create(content='print(1)\n').pk
+        application = ASGIHandler()
+
+        results = {'size': SIZE, 'heavy_requests': HEAVY}
+        for prefix in ['sync', 'async']:
+            results[prefix] = asyncio.run(
+                _run(application, prefix, heavy, cheap))
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
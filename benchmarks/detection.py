@@ -0,0 +1,212 @@
+import json
+import sys
+import time
+
+from pygments.lexers import guess_lexer
+
+from paste.lexers import detect_language, guess_language, lexer_name
+
+
+SIZE = 1024 * 1024
+
+# The filename, the content and the language of each case.
+CORPUS = {
+    'python-shebang': ('', '#!/usr/bin/env python3\nprint(1)\n', 'python'),
+    'bash-shebang': ('', '#!/bin/bash\necho hi\n', 'bash'),
+    'perl-shebang': ('', '#!/usr/bin/perl\nprint "x";\n', 'perl'),
+    'xml': ('', '<?xml version="1.0"?>\n<a>\n', 'xml'),
+    'html': ('', '<!DOCTYPE html>\n<html>\n', 'html'),
+    'vim-modeline': ('', 'x = 1\n# vim: set ft=python:\n', 'python'),
+    'python-filename': (
+        'setup.py', 'from setuptools import setup\n\nsetup(name="x")\n',
+        'python'),
+    'go-filename': ('main.go', 'package main\n\nfunc main() {}\n', 'go'),
+    'css-filename': ('style.css', 'body {\n  margin: 0;\n}\n', 'css'),
+    'make-filename': ('Makefile', 'all:\n\tcc -o x x.c\n', 'make'),
+    'markdown-filename': ('README.md', '# Title\n\nSome *text*.\n',
+                          'markdown'),
+    'sql-filename': ('query.sql', 'SELECT 1;\n', 'sql'),
+    'yaml-filename': ('config.yaml', 'name: x\nitems:\n  - a\n', 'yaml'),
+    'bash-filename': ('deploy.sh', 'set -e\nmake all\n', 'bash'),
+    'java-filename': ('App.java', 'class App {}\n', 'java'),
+    'docker-filename': ('Dockerfile', 'FROM python:3\nRUN pip install x\n',
+                        'docker'),
+    'json-filename': ('data.json', '{"a": [1, 2]}\n', 'json'),
+    'html-filename': ('index.html', '<html>\n<body></body>\n</html>\n',
+                      'html'),
+    'python-keywords': (
+        '',
+        'import os\n\n\nclass Config:\n'
+        '    def __init__(self, path):\n        self.path = path\n'
+        '        self.values = {}\n\n    def load(self):\n'
+        '        with open(self.path) as f:\n            for line in f:\n'
+        '                key, _, value = line.partition("=")\n'
+        '                self.values[key.strip()] = value.strip()\n'
+        '        return self.values\n',
+        'python'),
+    'python-sql-string': (
+        '',
+        'def find_user(cursor, user_id):\n'
+        '    cursor.execute("SELECT name FROM users WHERE id = ?",\n'
+        '                   (user_id,))\n'
+        '    row = cursor.fetchone()\n'
+        '    return row[0] if row else None\n',
+        'python'),
+    'markdown-code-words': (
+        '',
+        '# Notes\n\n'
+        'Use `def` to define a function. Methods take `self` first, and\n'
+        'return `None` unless they return something else.\n\n'
+        '- Keep functions short.\n- Document them.\n',
+        'markdown'),
+    'markdown-prose': (
+        '',
+        'Use def to define a function. Methods take self first, and\n'
+        'return None unless they return something else.\n',
+        'markdown'),
+    'prose-common-words': (
+        '',
+        'Then we went to the end of the road, where my friend had a local\n'
+        'shop. The sub was fine, and then it was time to go home.\n',
+        'text'),
+    'c-keywords': (
+        '',
+        '#include <stdio.h>\n#include <stdlib.h>\n\nint main(void)\n{\n'
+        '    int *values = malloc(10 * sizeof(int));\n'
+        '    if (values == NULL)\n        return 1;\n'
+        '    printf("%d\\n", values[0]);\n    free(values);\n'
+        '    return 0;\n}\n',
+        'c'),
+    'cpp-keywords': (
+        '',
+        '#include <iostream>\n#include <vector>\n\n'
+        'template <typename T>\nT twice(T value)\n{\n'
+        '    return value * 2;\n}\n\nint main()\n{\n'
+        '    std::vector<int> values{1, 2, 3};\n'
+        '    for (auto value : values)\n'
+        '        std::cout << twice(value) << std::endl;\n}\n',
+        'cpp'),
+    'go-keywords': (
+        '',
+        'package main\n\nimport "fmt"\n\nfunc main() {\n'
+        '\tch := make(chan int)\n\tgo func() { ch <- 42 }()\n'
+        '\tdefer close(ch)\n\tfmt.Println(<-ch)\n}\n',
+        'go'),
+    'rust-keywords': (
+        '',
+        'fn main() {\n    let mut values: Vec<usize> = Vec::new();\n'
+        '    values.push(1);\n    let first = values.first().unwrap();\n'
+        '    println!("{}", first);\n}\n',
+        'rust'),
+    'java-keywords': (
+        '',
+        'public class Hello extends Object implements Runnable {\n'
+        '    private boolean done;\n\n    public void run() {\n'
+        '        System.out.println("hello");\n        done = true;\n'
+        '    }\n}\n',
+        'java'),
+    'javascript-keywords': (
+        '',
+        'const path = require("path");\n\nfunction resolve(name) {\n'
+        '    if (typeof name === "undefined") {\n'
+        '        console.log("no name");\n        return null;\n    }\n'
+        '    return path.join(__dirname, name);\n}\n\n'
+        'module.exports = resolve;\n',
+        'javascript'),
+    'ruby-keywords': (
+        '',
+        'class Greeter\n  attr_reader :name\n\n'
+        '  def initialize(name)\n    @name = name\n  end\n\n'
+        '  def greet\n    puts "Hello, #{name}"\n  end\nend\n',
+        'ruby'),
+    'sql-keywords': (
+        '',
+        'CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT);\n'
+        "INSERT INTO users (name) VALUES ('alice');\n"
+        'SELECT u.name FROM users u JOIN orders o ON o.user_id = u.id\n'
+        'WHERE o.total > 100;\n',
+        'sql'),
+    'lua-keywords': (
+        '',
+        'local items = {1, 2, 3}\n\nfor i, v in ipairs(items) do\n'
+        '  if v == 1 then\n    print("one")\n'
+        '  elseif v == 2 then\n    print("two")\n  end\nend\n',
+        'lua'),
+    'perl-keywords': (
+        '',
+        'use strict;\nuse warnings;\n\nmy @names = qw(alice bob);\n'
+        'sub greet {\n    my ($name) = @_;\n'
+        '    print "Hello, $name\\n";\n}\ngreet($_) for @names;\n',
+        'perl'),
+    'bash-keywords': (
+        '',
+        'for f in *.txt; do\n  if [ -s "$f" ]; then\n    echo "$f"\n'
+        '  fi\ndone\n',
+        'bash'),
+    'csharp-keywords': (
+        '',
+        'using System;\n\npublic sealed class Program\n{\n'
+        '    private static readonly int[] Values = {1, 2, 3};\n\n'
+        '    public static void Main()\n    {\n'
+        '        foreach (var value in Values)\n'
+        '            Console.WriteLine(value);\n    }\n}\n',
+        'csharp'),
+}
+
+
+def _measure(function, *args):
+    """Call the function with given arguments, returning its result and the
+    seconds it took.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _share(count, total):
+    """Return the count as a share of the total, rounded for display."""
+    return round(count / total, 3)
+
+
+def main():
+    """Compare detection to Pygments guessing on the corpus, timing both with
+    every content padded to 1 MB, and print the results as JSON, along with
+    the share of contents the languages guessed with detection first agree
+    with Pygments about, and the contents Pygments alone gets right.
+    """
+    cases = {}
+    for name, (filename, content, expected) in CORPUS.items():
+        padding = 'x = 1\n' * ((SIZE - len(content)) // 6)
+        padded = padding + content if 'vim' in name else content + padding
+        detection, detect_seconds = _measure(
+            detect_language, padded, filename)
+        _, guess_seconds = _measure(guess_lexer, padded)
+        cases[name] = {
+            'expected': expected,
+            'detected': detection.language,
+            'language': guess_language(content, filename),
+            'guessed': lexer_name(guess_lexer(content)),
+            'detect_seconds': detect_seconds,
+            'guess_seconds': guess_seconds,
+            'tiers': [tier._asdict() for tier in detection.tiers],
+        }
+    results = {
+        'cases': cases,
+        'agreement': _share(sum(
+            case['language'] == case['guessed'] for case in cases.values()),
+            len(cases)),
+        'accuracy': {
+            key: _share(sum(
+                case[key] == case['expected'] for case in cases.values()),
+                len(cases))
+            for key in ['language', 'guessed']},
+        'regressions': [
+            name for name, case in cases.items()
+            if case['guessed'] == case['expected'] != case['language']],
+    }
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import json
+import sys
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+
+
+SIZE = 10 * 1024 * 1024
+
+_LINE = 'def item_{i}(value):\n    return value * {i} + {j}  # item {i}\n'
+
+
+def _source(size):
+    """Return Python-like content of about the given size."""
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        line = _LINE.format(i=i, j=i * 7 % 100)
+        lines.append(line)
+        length += len(line)
+        i += 1
+    return ''.join(lines)
+
+
+def _setup():
+    """Configure Django, without a database, as rendering needs none."""
+    settings.configure(
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'rest_framework',
+            'paste.apps.PasteConfig',
+        ],
+    )
+    django.setup()
+
+
+def _measure(function):
+    """Return the peak memory in bytes and the seconds calling the function
+    takes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'peak_bytes': peak, 'seconds': seconds}
+
+
+def main():
+    """Compare the peak memory of highlighting a large snippet at once and a
+    chunk at a time, and print the results as JSON.
+    """
+    _setup()
+
+    from paste.models import Snippet
+    from paste.rendering import render, render_chunks
+
+    content = _source(SIZE)
+    snippet = Snippet(
+        content=content, language='python', size=len(content),
+        line_numbers=False)
+
+    def consume():
+        for _ in render_chunks(snippet, False):
+            pass
+
+    results = {
+        'size': len(content),
+        'buffered': _measure(lambda: render(snippet, False)),
+        'streamed': _measure(consume),
+    }
+    results['ratio'] = (
+        results['buffered']['peak_bytes']
+        / results['streamed']['peak_bytes'])
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
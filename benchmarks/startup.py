@@ -0,0 +1,57 @@
+import json
+import statistics
+import subprocess
+import sys
+
+
+REPEAT = 10
+
+BASE_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+]
+
+_SCRIPT = '''
+import time
+
+import django
+from django.conf import settings
+
+settings.configure(INSTALLED_APPS={apps!r})
+start = time.perf_counter()
+django.setup()
+print(time.perf_counter() - start)
+'''
+
+
+def _setup_seconds(apps):
+    """Return the seconds `django.setup()` takes with given installed apps,
+    in a fresh interpreter.
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-c', _SCRIPT.format(apps=apps)])
+    return float(output)
+
+
+def main():
+    """Measure `django.setup()` with and without the app installed and print
+    the results as JSON.
+    """
+    results = {}
+    for name, apps in [('without', BASE_APPS),
+                       ('with', BASE_APPS + ['paste.apps.PasteConfig'])]:
+        timings = [_setup_seconds(apps) for _ in range(REPEAT)]
+        results[name] = {
+            'min_seconds': min(timings),
+            'median_seconds': statistics.median(timings),
+        }
+    results['overhead_seconds'] = (
+        results['with']['median_seconds']
+        - results['without']['median_seconds'])
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
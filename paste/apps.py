@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class PasteConfig(AppConfig):
     name = 'paste'
+
+    def ready(self) -> None:
+        """Connect the signal receivers and warm the lexer and formatter
+        pools up.
+        """
+        from paste import pools, signals  # noqa: F401
+        pools.warm()
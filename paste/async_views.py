@@ -0,0 +1,260 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import (Any, AsyncIterator, Callable, Iterator, List, Optional,
+                    TypeVar, cast)
+
+import django
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections
+from django.db.models import QuerySet
+from django.http import Http404, HttpRequest, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+
+from rest_framework.decorators import action
+from rest_framework.renderers import StaticHTMLRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from asgiref.sync import sync_to_async
+
+from paste import constants, metrics
+from paste.models import Snippet
+from paste.rendering import render_chunks
+from paste.views import SnippetViewSet
+
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:  # asgiref < 3.6
+    def markcoroutinefunction(func: F) -> F:
+        """Mark the function as a coroutine function, the way Django older
+        than 4.2 tells asynchronous views by.
+        """
+        setattr(func, '_is_coroutine',
+                getattr(asyncio.coroutines, '_is_coroutine'))
+        return func
+
+# Whether streamed responses can iterate over their content asynchronously.
+_ASYNC_STREAMING = django.VERSION >= (4, 2)
+
+# Returned by `next` once an iterator is exhausted.
+_END = object()
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> Executor:
+    """Return the executor highlighting runs in, starting it first if needed,
+    with as many threads as the relative setting indicates.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                constants.RENDER_THREADS or None,
+                thread_name_prefix='paste-render')
+        return _executor
+
+
+def set_executor(executor: Optional[Executor]) -> None:
+    """Make highlighting run in the given executor, or in the default one if
+    None, shutting down the previous one.
+    """
+    global _executor
+    with _executor_lock:
+        previous, _executor = _executor, executor
+    if previous is not None and previous is not executor:
+        previous.shutdown(wait=False)
+
+
+def _closing(function: Callable[..., Any], *args) -> Any:
+    """Call the function with the arguments, then close the database
+    connections of the current thread that are unusable or expired, as
+    Django does at the end of every request.
+    """
+    try:
+        return function(*args)
+    finally:
+        close_old_connections()
+
+
+async def offload(function: Callable[..., Any], *args) -> Any:
+    """Call the function with the arguments in the executor, without blocking
+    the event loop, in a copy of the current context.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(), partial(context.run, _closing, function, *args))
+
+
+async def aiterate(iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """Yield the items of the iterator, each one produced in the executor."""
+    while True:
+        item = await offload(next, iterator, _END)
+        if item is _END:
+            return
+        yield item
+
+
+async def aget(queryset: QuerySet, **kwargs) -> Any:
+    """Return the object of the queryset matching the lookup, through the
+    asynchronous ORM where available.
+    """
+    if hasattr(queryset, 'aget'):
+        return await queryset.aget(**kwargs)
+    return await sync_to_async(queryset.get)(**kwargs)
+
+
+async def alist(queryset: QuerySet) -> List[Any]:
+    """Return the objects of the queryset, through the asynchronous ORM where
+    available.
+    """
+    if hasattr(queryset, '__aiter__'):
+        return [obj async for obj in queryset]
+    return await sync_to_async(lambda: list(queryset))()
+
+
+def async_action(**kwargs) -> Callable[[F], F]:
+    """Return the `action` decorator with the given arguments, for a handler
+    that is a coroutine function, which it is typed to reject.
+    """
+    return cast(Callable[[F], F], action(**kwargs))
+
+
+def _load(instance: Snippet) -> None:
+    """Load the snippet's content, from its blob if stored in one, so that
+    highlighting it needs no database queries.
+    """
+    instance.content
+
+
+class AsyncSnippetViewSet(SnippetViewSet):
+    """Snippet-related views, running on the event loop under ASGI. The
+    snippet detail, snippet list and snippet highlight views query the
+    database asynchronously and highlight in the executor. The rest run in a
+    thread, as usual.
+    """
+
+    @classmethod
+    def as_view(cls, actions: Any = None, **initkwargs) -> Callable:
+        """Return the view function, marked as a coroutine function for
+        Django to await it.
+        """
+        return markcoroutinefunction(super().as_view(actions, **initkwargs))
+
+    async def dispatch(self, request: HttpRequest, *args,
+                       **kwargs) -> HttpResponseBase:
+        """Dispatch the request like the synchronous views do, running the
+        authentication, permission and throttling checks in a thread, and
+        awaiting the handler if asynchronous, else running it in a thread.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = (request.method or '').lower()
+            if method in self.http_method_names:
+                handler = getattr(self, method, self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(
+                    request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_checked(self, queryset: QuerySet) -> Snippet:
+        """Return the queried snippet out of the queryset, after checking
+        permissions.
+        """
+        with metrics.stage('fetch'):
+            try:
+                instance = await aget(queryset, **self.get_lookup())
+            except (Snippet.DoesNotExist, TypeError, ValueError,
+                    ValidationError):
+                raise Http404
+            await sync_to_async(self.check_object_permissions)(
+                self.request, instance)
+        metrics.annotate(size=instance.size)
+        return instance
+
+    async def aget_object(self) -> Snippet:
+        """Return the queried snippet, after checking permissions."""
+        return await self.aget_checked(
+            self.filter_queryset(self.get_queryset()))
+
+    async def aevaluate_preconditions(self) -> Optional[HttpResponseBase]:
+        """Evaluate the preconditions of current request, if any, like
+        `evaluate_preconditions` does.
+        """
+        if not self.is_conditional():
+            return None
+        instance = await self.aget_checked(self.get_version_queryset())
+        return self.check_preconditions(instance)
+
+    async def retrieve(self, request: Request, *args,
+                       **kwargs) -> HttpResponseBase:
+        """Return the queried snippet, unless the client's copy is fresh."""
+        response = await self.aevaluate_preconditions()
+        if response is not None:
+            return response
+
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        data = await sync_to_async(lambda: serializer.data)()
+        return self.versioned(Response(data), instance)
+
+    async def list(self, request: Request, *args, **kwargs) -> Response:
+        """Return the snippets current user can view, a page at a time."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            data = await sync_to_async(lambda: serializer.data)()
+            return self.get_paginated_response(data)
+
+        serializer = self.get_serializer(await alist(queryset), many=True)
+        data = await sync_to_async(lambda: serializer.data)()
+        return Response(data)
+
+    @async_action(detail=True, renderer_classes=[StaticHTMLRenderer])
+    async def highlight(self, request: Request, **kwargs) -> HttpResponseBase:
+        """Highlight and return the snippet's content as HTML, like the
+        synchronous view does, in the executor, a chunk at a time if
+        streamed. Where Django cannot stream asynchronously, render it at
+        once instead.
+        """
+        lines = self.get_line_range()
+        response = await self.aevaluate_preconditions()
+        if response is not None:
+            return response
+
+        instance = await self.aget_object()
+        full = 'full' in request.query_params
+        await sync_to_async(_load)(instance)
+        if lines is None and _ASYNC_STREAMING and self.is_streamed(instance):
+            chunks = await offload(
+                render_chunks, instance, full, self.get_namespace())
+            response = StreamingHttpResponse(
+                aiterate(chunks), content_type='text/html; charset=utf-8')
+        else:
+            response = Response(
+                await offload(self.highlighted, instance, full, lines))
+        return self.versioned(response, instance)
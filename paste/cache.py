@@ -0,0 +1,167 @@
+import hashlib
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+
+from pygments.filter import apply_filters
+from pygments.lexer import Lexer
+
+from paste import constants, metrics
+from paste.checkpoints import Checkpoint, Token, loads, preprocess
+from paste.lexers import lexer_name
+from paste.models import Snippet
+from paste.rendering import (get_lexer, get_rendering, get_tokens, render,
+                             render_lines, render_signature)
+from paste.sandbox import lex, line_tokens, take_checkpoints
+from paste.tokens import decode, encode
+
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    """Increase the named counter by one."""
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_cache() -> Optional[BaseCache]:
+    """Return the cache highlighted snippets are stored in, or None if
+    caching is disabled.
+    """
+    alias = constants.HIGHLIGHT_CACHE
+    return caches[alias] if alias else None
+
+
+def cache_key(snippet: Snippet, full: bool, namespace: str = '') -> str:
+    """Return the cache key of the snippet's highlighted content, linking to
+    the stylesheet within the given URL namespace, if so. Snippets with their
+    content stored in the same blob and the same options share it.
+    """
+    signature = render_signature(snippet, full)
+    link = int(constants.LINK_STYLESHEET and not full)
+    source = snippet.blob_id or snippet.pk
+    key = f'paste:highlight:{source}:{signature}:{link}'
+    return f'{key}:{namespace}' if link and namespace else key
+
+
+def highlight(snippet: Snippet, full: bool, namespace: str = '') -> str:
+    """Return the snippet's highlighted content, from the cache if present,
+    else render and store it, linking to the stylesheet within the given URL
+    namespace, if so.
+    """
+    cache = get_cache()
+    if cache is None:
+        return render(snippet, full, namespace=namespace)
+
+    key = cache_key(snippet, full, namespace)
+    with metrics.stage('cache'):
+        html = cache.get(key)
+    if html is not None:
+        _count('hits')
+        return html
+
+    _count('misses')
+    html = render(snippet, full, stream_tokens(snippet), namespace)
+    with metrics.stage('cache'):
+        cache.set(key, html, constants.HIGHLIGHT_CACHE_TIMEOUT)
+    return html
+
+
+def stream_tokens(snippet: Snippet) -> Iterator[Token]:
+    """Yield the tokens of the snippet's content, decoded from the cache if
+    present, else lexed, storing them. They are stored by the digest of the
+    content and the name of the lexer, so that they are shared by the
+    snippets having the same content, whatever their formatting options.
+    """
+    cache = get_cache()
+    if cache is None:
+        yield from get_tokens(snippet)
+        return
+
+    lexer = get_lexer(snippet)
+    content = snippet.content
+    text = preprocess(lexer, content)
+    digest = snippet.blob_id or hashlib.sha256(content.encode()).hexdigest()
+    key = f'paste:tokens:{digest}:{lexer_name(lexer)}'
+    with metrics.stage('cache'):
+        data = cache.get(key)
+    if data is not None:
+        yield from decode(data, text)
+        return
+
+    tokens = list(apply_filters(
+        metrics.timed('lex', lex(lexer, text)), lexer.filters, lexer))
+    data = encode(tokens, text)
+    if data is not None:
+        with metrics.stage('cache'):
+            cache.set(key, data, constants.HIGHLIGHT_CACHE_TIMEOUT)
+    yield from tokens
+
+
+def get_checkpoints(snippet: Snippet, lexer: Lexer,
+                    text: str) -> List[Checkpoint]:
+    """Return the lexer checkpoints of the snippet's preprocessed content,
+    from its stored rendering if prerendering is enabled, else from the cache
+    if present, else take and store them.
+    """
+    if constants.PRERENDER:
+        rendering = get_rendering(snippet)
+        if rendering is not None and rendering.checkpoints:
+            return loads(rendering.checkpoints)
+
+    cache = get_cache()
+    interval = constants.CHECKPOINT_INTERVAL
+    if cache is None:
+        with metrics.stage('lex'):
+            return take_checkpoints(lexer, text, interval)
+
+    digest = snippet.blob_id or hashlib.sha256(text.encode()).hexdigest()
+    key = f'paste:checkpoints:{digest}:{lexer_name(lexer)}:{interval}'
+    with metrics.stage('cache'):
+        checkpoints = cache.get(key)
+    if checkpoints is None:
+        with metrics.stage('lex'):
+            checkpoints = take_checkpoints(lexer, text, interval)
+        with metrics.stage('cache'):
+            cache.set(key, checkpoints, constants.HIGHLIGHT_CACHE_TIMEOUT)
+    return checkpoints
+
+
+def highlight_lines(snippet: Snippet, full: bool, first: int, last: int,
+                    namespace: str = '') -> str:
+    """Return lines `first` through `last` of the snippet's highlighted
+    content, lexed from the last checkpoint before them, linking to the
+    stylesheet within the given URL namespace, if so.
+    """
+    lexer = get_lexer(snippet)
+    text = preprocess(lexer, snippet.content)
+    checkpoints = get_checkpoints(snippet, lexer, text)
+    tokens = metrics.timed(
+        'lex', line_tokens(lexer, text, checkpoints, first, last))
+    return render_lines(snippet, full, tokens, first, namespace)
+
+
+def invalidate(snippet: Snippet) -> None:
+    """Remove the snippet's highlighted content from the cache, unless it is
+    shared with other snippets.
+    """
+    cache = get_cache()
+    if cache is not None and snippet.blob_id is None:
+        cache.delete_many([cache_key(snippet, full) for full in (False, True)])
+
+
+def cache_stats() -> Dict[str, int]:
+    """Return the number of cache hits and misses so far."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats() -> None:
+    """Set the cache hit and miss counters to zero."""
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,194 @@
+import bisect
+import json
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+from pygments.filter import apply_filters
+from pygments.lexer import Lexer, RegexLexer
+from pygments.token import Error, _TokenType
+
+
+Token = Tuple[Any, str]
+
+
+class Checkpoint(NamedTuple):
+    """The state of a lexer at the beginning of a line of its input."""
+
+    line: int
+    offset: int
+    stack: Tuple[str, ...]
+
+
+START = Checkpoint(1, 0, ('root',))
+
+
+class _Unmatched(RegexLexer):
+    """A lexer with no rules, matching nothing."""
+
+    tokens: Dict[str, List[Any]] = {'root': []}
+
+
+# The token regular expression lexers yield for a newline no rule matches,
+# which depends on the version of Pygments.
+_NEWLINE = next(_Unmatched().get_tokens_unprocessed('\n'))[1]
+
+
+def preprocess(lexer: Lexer, text: str) -> str:
+    """Return the text as the lexer would process it, with newlines
+    normalized, tabs expanded and so on, so that lines are numbered as when
+    the whole of it is highlighted.
+    """
+    preprocess_input = getattr(lexer, '_preprocess_lexer_input', None)
+    if preprocess_input is not None:
+        return preprocess_input(text)
+
+    if text.startswith('\ufeff'):
+        text = text[1:]
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if lexer.stripall:
+        text = text.strip()
+    elif lexer.stripnl:
+        text = text.strip('\n')
+    if lexer.tabsize > 0:
+        text = text.expandtabs(lexer.tabsize)
+    if lexer.ensurenl and not text.endswith('\n'):
+        text += '\n'
+    return text
+
+
+def resumable(lexer: Lexer) -> bool:
+    """Return whether the lexer can resume lexing from a checkpoint. Only
+    regular expression lexers relying on the plain state machine can, as
+    their state is their stack of states alone.
+    """
+    return isinstance(lexer, RegexLexer) and (
+        type(lexer).get_tokens_unprocessed
+        is RegexLexer.get_tokens_unprocessed)
+
+
+def checkpointed_tokens(lexer: Lexer, text: str, interval: int,
+                        checkpoints: List[Checkpoint]) -> Iterator[Token]:
+    """Yield the tokens of the preprocessed text, like the lexer would,
+    appending to the given list a checkpoint at the first line boundary
+    reached every `interval` lines, beginning with the start of the text.
+    Lexers unable to resume from a checkpoint get just the first one, and
+    are left to lex the text themselves.
+    """
+    checkpoints.append(START)
+    if not resumable(lexer) or interval <= 0:
+        for _, token, value in lexer.get_tokens_unprocessed(text):
+            yield token, value
+        return
+
+    # Same as RegexLexer.get_tokens_unprocessed, keeping track of the line
+    # and the stack of states at the boundaries between tokens.
+    pos = 0
+    line = 1
+    target = 1 + interval
+    tokendefs = lexer._tokens
+    statestack = ['root']
+    statetokens = tokendefs['root']
+    while True:
+        start = pos
+        for rexmatch, action, new_state in statetokens:
+            m = rexmatch(text, pos)
+            if m:
+                if action is not None:
+                    if type(action) is _TokenType:
+                        yield action, m.group()
+                    else:
+                        for _, token, value in action(lexer, m):
+                            yield token, value
+                pos = m.end()
+                if new_state is not None:
+                    if isinstance(new_state, tuple):
+                        for state in new_state:
+                            if state == '#pop':
+                                if len(statestack) > 1:
+                                    statestack.pop()
+                            elif state == '#push':
+                                statestack.append(statestack[-1])
+                            else:
+                                statestack.append(state)
+                    elif isinstance(new_state, int):
+                        if abs(new_state) >= len(statestack):
+                            del statestack[1:]
+                        else:
+                            del statestack[new_state:]
+                    elif new_state == '#push':
+                        statestack.append(statestack[-1])
+                    statetokens = tokendefs[statestack[-1]]
+                break
+        else:
+            if pos >= len(text):
+                return
+            if text[pos] == '\n':
+                statestack = ['root']
+                statetokens = tokendefs['root']
+                yield _NEWLINE, '\n'
+            else:
+                yield Error, text[pos]
+            pos += 1
+
+        line += text.count('\n', start, pos)
+        if line >= target and text[pos - 1:pos] == '\n' and pos < len(text):
+            checkpoints.append(Checkpoint(line, pos, tuple(statestack)))
+            target = line + interval
+
+
+def dumps(checkpoints: List[Checkpoint]) -> str:
+    """Return the checkpoints as JSON, to be stored."""
+    return json.dumps(checkpoints, separators=(',', ':'))
+
+
+def loads(data: str) -> List[Checkpoint]:
+    """Return the checkpoints stored as JSON."""
+    return [Checkpoint(line, offset, tuple(stack))
+            for line, offset, stack in json.loads(data)]
+
+
+def take_checkpoints(lexer: Lexer, text: str,
+                     interval: int) -> List[Checkpoint]:
+    """Lex the whole of the preprocessed text and return the checkpoints
+    taken every `interval` lines.
+    """
+    checkpoints: List[Checkpoint] = []
+    for _ in checkpointed_tokens(lexer, text, interval, checkpoints):
+        pass
+    return checkpoints
+
+
+def line_tokens(lexer: Lexer, text: str, checkpoints: List[Checkpoint],
+                first: int, last: int) -> Iterator[Token]:
+    """Yield the filtered tokens of lines `first` through `last` of the
+    preprocessed text, lexing it from the last checkpoint before them.
+    """
+    index = bisect.bisect_right([point.line for point in checkpoints], first)
+    checkpoint = checkpoints[index - 1] if index else START
+    if checkpoint.offset and resumable(lexer):
+        source = lexer.get_tokens_unprocessed(
+            text[checkpoint.offset:], stack=checkpoint.stack)
+    else:
+        checkpoint = START
+        source = lexer.get_tokens_unprocessed(text)
+
+    def tokens() -> Iterator[Token]:
+        line = checkpoint.line
+        for _, token, value in source:
+            if line > last:
+                return
+            end = line + value.count('\n')
+            if end < first:
+                line = end
+                continue
+            if line >= first and end <= last:
+                yield token, value
+            else:
+                for number, part in enumerate(value.split('\n'), line):
+                    if number > last:
+                        break
+                    piece = part if number == end else part + '\n'
+                    if number >= first and piece:
+                        yield token, piece
+            line = end
+
+    return apply_filters(tokens(), lexer.filters, lexer)
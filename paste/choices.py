@@ -0,0 +1,66 @@
+from functools import lru_cache
+from typing import Callable, FrozenSet, Iterator, List, Tuple
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+from pygments.lexers import get_all_lexers
+from pygments.styles import get_all_styles
+
+
+Choices = List[Tuple[str, str]]
+
+
+@lru_cache(maxsize=None)
+def language_choices() -> Choices:
+    """Return the names and the display names of all the Pygments lexers."""
+    return sorted(
+        (item[1][0], item[0]) for item in get_all_lexers() if item[1])
+
+
+@lru_cache(maxsize=None)
+def style_choices() -> Choices:
+    """Return the names of all the Pygments styles."""
+    return sorted((item, item) for item in get_all_styles())
+
+
+@lru_cache(maxsize=None)
+def language_names() -> FrozenSet[str]:
+    """Return the names of all the Pygments lexers."""
+    return frozenset(name for name, _ in language_choices())
+
+
+@lru_cache(maxsize=None)
+def style_names() -> FrozenSet[str]:
+    """Return the names of all the Pygments styles."""
+    return frozenset(name for name, _ in style_choices())
+
+
+def _validate_choice(value: str, names: FrozenSet[str]) -> None:
+    """Raise a validation error unless the value is one of the names."""
+    if value not in names:
+        raise ValidationError(
+            _('Value %(value)r is not a valid choice.'),
+            code='invalid_choice', params={'value': value})
+
+
+def validate_language(value: str) -> None:
+    """Raise a validation error unless the value is the name of a lexer."""
+    _validate_choice(value, language_names())
+
+
+def validate_style(value: str) -> None:
+    """Raise a validation error unless the value is the name of a style."""
+    _validate_choice(value, style_names())
+
+
+class LazyChoices:
+    """Choices returned by the given function, which is only called when they
+    are first needed.
+    """
+
+    def __init__(self, function: Callable[[], Choices]) -> None:
+        self.function = function
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.function())
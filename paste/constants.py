@@ -1,9 +1,10 @@
-from typing import TypeVar
+from typing import Dict, List, Optional, TypeVar
 
 from django.conf import settings
 
 
-T = TypeVar('T', bool, int, str)
+T = TypeVar('T', bool, int, str, Optional[str], List[str], List[float],
+            Dict[str, Optional[str]])
 
 
 def _setting(name: str, default: T) -> T:
@@ -15,6 +16,16 @@ def _setting(name: str, default: T) -> T:
     return settings_dict.get(name, default)
 
 
+ASYNC_VIEWS: bool = _setting('ASYNC_VIEWS', False)
+
+CHECKPOINT_INTERVAL: int = _setting('CHECKPOINT_INTERVAL', 1000)
+
+COMPRESS_CONTENT: bool = _setting('COMPRESS_CONTENT', False)
+
+COMPRESS_THRESHOLD: int = _setting('COMPRESS_THRESHOLD', 1024)
+
+DEDUPLICATE_CONTENT: bool = _setting('DEDUPLICATE_CONTENT', False)
+
 DEFAULT_EMBED_TITLE: bool = _setting('DEFAULT_EMBED_TITLE', True)
 
 DEFAULT_LANGUAGE: str = _setting('DEFAULT_LANGUAGE', 'text')
@@ -35,6 +46,69 @@ FORBID_LIST: bool = _setting('FORBID_LIST', False)
 
 GUESS_LEXER: bool = _setting('GUESS_LEXER', True)
 
+HIGHLIGHT_CACHE: Optional[str] = _setting('HIGHLIGHT_CACHE', None)
+
+HIGHLIGHT_CACHE_TIMEOUT: int = _setting('HIGHLIGHT_CACHE_TIMEOUT', 3600)
+
+HIGHLIGHT_MAX_LINES: int = _setting('HIGHLIGHT_MAX_LINES', 0)
+
+HIGHLIGHT_MAX_SIZE: int = _setting('HIGHLIGHT_MAX_SIZE', 0)
+
+LINK_STYLESHEET: bool = _setting('LINK_STYLESHEET', False)
+
 LIST_FOREIGN: bool = _setting('LIST_FOREIGN', True)
 
+MAX_BATCH_SIZE: int = _setting('MAX_BATCH_SIZE', 500)
+
+METRICS: bool = _setting('METRICS', False)
+
+METRICS_BUCKETS: List[float] = _setting(
+    'METRICS_BUCKETS',
+    [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0])
+
+PAGE_SIZE: int = _setting('PAGE_SIZE', 100)
+
+POOL_SIZE: int = _setting('POOL_SIZE', 128)
+
+PRERENDER: bool = _setting('PRERENDER', False)
+
+PREVIEW_LENGTH: int = _setting('PREVIEW_LENGTH', 200)
+
+RENDER_THREADS: int = _setting('RENDER_THREADS', 4)
+
+SANDBOX: bool = _setting('SANDBOX', False)
+
+SANDBOX_MAX_JOBS: int = _setting('SANDBOX_MAX_JOBS', 100)
+
+SANDBOX_MEMORY: int = _setting('SANDBOX_MEMORY', 1073741824)
+
+SANDBOX_TIMEOUT: int = _setting('SANDBOX_TIMEOUT', 10)
+
+SANDBOX_WORKERS: int = _setting('SANDBOX_WORKERS', 2)
+
+SEARCH_CONFIG: str = _setting('SEARCH_CONFIG', 'simple')
+
+SEARCH_CONTENT_LENGTH: int = _setting('SEARCH_CONTENT_LENGTH', 262144)
+
+SEARCH_INDEX: bool = _setting('SEARCH_INDEX', True)
+
+STREAMING_THRESHOLD: int = _setting('STREAMING_THRESHOLD', 1048576)
+
+STYLESHEET_MAX_AGE: int = _setting('STYLESHEET_MAX_AGE', 2592000)
+
+THROTTLE_CACHE: str = _setting('THROTTLE_CACHE', 'default')
+
+THROTTLE_RATES: Dict[str, Optional[str]] = _setting('THROTTLE_RATES', {
+    'anon_create': None,
+    'anon_highlight': None,
+    'user_create': None,
+    'user_highlight': None,
+})
+
+THROTTLE_UNIT: int = _setting('THROTTLE_UNIT', 65536)
+
 TITLE_MAX_LENGTH: int = _setting('TITLE_MAX_LENGTH', 100)
+
+WARM_LANGUAGES: List[str] = _setting('WARM_LANGUAGES', [])
+
+WARM_STYLES: List[str] = _setting('WARM_STYLES', [])
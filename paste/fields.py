@@ -0,0 +1,178 @@
+import base64
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, Tuple, Type
+
+from django.db import models
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+from paste import constants
+
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+# Stored values beginning with the marker are followed by a character telling
+# how the rest is encoded: compressed by zlib or zstd and then in base64, or
+# as is, for content that begins with the marker itself.
+MARKER = '\x02'
+ZLIB = 'z'
+ZSTD = 's'
+RAW = 'r'
+
+
+class LazyContent(ABC):
+    """Content as read from the database, to be resolved when needed."""
+
+    __slots__: List[str] = []
+
+    def __str__(self) -> str:
+        return self.resolve()
+
+    @property
+    @abstractmethod
+    def stored(self) -> str:
+        """Return the content as to be stored back."""
+
+    @abstractmethod
+    def resolve(self) -> str:
+        """Return the content."""
+
+
+class Compressed(str):
+    """Content decompressed as read from the database, remembering the form
+    it was stored in, so that it gets stored back as such unless changed.
+    Being the content itself, it can be read as such out of querysets of
+    values too.
+    """
+
+    data: str
+
+    def __new__(cls, data: str) -> 'Compressed':
+        instance = super().__new__(cls, decompress(data))
+        instance.data = data
+        return instance
+
+    def __getnewargs__(self) -> Tuple[str]:
+        return (self.data,)
+
+
+def decompress(data: str) -> str:
+    """Return the content stored compressed as the given data."""
+    codec, payload = data[1], base64.b64decode(data[2:])
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError(
+                'zstandard is required to read content compressed by it')
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raw = zlib.decompress(payload)
+    return raw.decode()
+
+
+def codec() -> str:
+    """Return the codec content gets compressed by: zstd if available, else
+    zlib.
+    """
+    return ZLIB if zstandard is None else ZSTD
+
+
+def compress(content: str) -> str:
+    """Return the content as to be stored. If the relative setting allows so,
+    and it is long enough, compress it, unless that does not save space.
+    """
+    if constants.COMPRESS_CONTENT and (
+            len(content) >= constants.COMPRESS_THRESHOLD):
+        raw = content.encode()
+        name = codec()
+        if name == ZSTD:
+            payload = zstandard.ZstdCompressor().compress(raw)
+        else:
+            payload = zlib.compress(raw)
+        data = f'{MARKER}{name}{base64.b64encode(payload).decode()}'
+        if len(data) < len(content):
+            return data
+    if content.startswith(MARKER):
+        return f'{MARKER}{RAW}{content}'
+    return content
+
+
+def text(value: Any) -> Any:
+    """Return the given content, resolved if needed."""
+    return value.resolve() if isinstance(value, LazyContent) else value
+
+
+class ContentDescriptor:
+    """Access to the content of model instances, resolving it the first time
+    it is read, and loading it first if deferred. Content read is no longer
+    stored back as it was read, but as the relative settings call for.
+    """
+
+    def __init__(self, field: models.Field) -> None:
+        self.field = field
+
+    def __get__(self, instance: Optional[models.Model],
+                cls: Optional[Type[models.Model]] = None) -> Any:
+        if instance is None:
+            return self
+        data = instance.__dict__
+        name = self.field.attname
+        if name not in data:
+            instance.refresh_from_db(fields=[name])
+        value = data[name]
+        if isinstance(value, LazyContent):
+            value = data[name] = value.resolve()
+        elif isinstance(value, Compressed):
+            value = data[name] = str(value)
+        return value
+
+    def __set__(self, instance: models.Model, value: Any) -> None:
+        instance.__dict__[self.field.attname] = value
+
+
+class ContentField(models.TextField):
+    """Text field storing its content compressed, if long enough and the
+    relative setting allows so. Content is read from the database
+    decompressed, by every query, and stored back as it was read unless
+    accessed through a model instance.
+    """
+
+    def contribute_to_class(
+            self, cls: Type[models.Model], name: str, *args, **kwargs) -> None:
+        """Add the field to the model, accessed through its descriptor."""
+        super().contribute_to_class(cls, name, *args, **kwargs)
+        setattr(cls, self.attname, ContentDescriptor(self))
+
+    def from_db_value(self, value: Optional[str], expression: Any,
+                      connection: BaseDatabaseWrapper) -> Any:
+        """Return the content, decompressed if stored compressed, remembering
+        the form it was stored in.
+        """
+        if value is None or not value.startswith(MARKER):
+            return value
+        if value[1] == RAW:
+            return value[2:]
+        return Compressed(value)
+
+    def to_python(self, value: Any) -> Any:
+        """Return the content, resolved if needed."""
+        return super().to_python(text(value))
+
+    def pre_save(self, model_instance: models.Model, add: bool) -> Any:
+        """Return the instance's content, without resolving it."""
+        return model_instance.__dict__[self.attname]
+
+    def get_db_prep_save(
+            self, value: Any, connection: BaseDatabaseWrapper) -> Any:
+        """Return the content as to be stored. Content that was never
+        resolved is stored as it was read.
+        """
+        if isinstance(value, Compressed):
+            return value.data
+        if isinstance(value, LazyContent):
+            return value.stored
+        value = super().get_db_prep_save(value, connection)
+        return value if value is None else compress(value)
@@ -0,0 +1,266 @@
+import logging
+import re
+import time
+from collections import Counter
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from pygments.lexer import Lexer
+from pygments.lexers import (get_lexer_by_name, get_lexer_for_filename,
+                             guess_lexer)
+from pygments.modeline import get_filetype_from_buffer
+from pygments.util import ClassNotFound
+
+
+logger = logging.getLogger(__name__)
+
+# Characters of the beginning and the end of the content the detection tiers
+# look at, so that their cost does not depend on the content size.
+_EXCERPT_SIZE = 4096
+
+_SHEBANG_RE = re.compile(r'#!\s*(\S+)(?:\s+(\S+))?')
+
+_EMACS_RE = re.compile(r'-\*-(.+?)-\*-')
+
+_INTERPRETERS = {
+    'awk': 'awk',
+    'bash': 'bash',
+    'dash': 'bash',
+    'gawk': 'awk',
+    'ksh': 'bash',
+    'lua': 'lua',
+    'node': 'javascript',
+    'nodejs': 'javascript',
+    'perl': 'perl',
+    'php': 'php',
+    'pwsh': 'powershell',
+    'python': 'python',
+    'pythonw': 'python',
+    'ruby': 'ruby',
+    'sh': 'bash',
+    'tclsh': 'tcl',
+    'zsh': 'bash',
+}
+
+# Characters of the beginning of the content Pygments guesses the language
+# from, when no detection tier is confident, so that guessing does not scan
+# large content as a whole.
+_GUESS_SIZE = 16384
+
+_SIGNATURES = [
+    (re.compile(r'<\?php\b'), 'php'),
+    (re.compile(r'<\?xml\s'), 'xml'),
+    (re.compile(r'<!doctype\s+html[\s>]', re.IGNORECASE), 'html'),
+    (re.compile(r'diff --git '), 'diff'),
+    (re.compile(r'Index: .*\n=+\n'), 'diff'),
+]
+
+
+# Keywords and identifiers distinctive of each language, each one listed for
+# a single language.
+_KEYWORDS = {
+    'bash': ['echo', 'esac', 'fi'],
+    'c': ['NULL', 'free', 'malloc', 'printf', 'sizeof', 'stdio', 'stdlib',
+          'typedef'],
+    'cpp': ['cout', 'endl', 'iostream', 'nullptr', 'std', 'typename'],
+    'csharp': ['Console', 'WriteLine', 'foreach', 'readonly', 'sealed'],
+    'go': ['Println', 'chan', 'fmt', 'func'],
+    'java': ['boolean', 'extends', 'implements', 'println', 'throws'],
+    'javascript': ['console', 'exports', 'prototype', 'typeof', 'undefined'],
+    'lua': ['elseif', 'ipairs', 'pairs'],
+    'perl': ['chomp', 'qw'],
+    'python': ['None', '__init__', '__name__', 'def', 'elif', 'lambda',
+               'self'],
+    'ruby': ['attr_accessor', 'attr_reader', 'elsif', 'puts'],
+    'rust': ['Vec', 'crate', 'impl', 'mut', 'unwrap', 'usize'],
+    'sql': ['CREATE', 'FROM', 'INSERT', 'JOIN', 'SELECT', 'TABLE', 'VALUES',
+            'WHERE'],
+}
+
+# Keywords of each language that are common words too, so that they only
+# count where they begin a statement, as they do in code but seldom in prose.
+_STATEMENT_KEYWORDS = {
+    'bash': ['done', 'then'],
+    'cpp': ['template'],
+    'go': ['defer'],
+    'java': ['System'],
+    'lua': ['local'],
+    'perl': ['my', 'sub'],
+    'ruby': ['end'],
+    'rust': ['fn'],
+}
+
+_KEYWORD_INDEX = {
+    keyword: language
+    for language, keywords in _KEYWORDS.items() for keyword in keywords}
+
+_STATEMENT_KEYWORD_INDEX = {
+    keyword: language
+    for language, keywords in _STATEMENT_KEYWORDS.items()
+    for keyword in keywords}
+
+# String literals and comments, whose words tell nothing of the language
+# around them. Hashes that start preprocessor directives, shebangs, Rust
+# attributes and Ruby interpolations are no comments.
+_NOISE_RE = re.compile(r'''
+    """.*?""" | \'\'\'.*?\'\'\'
+    | "(?:[^"\\\n]|\\.)*" | '(?:[^'\\\n]|\\.)*' | `[^`\n]*`
+    | /\*.*?\*/ | //[^\n]* | \#(?![!\w\[{])[^\n]* | --[ \t][^\n]*
+''', re.DOTALL | re.VERBOSE)
+
+_WORD_RE = re.compile(r'[A-Za-z_]\w*')
+
+_STATEMENT_RE = re.compile(r'(?:^|;)[ \t]*([A-Za-z_]\w*)', re.MULTILINE)
+
+# Punctuation of code, lines of several words without which are taken for
+# prose.
+_PUNCTUATION_RE = re.compile(r'[$(){}\[\];:=<>@]')
+_PROSE_MIN_WORDS = 4
+
+# The least number of keywords of a language to be confident about it, and
+# the least factor its count has to exceed that of any other language by.
+_KEYWORD_MIN_COUNT = 3
+_KEYWORD_MIN_RATIO = 2
+
+
+class Tier(NamedTuple):
+    """The outcome of a language detection tier."""
+
+    name: str
+    language: Optional[str]
+    seconds: float
+
+
+class Detection(NamedTuple):
+    """The outcome of language detection, along with that of each tier tried.
+    """
+
+    language: Optional[str]
+    tiers: List[Tier]
+
+
+def lexer_name(lexer: Lexer) -> str:
+    """Return the name the lexer can be looked up by."""
+    return lexer.aliases[0] if lexer.aliases else lexer.name
+
+
+def _canonical(name: str) -> Optional[str]:
+    """Return the name of the lexer the given name refers to, if any."""
+    try:
+        return lexer_name(get_lexer_by_name(name))
+    except ClassNotFound:
+        return None
+
+
+def _from_filename(head: str, tail: str, filename: str) -> Optional[str]:
+    """Detect language by the extension or the pattern of the filename."""
+    if not filename:
+        return None
+    try:
+        return lexer_name(get_lexer_for_filename(filename, code=head))
+    except ClassNotFound:
+        return None
+
+
+def _from_shebang(head: str, tail: str, filename: str) -> Optional[str]:
+    """Detect language by the interpreter in the shebang line."""
+    match = _SHEBANG_RE.match(head)
+    if match is None:
+        return None
+    interpreter, argument = match.groups()
+    name = interpreter.rsplit('/', 1)[-1]
+    if name == 'env' and argument:
+        name = argument
+    return _INTERPRETERS.get(name.rstrip('0123456789.'))
+
+
+def _from_modeline(head: str, tail: str, filename: str) -> Optional[str]:
+    """Detect language by an Emacs modeline in the first two lines or a Vim
+    modeline in the first six or the last five lines.
+    """
+    head_lines = head.splitlines()
+    for line in head_lines[:2]:
+        match = _EMACS_RE.search(line)
+        if match is not None:
+            mode = match.group(1).strip()
+            for variable in mode.split(';'):
+                key, _, value = variable.rpartition(':')
+                if key.strip().lower() in ['', 'mode']:
+                    language = _canonical(value.strip().lower())
+                    if language is not None:
+                        return language
+
+    excerpt = '\n'.join(head_lines[:6] + tail.splitlines()[-5:])
+    filetype = get_filetype_from_buffer(excerpt)
+    return _canonical(filetype) if filetype else None
+
+
+def _from_signature(head: str, tail: str, filename: str) -> Optional[str]:
+    """Detect language by a distinctive signature at the beginning."""
+    start = head.lstrip()
+    for pattern, language in _SIGNATURES:
+        if pattern.match(start):
+            return language
+    return None
+
+
+def _from_keywords(head: str, tail: str, filename: str) -> Optional[str]:
+    """Detect language by the number of its distinctive keywords in the code
+    at the beginning, string literals, comments and prose aside, if it
+    clearly outnumbers that of any other language.
+    """
+    code = '\n'.join(
+        line for line in _NOISE_RE.sub(' ', head).splitlines()
+        if _PUNCTUATION_RE.search(line)
+        or len(_WORD_RE.findall(line)) < _PROSE_MIN_WORDS)
+    counts: Counter = Counter()
+    for word in _WORD_RE.findall(code):
+        language = _KEYWORD_INDEX.get(word)
+        if language is not None:
+            counts[language] += 1
+    for word in _STATEMENT_RE.findall(code):
+        language = _STATEMENT_KEYWORD_INDEX.get(word)
+        if language is not None:
+            counts[language] += 1
+    ranking = counts.most_common(2) + [('', 0)] * 2
+    (language, count), (_, runner_up) = ranking[:2]
+    if (count >= _KEYWORD_MIN_COUNT
+            and count >= _KEYWORD_MIN_RATIO * runner_up):
+        return language
+    return None
+
+
+TIERS: List[Tuple[str, Callable[[str, str, str], Optional[str]]]] = [
+    ('filename', _from_filename),
+    ('shebang', _from_shebang),
+    ('modeline', _from_modeline),
+    ('signature', _from_signature),
+    ('keywords', _from_keywords),
+]
+
+
+def detect_language(content: str, filename: str = '') -> Detection:
+    """Try the cheap language detection tiers in turn, on the excerpts of the
+    content, until one of them is confident about the language.
+    """
+    head = content[:_EXCERPT_SIZE]
+    tail = content[-_EXCERPT_SIZE:]
+    tiers = []
+    for name, detect in TIERS:
+        start = time.perf_counter()
+        language = detect(head, tail, filename)
+        tiers.append(Tier(name, language, time.perf_counter() - start))
+        if language is not None:
+            break
+    return Detection(language, tiers)
+
+
+def guess_language(content: str, filename: str = '') -> str:
+    """Return the name of the lexer for the content, as detected by the cheap
+    detection tiers, or else as guessed by Pygments from its beginning.
+    """
+    detection = detect_language(content, filename)
+    for tier in detection.tiers:
+        logger.debug('Language detection tier %s: %s (%.6fs)', *tier)
+    if detection.language is not None:
+        return detection.language
+    return lexer_name(guess_lexer(content[:_GUESS_SIZE]))
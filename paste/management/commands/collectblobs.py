@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.utils import timezone
+
+from paste.models import Blob, Snippet
+
+
+class Command(BaseCommand):
+    help = 'Delete the content blobs no snippet refers to anymore.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Seconds since last stored for a blob to get deleted, '
+                 'leaving the snippets storing it time to refer to it.')
+
+    def handle(self, *args, **options) -> None:
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        referred = Snippet.objects.filter(blob__isnull=False).values('blob')
+        with transaction.atomic():
+            digests = list(Blob.objects.select_for_update().filter(
+                stored__lt=cutoff).exclude(digest__in=referred).values_list(
+                    'digest', flat=True))
+            count, _ = Blob.objects.filter(digest__in=digests).delete()
+        self.stdout.write(f'{count} blobs deleted')
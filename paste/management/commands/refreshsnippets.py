@@ -0,0 +1,141 @@
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from django.core.management.base import (BaseCommand, CommandError,
+                                         CommandParser)
+from django.db import router
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Length
+
+from paste import constants, search
+from paste.fields import MARKER, RAW
+from paste.models import Blob, Snippet, content_metadata
+from paste.rendering import get_rendering, prerender
+from paste.sandbox import guess_language
+
+
+def _batches(queryset: QuerySet, size: int) -> Iterator[List[Snippet]]:
+    """Yield the snippets of the queryset in lists of given size, ordered by
+    primary key.
+    """
+    last = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last).order_by('pk')[:size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1].pk
+
+
+def _render(batch: List[Snippet]) -> int:
+    """Prerender the snippets of the batch lacking a fresh rendering. Return
+    their number.
+    """
+    stale = [snippet for snippet in batch if get_rendering(snippet) is None]
+    for snippet in stale:
+        prerender(snippet)
+    return len(stale)
+
+
+def _guess_language(batch: List[Snippet]) -> int:
+    """Store the guessed language of the snippets of the batch. Return their
+    number.
+    """
+    for snippet in batch:
+        Snippet.objects.filter(pk=snippet.pk).update(
+            guessed_language=guess_language(
+                snippet.content, snippet.filename))
+    return len(batch)
+
+
+def _measure(batch: List[Snippet]) -> int:
+    """Store the size, line count and preview of the snippets of the batch.
+    Return their number.
+    """
+    for snippet in batch:
+        Snippet.objects.filter(pk=snippet.pk).update(
+            **content_metadata(snippet.content))
+    return len(batch)
+
+
+def _content_queryset() -> QuerySet:
+    """Return the snippets whose content is not stored in the form the
+    relative settings call for.
+    """
+    queryset = Snippet.objects.only('content', 'blob')
+    if constants.DEDUPLICATE_CONTENT:
+        return queryset.filter(blob=None)
+    if constants.COMPRESS_CONTENT:
+        queryset = queryset.annotate(length=Length('content'))
+        stale = Q(length__gte=constants.COMPRESS_THRESHOLD) & ~Q(
+            content__startswith=MARKER)
+    else:
+        stale = Q(content__startswith=MARKER) & ~Q(
+            content__startswith=MARKER + RAW)
+    return queryset.filter(Q(blob__isnull=False) | stale)
+
+
+def _store_content(batch: List[Snippet]) -> int:
+    """Store the content of the snippets of the batch anew, in a blob or in
+    the snippet itself, compressed or not. Return their number.
+    """
+    for snippet in batch:
+        content = snippet.content
+        if constants.DEDUPLICATE_CONTENT:
+            values = {'blob': Blob.store(content), 'content': ''}
+        else:
+            values = {'blob': None, 'content': content}
+        Snippet.objects.filter(pk=snippet.pk).update(**values)
+    return len(batch)
+
+
+def _search_queryset() -> QuerySet:
+    """Return all the snippets, creating the search index first if missing.
+    """
+    search.create_index(router.db_for_write(Snippet))
+    return Snippet.objects.select_related('blob')
+
+
+def _index(batch: List[Snippet]) -> int:
+    """Index the snippets of the batch for search anew. Return their number.
+    """
+    search.update_index(batch)
+    return len(batch)
+
+
+TASKS: Dict[str, Tuple[Callable[[], QuerySet],
+                       Callable[[List[Snippet]], int]]] = {
+    'content': (_content_queryset, _store_content),
+    'language': (
+        lambda: Snippet.objects.filter(language='', guessed_language=''),
+        _guess_language),
+    'metadata': (
+        lambda: Snippet.objects.filter(size=0).exclude(content='', blob=None),
+        _measure),
+    'render': (lambda: Snippet.objects.select_related('rendering'), _render),
+    'search': (_search_queryset, _index),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compute the stored data derived from existing snippets.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            'tasks', nargs='*', metavar='task',
+            help=f'Data to compute, out of: {", ".join(TASKS)}. '
+                 'All of them if omitted.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of snippets to fetch at a time.')
+
+    def handle(self, *args, **options) -> None:
+        unknown = sorted(set(options['tasks']) - set(TASKS))
+        if unknown:
+            raise CommandError(f'unknown tasks: {", ".join(unknown)}')
+
+        for name in options['tasks'] or TASKS:
+            get_queryset, task = TASKS[name]
+            count = 0
+            for batch in _batches(get_queryset(), options['batch_size']):
+                count += task(batch)
+            self.stdout.write(f'{name}: {count} snippets updated')
@@ -0,0 +1,304 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (Any, AsyncIterator, Dict, Iterable, Iterator, List,
+                    Optional, Tuple, TypeVar)
+
+from django.dispatch import Signal
+from django.http.response import HttpResponseBase, StreamingHttpResponse
+
+from paste import constants
+
+
+T = TypeVar('T')
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Sent when a request to a snippet view is done, with the name of the
+# `action`, the `status` code of the response, the `seconds` it took, the
+# seconds spent on each of its `stages`, and the `size` of the content and
+# the name of the `lexer` involved, if any.
+request_timed = Signal()
+
+
+class Timings:
+    """The time spent on the stages of a request, along with the size of the
+    content and the name of the lexer involved, if any.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.size: Optional[int] = None
+        self.lexer: Optional[str] = None
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> List[str]:
+        """Return the names of the stages being timed by current thread,
+        innermost last.
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add the seconds to the time spent on the named stage."""
+        self.stages[name] = self.stages.get(name, 0) + seconds
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar(
+    'paste_timings', default=None)
+
+
+def start() -> Optional[Timings]:
+    """Begin timing the stages of current request, if the relative setting
+    allows so, and return its timings.
+    """
+    if not constants.METRICS:
+        return None
+    timings = Timings()
+    _current.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the named stage of current request,
+    if timed, leaving it out of the enclosing stage.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+
+    timings._stack.append(name)
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - begin
+        timings._stack.pop()
+        timings.add(name, seconds)
+        if timings._stack:
+            timings.add(timings._stack[-1], -seconds)
+
+
+def _timed(name: str, iterator: Iterator[T]) -> Iterator[T]:
+    """Yield the items of the iterator, adding the time spent producing each
+    one to the named stage.
+    """
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def timed(name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """Return an iterator over the items of the iterable, adding the time
+    spent producing them to the named stage of current request, if timed.
+    """
+    if _current.get() is None:
+        return iter(iterable)
+    return _timed(name, iter(iterable))
+
+
+def annotate(**values: Any) -> None:
+    """Record the content size or lexer name of current request, if timed."""
+    timings = _current.get()
+    if timings is not None:
+        for name, value in values.items():
+            setattr(timings, name, value)
+
+
+def _send(timings: Timings, sender: type, action: Optional[str],
+          status: int) -> None:
+    """Send the signal of a request done, with its timings."""
+    request_timed.send(
+        sender=sender, action=action, status=status,
+        seconds=time.perf_counter() - timings.start,
+        stages=dict(timings.stages), size=timings.size, lexer=timings.lexer)
+
+
+def _streamed(timings: Timings, chunks: Iterator[bytes], sender: type,
+              action: Optional[str], status: int) -> Iterator[bytes]:
+    """Yield the chunks of a streamed response, timing the stages of their
+    production, then send the signal of the request done.
+    """
+    try:
+        while True:
+            _current.set(timings)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                _current.set(None)
+            yield chunk
+    finally:
+        _send(timings, sender, action, status)
+
+
+async def _astreamed(timings: Timings, chunks: AsyncIterator[bytes],
+                     sender: type, action: Optional[str],
+                     status: int) -> AsyncIterator[bytes]:
+    """Yield the chunks of an asynchronously streamed response, like
+    `_streamed` does.
+    """
+    try:
+        while True:
+            _current.set(timings)
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _current.set(None)
+            yield chunk
+    finally:
+        _send(timings, sender, action, status)
+
+
+def finish(timings: Optional[Timings], sender: type, action: Optional[str],
+           response: HttpResponseBase) -> None:
+    """Stop timing current request, if timed, and send the signal of it done,
+    once the response is streamed if so.
+    """
+    if timings is None:
+        return
+    _current.set(None)
+    if not isinstance(response, StreamingHttpResponse):
+        _send(timings, sender, action, response.status_code)
+        return
+    content = response.streaming_content
+    if isinstance(content, AsyncIterator):
+        response.streaming_content = _astreamed(
+            timings, content, sender, action, response.status_code)
+    else:
+        response.streaming_content = _streamed(
+            timings, content, sender, action, response.status_code)
+
+
+def _format_labels(labels: Labels) -> str:
+    """Return the labels in the Prometheus text format."""
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+
+class Histogram:
+    """Counts of observed values falling in each of the given buckets, as
+    upper bounds, along with their sum.
+    """
+
+    def __init__(self, buckets: List[float]) -> None:
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Count the value in its bucket."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: Labels) -> Iterator[str]:
+        """Yield the lines of the histogram in the Prometheus text format,
+        with cumulative bucket counts.
+        """
+        total = 0
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            bucket_labels = _format_labels(labels + (('le', bound),))
+            yield f'{name}_bucket{{{bucket_labels}}} {total}'
+        yield f'{name}_sum{{{_format_labels(labels)}}} {self.sum}'
+        yield f'{name}_count{{{_format_labels(labels)}}} {total}'
+
+
+class Aggregator:
+    """In-process metrics of requests to snippet views: request counts by
+    action and status code, and histograms of the time spent on requests and
+    on their stages, by action.
+    """
+
+    METRICS = [
+        ('paste_requests_total', 'counter',
+         'Requests to snippet views.'),
+        ('paste_content_bytes_total', 'counter',
+         'Size of the snippet content requests to snippet views involved.'),
+        ('paste_request_duration_seconds', 'histogram',
+         'Time spent on requests to snippet views.'),
+        ('paste_stage_duration_seconds', 'histogram',
+         'Time spent on each stage of requests to snippet views.'),
+    ]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything observed."""
+        with self._lock:
+            self._counters: Dict[str, Dict[Labels, float]] = {
+                'paste_requests_total': {},
+                'paste_content_bytes_total': {},
+            }
+            self._histograms: Dict[str, Dict[Labels, Histogram]] = {
+                'paste_request_duration_seconds': {},
+                'paste_stage_duration_seconds': {},
+            }
+
+    def _histogram(self, name: str, labels: Labels) -> Histogram:
+        """Return the named histogram with the labels, creating it first if
+        needed with the buckets of the relative setting.
+        """
+        histograms = self._histograms[name]
+        if labels not in histograms:
+            histograms[labels] = Histogram(constants.METRICS_BUCKETS)
+        return histograms[labels]
+
+    def observe(self, action: Optional[str], status: int, seconds: float,
+                stages: Dict[str, float], size: Optional[int] = None) -> None:
+        """Count a request done, along with the time spent on it and on its
+        stages.
+        """
+        action_labels: Labels = (('action', action or ''),)
+        with self._lock:
+            counters = self._counters['paste_requests_total']
+            labels = action_labels + (('status', str(status)),)
+            counters[labels] = counters.get(labels, 0) + 1
+            if size is not None:
+                counters = self._counters['paste_content_bytes_total']
+                counters[action_labels] = (
+                    counters.get(action_labels, 0) + size)
+            self._histogram(
+                'paste_request_duration_seconds', action_labels).observe(
+                    seconds)
+            for name, value in stages.items():
+                self._histogram(
+                    'paste_stage_duration_seconds',
+                    action_labels + (('stage', name),)).observe(value)
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            for name, kind, description in self.METRICS:
+                lines += [f'# HELP {name} {description}',
+                          f'# TYPE {name} {kind}']
+                if kind == 'counter':
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append(f'{name}{{{_format_labels(labels)}}} '
+                                     f'{value}')
+                else:
+                    for labels, histogram in sorted(
+                            self._histograms[name].items()):
+                        lines += histogram.lines(name, labels)
+        return '\n'.join(lines) + '\n'
+
+
+aggregator = Aggregator()
@@ -1,21 +1,89 @@
-from typing import List, Tuple
+import hashlib
+from typing import Any, Dict, Optional, Sequence, Set
 
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from pygments.lexers import get_all_lexers
-from pygments.styles import get_all_styles
-
 from paste import constants
+from paste.choices import (LazyChoices, language_choices, style_choices,
+                           validate_language, validate_style)
+from paste.fields import ContentField, LazyContent, text
+from paste.sandbox import guess_language
+
+
+_SOURCE_FIELDS = ['content', 'filename']
+
+
+def content_metadata(content: str) -> Dict[str, Any]:
+    """Return the values of the snippet fields derived from the content
+    alone.
+    """
+    return {
+        'size': len(content.encode()),
+        'line_count': len(content.splitlines()),
+        'preview': content[:constants.PREVIEW_LENGTH],
+    }
+
+
+class Blob(models.Model):
+    """Content shared by the snippets having it, addressed by its SHA-256
+    digest.
+    """
+
+    digest = models.CharField(_('digest'), max_length=64, primary_key=True)
+    content = ContentField(_('content'))
+    stored = models.DateTimeField(_('last stored'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('blob')
+        verbose_name_plural = _('blobs')
+
+    def __str__(self) -> str:
+        return self.digest
+
+    @classmethod
+    def store(cls, content: str) -> 'Blob':
+        """Return the blob of the content, creating it if needed. Mark it as
+        just stored either way, so that it does not get collected before the
+        snippet storing it refers to it.
+        """
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        now = timezone.now()
+        if cls.objects.filter(digest=digest).update(stored=now):
+            blob = cls(digest=digest, content=content, stored=now)
+            blob._state.adding = False
+            return blob
+        blob, _ = cls.objects.get_or_create(
+            digest=digest, defaults={'content': content, 'stored': now})
+        return blob
+
+
+class BlobContent(LazyContent):
+    """Content of a snippet stored in a blob, to be read from there when
+    needed.
+    """
+
+    __slots__ = ['snippet']
 
+    def __init__(self, snippet: 'Snippet') -> None:
+        self.snippet = snippet
 
-_lexers = (item for item in get_all_lexers() if item[1])
+    def __repr__(self) -> str:
+        return f'<BlobContent: {self.snippet.blob_id}>'
 
+    @property
+    def stored(self) -> str:
+        """Return the content of the snippet itself, which is empty."""
+        return ''
 
-def _max_len(choices: List[Tuple[str, str]]) -> int:
-    """Return the maximum length of the first subitems of each item."""
-    return max(len(item[0]) for item in choices)
+    def resolve(self) -> str:
+        """Return the content of the snippet's blob, or nothing if it no
+        longer refers to one.
+        """
+        blob = self.snippet.blob
+        return '' if blob is None else blob.content
 
 
 class Snippet(models.Model):
@@ -23,18 +91,30 @@ class Snippet(models.Model):
     owned by a user.
     """
 
-    LANGUAGE_CHOICES = sorted([(item[1][0], item[0]) for item in _lexers])
-    STYLE_CHOICES = sorted([(item, item) for item in get_all_styles()])
+    LANGUAGE_CHOICES = LazyChoices(language_choices)
+    STYLE_CHOICES = LazyChoices(style_choices)
+    LANGUAGE_MAX_LENGTH = 50
+    STYLE_MAX_LENGTH = 50
 
     title = models.CharField(
         _('title'), max_length=constants.TITLE_MAX_LENGTH, blank=True)
-    content = models.TextField(_('content'))
+    content = ContentField(_('content'))
+    size = models.PositiveIntegerField(_('size'), default=0, editable=False)
+    line_count = models.PositiveIntegerField(
+        _('line count'), default=0, editable=False)
+    preview = models.CharField(
+        _('preview'), max_length=constants.PREVIEW_LENGTH, blank=True,
+        editable=False)
+    filename = models.CharField(_('filename'), max_length=255, blank=True)
     language = models.CharField(
-        _('language'), choices=LANGUAGE_CHOICES,
-        max_length=_max_len(LANGUAGE_CHOICES), blank=True)
+        _('language'), max_length=LANGUAGE_MAX_LENGTH, blank=True,
+        validators=[validate_language])
+    guessed_language = models.CharField(
+        _('guessed language'), max_length=LANGUAGE_MAX_LENGTH, blank=True,
+        editable=False)
     style = models.CharField(
-        _('style'), choices=STYLE_CHOICES,
-        max_length=_max_len(STYLE_CHOICES), blank=True)
+        _('style'), max_length=STYLE_MAX_LENGTH, blank=True,
+        validators=[validate_style])
     line_numbers = models.BooleanField(
         _('line numbers'), default=constants.DEFAULT_LINE_NUMBERS)
     embed_title = models.BooleanField(
@@ -46,10 +126,132 @@ class Snippet(models.Model):
     owner = models.ForeignKey(
         get_user_model(), verbose_name=_('owner'),
         blank=True, null=True, on_delete=models.CASCADE)
+    blob = models.ForeignKey(
+        Blob, verbose_name=_('blob'), blank=True, null=True, editable=False,
+        on_delete=models.PROTECT, related_name='snippets')
 
     class Meta:
         verbose_name = _('snippet')
         verbose_name_plural = _('snippets')
+        indexes = [
+            models.Index(fields=['private', 'created', 'id']),
+            models.Index(fields=['owner', 'created', 'id']),
+            models.Index(fields=['language', 'created', 'id']),
+            models.Index(fields=['guessed_language', 'created', 'id']),
+            models.Index(fields=['private', 'updated']),
+            models.Index(fields=['owner', 'updated']),
+            models.Index(fields=['created', 'id']),
+            models.Index(fields=['updated']),
+        ]
 
     def __str__(self) -> str:
         return f'{self.title or _("Untitled")} ({self.pk})'
+
+    @classmethod
+    def from_db(cls, db: Optional[str], field_names: Sequence[str],
+                values: Sequence[Any]) -> 'Snippet':
+        """Create instance from database values, remembering the ones other
+        fields are derived from.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._link_blob()
+        instance._loaded_source_fields = instance._source_fields()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs) -> None:
+        """Reload field values from the database, reading the content from
+        the blob if stored there.
+        """
+        super().refresh_from_db(*args, **kwargs)
+        self._link_blob()
+
+    def _link_blob(self) -> None:
+        """If the content is stored in a blob, have it read from there when
+        needed.
+        """
+        if self.__dict__.get('content') == '' and self.blob_id is not None:
+            self.__dict__['content'] = BlobContent(self)
+
+    def _source_fields(self) -> Dict[str, Optional[str]]:
+        """Return the loaded values of the fields other fields are derived
+        from.
+        """
+        return {name: self.__dict__.get(name) for name in _SOURCE_FIELDS}
+
+    def save(self, *args, **kwargs) -> None:
+        """Update the derived fields if needed, then save."""
+        derived_fields = self.update_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if derived_fields and update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *derived_fields}
+
+        super().save(*args, **kwargs)
+        self._loaded_source_fields = self._source_fields()
+
+    def update_derived_fields(self) -> Set[str]:
+        """Update the fields derived from the content and the filename, if
+        any of those changed since loaded, storing the content in its blob if
+        the relative setting allows so. Return the names of the fields
+        updated.
+        """
+        loaded = getattr(self, '_loaded_source_fields', {})
+        deferred_fields = self.get_deferred_fields()
+        changed = {
+            name for name in _SOURCE_FIELDS if name not in deferred_fields
+            and self.__dict__[name] is not loaded.get(name)
+            and getattr(self, name) != text(loaded.get(name))}
+
+        derived_fields = set()
+        if 'content' in changed:
+            for name, value in content_metadata(self.content).items():
+                setattr(self, name, value)
+                derived_fields.add(name)
+            self.blob = (Blob.store(self.content)
+                         if constants.DEDUPLICATE_CONTENT else None)
+            derived_fields.add('blob')
+        if self.update_guessed_language(bool(changed)):
+            derived_fields.add('guessed_language')
+        if self.blob_id is not None and 'content' not in deferred_fields:
+            self.__dict__['content'] = BlobContent(self)
+        return derived_fields
+
+    def update_guessed_language(self, changed: bool) -> bool:
+        """If language is not set and the relative setting allows so, guess it
+        from the content and the filename, unless already guessed and those
+        have not changed. If language is set and they changed, forget the
+        guessed one. Return whether the guessed language changed.
+        """
+        guessed_language = self.guessed_language
+        if not self.language and constants.GUESS_LEXER:
+            if changed or not guessed_language:
+                guessed_language = guess_language(
+                    self.content, self.filename)
+        elif changed:
+            guessed_language = ''
+
+        if guessed_language == self.guessed_language:
+            return False
+        self.guessed_language = guessed_language
+        return True
+
+
+class Rendering(models.Model):
+    """The highlighted HTML fragment of a snippet, rendered when the snippet
+    is written, along with the lexer checkpoints taken meanwhile.
+    """
+
+    snippet = models.OneToOneField(
+        Snippet, verbose_name=_('snippet'), primary_key=True,
+        on_delete=models.CASCADE, related_name='rendering')
+    html = models.TextField(_('HTML'))
+    lexer = models.CharField(
+        _('lexer'), max_length=Snippet.LANGUAGE_MAX_LENGTH)
+    signature = models.CharField(_('signature'), max_length=40)
+    checkpoints = models.TextField(_('checkpoints'), blank=True)
+
+    class Meta:
+        verbose_name = _('rendering')
+        verbose_name_plural = _('renderings')
+
+    def __str__(self) -> str:
+        return str(self.snippet)
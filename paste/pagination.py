@@ -0,0 +1,74 @@
+from typing import Any, List, Optional, Sequence
+
+from django.db.models import Q, QuerySet
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.request import Request
+
+from paste import constants
+
+
+class BranchedQuerySet:
+    """Stand-in for a queryset of snippets matching any of several filters,
+    supporting only what the keyset paginator does with it: ordering,
+    filtering and slicing. A slice fetches the primary keys of as many
+    snippets matching each filter as it ends at, each through the index
+    serving that filter along with the ordering, and then the snippets
+    among those, from the base queryset, so that at most as many are sorted
+    per filter, whatever their total.
+    """
+
+    def __init__(self, queryset: QuerySet, branches: Sequence[Q],
+                 base: QuerySet, ordering: Sequence[str] = ()) -> None:
+        self.queryset = queryset
+        self.branches = branches
+        self.base = base
+        self.ordering = ordering
+
+    def order_by(self, *fields: str) -> 'BranchedQuerySet':
+        """Return a copy ordered by the fields."""
+        return BranchedQuerySet(
+            self.queryset.order_by(*fields), self.branches, self.base, fields)
+
+    def filter(self, *args, **kwargs) -> 'BranchedQuerySet':
+        """Return a copy filtered by the arguments."""
+        return BranchedQuerySet(
+            self.queryset.filter(*args, **kwargs), self.branches, self.base,
+            self.ordering)
+
+    def __getitem__(self, key: slice) -> List[Any]:
+        """Return the snippets of the slice."""
+        keys = Q(pk__in=[])
+        for branch in self.branches:
+            keys |= Q(pk__in=self.queryset.filter(branch).values('pk')[
+                :key.stop])
+        return list(self.base.filter(keys).order_by(*self.ordering)[key])
+
+
+class SnippetPagination(CursorPagination):
+    """Keyset pagination of snippets, newest first. Pages are fetched by
+    seeking the creation time of the previous page's last snippet through
+    the relative index, so that their cost does not depend on their depth.
+    Snippets created at the same time are ordered by primary key, which the
+    indexes also cover, so that pages neither skip nor repeat them.
+    """
+
+    ordering = ('-created', '-pk')
+
+    def get_page_size(self, request: Request) -> Optional[int]:
+        """Return the size of pages according to the relative setting, or
+        None if pagination is disabled.
+        """
+        return constants.PAGE_SIZE or None
+
+
+class SearchPagination(PageNumberPagination):
+    """Numbered pages of search results, best matches first, as their
+    ranking offers no key to seek by.
+    """
+
+    def get_page_size(self, request: Request) -> Optional[int]:
+        """Return the size of pages according to the relative setting, or
+        None if pagination is disabled.
+        """
+        return constants.PAGE_SIZE or None
@@ -17,22 +17,34 @@ class SnippetPermissions(permissions.BasePermission):
         if constants.FORBID_ANONYMOUS and user.is_anonymous:
             return False
 
-        if view.action in ['list', 'user']:
+        if view.action in ['list', 'user', 'search']:
             if constants.FORBID_LIST:
                 return user.is_staff  # type: ignore
             if constants.FORBID_ANONYMOUS_LIST:
                 return user.is_authenticated
 
         return not (
-            view.action == 'create'
+            view.action in ['create', 'bulk_create']
             and constants.FORBID_ANONYMOUS_CREATE and user.is_anonymous)
 
     def has_object_permission(
             self, request: Request, view: ViewSet, obj: Snippet) -> bool:
         """Allow if method is safe and snippet is public, or if user is owner
-        or staff.
+        or staff. Tell the owner by ID, so that it is not fetched.
         """
         user = request.user
         return (
             request.method in permissions.SAFE_METHODS  # type: ignore
-            and not obj.private or obj.owner == user or user.is_staff)
+            and not obj.private
+            or user.is_authenticated and obj.owner_id == user.pk
+            or user.is_staff)
+
+
+class StylePermissions(permissions.BasePermission):
+    """Permissions for style-related views."""
+
+    def has_permission(self, request: Request, view: ViewSet) -> bool:
+        """Decide regarding current user type and settings for anonymous
+        access alone, as styles are not snippets.
+        """
+        return not (constants.FORBID_ANONYMOUS and request.user.is_anonymous)
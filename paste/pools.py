@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from pygments.lexer import Lexer
+from pygments.lexers import get_lexer_by_name
+
+from paste import constants
+from paste.streaming import StreamingHtmlFormatter
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+FormatterKey = Tuple[Tuple[str, Any], ...]
+
+
+class Pool(Generic[K, V]):
+    """A thread-safe pool of objects created by the given factory, keyed by
+    the argument they are created with. Holds up to as many objects as the
+    POOL_SIZE setting indicates, discarding the least recently used.
+    """
+
+    def __init__(self, factory: Callable[[K], V]) -> None:
+        self.factory = factory
+        self._items: 'OrderedDict[K, V]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: K) -> V:
+        """Return the object for the key, creating it if not pooled."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        item = self.factory(key)
+        with self._lock:
+            self._items[key] = item
+            while len(self._items) > constants.POOL_SIZE:
+                self._items.popitem(last=False)
+        return item
+
+    def clear(self) -> None:
+        """Discard all the pooled objects."""
+        with self._lock:
+            self._items.clear()
+
+
+lexers: Pool[str, Lexer] = Pool(get_lexer_by_name)
+
+formatters: Pool[FormatterKey, StreamingHtmlFormatter] = Pool(
+    lambda key: StreamingHtmlFormatter(**dict(key)))
+
+
+def get_lexer(name: str) -> Lexer:
+    """Return the pooled lexer of the given name."""
+    return lexers.get(name)
+
+
+def get_formatter(options: Dict[str, Any]) -> StreamingHtmlFormatter:
+    """Return the pooled HTML formatter with the given options."""
+    return formatters.get(tuple(sorted(options.items())))
+
+
+def warm() -> None:
+    """Pool the lexers of the languages and the formatters of the styles the
+    relative settings indicate, for every combination of the `full` and
+    `linenos` options.
+    """
+    for name in constants.WARM_LANGUAGES:
+        get_lexer(name)
+    for style in constants.WARM_STYLES:
+        for full in [False, True]:
+            for linenos in [False, True]:
+                get_formatter(
+                    {'style': style, 'full': full, 'linenos': linenos})
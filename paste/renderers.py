@@ -0,0 +1,33 @@
+from typing import Any, Optional
+
+from rest_framework import renderers
+
+
+class TextRenderer(renderers.BaseRenderer):
+    """Base renderer of pre-rendered text content. Errors are rendered as
+    their detail message.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None,
+               renderer_context: Optional[dict] = None) -> str:
+        if isinstance(data, str):
+            return data
+        if isinstance(data, dict):
+            return str(data.get('detail', ''))
+        return ''
+
+
+class CSSRenderer(TextRenderer):
+    """Renderer of pre-rendered CSS."""
+
+    media_type = 'text/css'
+    format = 'css'
+
+
+class PlainTextRenderer(TextRenderer):
+    """Renderer of plain text."""
+
+    media_type = 'text/plain'
+    format = 'txt'
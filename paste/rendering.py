@@ -0,0 +1,219 @@
+import copy
+import hashlib
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.urls import reverse
+
+from pygments import format as format_tokens
+from pygments.filter import apply_filters
+from pygments.lexer import Lexer
+
+from paste import constants, metrics, pools
+from paste.checkpoints import Checkpoint, Token, dumps, preprocess
+from paste.lexers import lexer_name
+from paste.models import Rendering, Snippet
+from paste.sandbox import (content_within_limits, guess_language, lex,
+                           within_limits)
+
+
+def _language(snippet: Snippet) -> str:
+    """Return the name of the snippet's language. If that is not set, use
+    the guessed one if the relative setting allows so, else use the default
+    language. Use plain text if the snippet's content exceeds the relative
+    settings in size or line count, measured if not stored yet.
+    """
+    if snippet.size and snippet.line_count:
+        allowed = within_limits(snippet.size, snippet.line_count)
+    else:
+        allowed = content_within_limits(snippet.content)
+    if not allowed:
+        return 'text'
+    if snippet.language:
+        return snippet.language
+    if constants.GUESS_LEXER:
+        if snippet.guessed_language:
+            return snippet.guessed_language
+        with metrics.stage('guess'):
+            return guess_language(snippet.content, snippet.filename)
+    return constants.DEFAULT_LANGUAGE
+
+
+def get_lexer(snippet: Snippet) -> Lexer:
+    """Return the lexer of the snippet's language, as `_language` resolves
+    it.
+    """
+    language = _language(snippet)
+    metrics.annotate(lexer=language)
+    return pools.get_lexer(language)
+
+
+def formatter_options(snippet: Snippet, full: bool) -> Dict[str, Any]:
+    """Return the HTML formatter options for highlighting the snippet."""
+    options = {
+        'style': snippet.style or constants.DEFAULT_STYLE,
+        'full': full,
+        'linenos': snippet.line_numbers,
+    }
+    if snippet.title and snippet.embed_title:
+        options['title'] = snippet.title
+    return options
+
+
+def render_signature(snippet: Snippet, full: bool) -> str:
+    """Return a digest of the snippet's state that its highlighting depends
+    on. It changes whenever the snippet is saved, or any option affecting its
+    highlighting changes. For snippets with their content stored in a blob,
+    it depends on the blob instead, so that it is shared by the snippets
+    having the same content and options.
+    """
+    language = snippet.language or (
+        '' if constants.GUESS_LEXER else constants.DEFAULT_LANGUAGE)
+    if snippet.blob_id is not None:
+        version: Any = (snippet.blob_id, snippet.guessed_language,
+                        snippet.filename)
+    else:
+        version = snippet.updated.isoformat()
+    options = sorted(formatter_options(snippet, full).items())
+    parts = repr((version, language, options))
+    return hashlib.sha1(parts.encode()).hexdigest()
+
+
+def get_tokens(snippet: Snippet) -> Iterator[Token]:
+    """Return the filtered tokens of the snippet's content, lexed within the
+    limits of the sandbox, if enabled.
+    """
+    lexer = get_lexer(snippet)
+    tokens = metrics.timed(
+        'lex', lex(lexer, preprocess(lexer, snippet.content)))
+    return apply_filters(tokens, lexer.filters, lexer)
+
+
+def build_rendering(snippet: Snippet) -> Rendering:
+    """Highlight the snippet's content as an HTML fragment and return it as
+    an unsaved rendering, along with the lexer used and the checkpoints taken
+    while lexing.
+    """
+    lexer = get_lexer(snippet)
+    formatter = pools.get_formatter(formatter_options(snippet, False))
+    checkpoints: List[Checkpoint] = []
+    tokens = metrics.timed(
+        'lex', lex(lexer, preprocess(lexer, snippet.content), checkpoints))
+    tokens = apply_filters(tokens, lexer.filters, lexer)
+    with metrics.stage('format'):
+        html = format_tokens(tokens, formatter)
+    return Rendering(
+        snippet=snippet, html=html, lexer=lexer_name(lexer),
+        signature=render_signature(snippet, False),
+        checkpoints=dumps(checkpoints))
+
+
+def prerender(snippet: Snippet) -> Rendering:
+    """Highlight the snippet's content as an HTML fragment and store it,
+    replacing any previous one.
+    """
+    rendering = build_rendering(snippet)
+    rendering.save()
+    snippet.rendering = rendering
+    return rendering
+
+
+def get_rendering(snippet: Snippet) -> Optional[Rendering]:
+    """Return the stored rendering of the snippet, if it exists and is not
+    stale.
+    """
+    try:
+        rendering = snippet.rendering
+    except Rendering.DoesNotExist:
+        return None
+    if rendering.signature != render_signature(snippet, False):
+        return None
+    return rendering
+
+
+@lru_cache(maxsize=None)
+def get_stylesheet(style: str) -> Tuple[str, str]:
+    """Return the CSS definitions of the style, along with their ETag."""
+    css = pools.get_formatter({'style': style}).get_style_defs()
+    return css, f'"{hashlib.sha1(css.encode()).hexdigest()}"'
+
+
+@lru_cache(maxsize=None)
+def _style_block(style: str) -> str:
+    """Return the CSS definitions of the style in a `style` element."""
+    css, _ = get_stylesheet(style)
+    return f'<style type="text/css">{css}</style>'
+
+
+def style_prefix(style: str, namespace: str = '') -> str:
+    """Return the style definitions to prepend to highlighted HTML fragments,
+    or a link to them if the relative setting allows so, reversed within the
+    given URL namespace, if any.
+    """
+    if constants.LINK_STYLESHEET:
+        name = f'{namespace}:style-detail' if namespace else 'style-detail'
+        url = reverse(name, kwargs={'pk': style, 'format': 'css'})
+        return f'<link rel="stylesheet" type="text/css" href="{url}">'
+    with metrics.stage('style'):
+        return _style_block(style)
+
+
+def render(snippet: Snippet, full: bool,
+           tokens: Optional[Iterable[Token]] = None,
+           namespace: str = '') -> str:
+    """Highlight the snippet's content as HTML. If `full` is True, return a
+    full HTML document, else prepend the style definitions to the fragment,
+    or a link to them if the relative setting allows so. Use the stored
+    rendering if prerendering is enabled. Else, format the given tokens of
+    the content, if any, instead of lexing it. Full documents are never
+    prerendered, as they embed the style definitions. Link to the stylesheet
+    within the given URL namespace, if any.
+    """
+    if constants.PRERENDER and not full:
+        rendering = get_rendering(snippet)
+        if rendering is not None:
+            style = snippet.style or constants.DEFAULT_STYLE
+            return style_prefix(style, namespace) + rendering.html
+
+    options = formatter_options(snippet, full)
+    formatter = pools.get_formatter(options)
+    if tokens is None:
+        tokens = get_tokens(snippet)
+    with metrics.stage('format'):
+        html = format_tokens(tokens, formatter)
+
+    if full:
+        return html
+    return style_prefix(options['style'], namespace) + html
+
+
+def render_lines(snippet: Snippet, full: bool, tokens: Iterable[Token],
+                 first: int, namespace: str = '') -> str:
+    """Highlight the given tokens of the snippet's lines, beginning with line
+    `first`, as HTML, like `render` does, numbering the lines accordingly.
+    """
+    options = formatter_options(snippet, full)
+    formatter = copy.copy(pools.get_formatter(options))
+    formatter.linenostart = first
+    with metrics.stage('format'):
+        html = format_tokens(tokens, formatter)
+    if full:
+        return html
+    return style_prefix(options['style'], namespace) + html
+
+
+def render_chunks(snippet: Snippet, full: bool,
+                  namespace: str = '') -> Iterator[str]:
+    """Highlight the snippet's content as HTML, like `render` does, yielding
+    it a chunk at a time, so that it is never held in memory as a whole. Line
+    numbers are rendered inline, rather than in a table.
+    """
+    options = formatter_options(snippet, full)
+    if options['linenos']:
+        options['linenos'] = 'inline'
+    formatter = pools.get_formatter(options)
+    chunks = formatter.stream(get_tokens(snippet), metrics.stage('format'))
+    if not full:
+        chunks = chain([style_prefix(options['style'], namespace)], chunks)
+    return chunks
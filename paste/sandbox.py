@@ -0,0 +1,366 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from multiprocessing.connection import Connection
+from typing import (TYPE_CHECKING, Any, Callable, Iterable, Iterator, List,
+                    Optional, Set, Tuple, Union)
+
+from pygments.lexer import Lexer
+from pygments.token import Text, string_to_tokentype
+
+from paste import checkpoints, constants, lexers, pools
+from paste.checkpoints import START, Checkpoint, Token
+from paste.streaming import encoded_size
+from paste.tokens import decode, encode, token_name
+
+
+if TYPE_CHECKING:
+    from multiprocessing.context import ForkServerContext, SpawnContext
+
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a job beyond its CPU time limit, before giving up on it.
+_GRACE = 1
+
+Names = List[Tuple[str, str]]
+
+Context = Union['ForkServerContext', 'SpawnContext']
+
+
+class LimitExceeded(Exception):
+    """Raised when a job exceeds the time or memory limits of the sandbox."""
+
+
+def within_limits(size: int, line_count: int) -> bool:
+    """Return whether content of the given size, in bytes, and line count is
+    allowed to be lexed, according to the relative settings.
+    """
+    max_size = constants.HIGHLIGHT_MAX_SIZE
+    max_lines = constants.HIGHLIGHT_MAX_LINES
+    return not (max_size and size > max_size
+                or max_lines and line_count > max_lines)
+
+
+def content_within_limits(content: str) -> bool:
+    """Return whether the content is allowed to be lexed, measuring it."""
+    return within_limits(encoded_size(content), content.count('\n') + 1)
+
+
+def _initialize(memory: int) -> None:
+    """Limit the address space of the current worker to the given bytes."""
+    if resource is not None and memory:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory, hard))
+
+
+def _limited(seconds: int, function: Callable[..., Any], *args) -> Any:
+    """Call the function with the arguments in the current worker, which
+    gets killed if it spends more than the given seconds of CPU time on it.
+    """
+    if resource is None or not seconds:
+        return function(*args)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (used + seconds, hard))
+    try:
+        return function(*args)
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def _serve(connection: Connection, memory: int) -> None:
+    """Run the jobs received through the connection one at a time, within
+    the given address space, sending back whether each one succeeded along
+    with its result or exception.
+    """
+    _initialize(memory)
+    while True:
+        try:
+            seconds, function, args = connection.recv()
+        except EOFError:
+            return
+        try:
+            result: Tuple[bool, Any] = (
+                True, _limited(seconds, function, *args))
+        except Exception as exc:
+            result = (False, exc)
+        connection.send(result)
+
+
+def _get_context() -> Context:
+    """Return the context workers are started in: afresh rather than forked
+    from the server process, so that they inherit neither its memory nor its
+    threads and connections.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+class Worker:
+    """A worker process of the sandbox, running a job at a time."""
+
+    def __init__(self, context: Context, memory: int) -> None:
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(child, memory), daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = 0
+
+    def run(self, seconds: int, function: Callable[..., Any], *args) -> Any:
+        """Call the function with the arguments, giving up on it once it has
+        run for longer than its CPU time limit allows. Raise LimitExceeded
+        if it exceeds the limits, or the worker dies meanwhile.
+        """
+        self.jobs += 1
+        self.connection.send((seconds, function, args))
+        if not self.connection.poll(seconds + _GRACE if seconds else None):
+            raise LimitExceeded
+        try:
+            succeeded, result = self.connection.recv()
+        except EOFError as exc:
+            raise LimitExceeded from exc
+        if succeeded:
+            return result
+        if isinstance(result, MemoryError):
+            raise LimitExceeded from result
+        raise result
+
+    def stop(self) -> None:
+        """Kill the worker, abandoning its job, if any."""
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+class Pool:
+    """Worker processes of the sandbox, each started when first needed and
+    replaced once it exceeds the limits of a job, or has run the given number
+    of jobs, if any. Jobs wait for an idle worker, without that counting
+    against their limits.
+    """
+
+    def __init__(self, workers: int, memory: int, max_jobs: int) -> None:
+        self.context = _get_context()
+        self.memory = memory
+        self.max_jobs = max_jobs
+        self.workers: Set[Worker] = set()
+        self.idle: 'queue.Queue[Optional[Worker]]' = queue.Queue()
+        for _ in range(workers):
+            self.idle.put(None)
+
+    def run(self, seconds: int, function: Callable[..., Any], *args) -> Any:
+        """Call the function with the arguments in an idle worker, within the
+        given seconds of CPU time. Raise LimitExceeded if it exceeds the
+        limits.
+        """
+        worker = self.idle.get()
+        try:
+            if worker is None:
+                worker = Worker(self.context, self.memory)
+                self.workers.add(worker)
+            try:
+                return worker.run(seconds, function, *args)
+            except LimitExceeded:
+                self.discard(worker)
+                worker = None
+                raise
+        finally:
+            if worker is not None and self.max_jobs and (
+                    worker.jobs >= self.max_jobs):
+                self.discard(worker)
+                worker = None
+            self.idle.put(worker)
+
+    def discard(self, worker: Worker) -> None:
+        """Stop the worker and forget it."""
+        self.workers.discard(worker)
+        worker.stop()
+
+    def terminate(self) -> None:
+        """Stop every worker, abandoning their jobs."""
+        for worker in list(self.workers):
+            self.discard(worker)
+
+
+_pool: Optional[Pool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Pool:
+    """Return the pool of worker processes jobs run in, creating it first if
+    needed, according to the relative settings.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = Pool(constants.SANDBOX_WORKERS, constants.SANDBOX_MEMORY,
+                         constants.SANDBOX_MAX_JOBS)
+        return _pool
+
+
+def shutdown() -> None:
+    """Stop the worker processes, if started, abandoning any running jobs."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool = None
+
+
+def run(function: Callable[..., Any], *args) -> Any:
+    """Call the function with the arguments in a worker process, within the
+    time and memory limits the relative settings set. Raise LimitExceeded if
+    it exceeds them.
+    """
+    return get_pool().run(constants.SANDBOX_TIMEOUT, function, *args)
+
+
+def _names(tokens: Iterable[Token]) -> Names:
+    """Return the tokens with the names of their types, to be pickled."""
+    return [(token_name(token), value) for token, value in tokens]
+
+
+def _typed(tokens: Names) -> Iterator[Token]:
+    """Yield the tokens with their types, as named."""
+    for name, value in tokens:
+        yield string_to_tokentype(name), value
+
+
+def _lex(name: str, text: str, interval: int) -> Tuple[Any, List[Checkpoint]]:
+    """Lex the preprocessed text with the named lexer, taking checkpoints.
+    Return the tokens in compact form, if possible, else named, along with
+    the checkpoints.
+    """
+    taken: List[Checkpoint] = []
+    tokens = list(checkpoints.checkpointed_tokens(
+        pools.get_lexer(name), text, interval, taken))
+    return encode(tokens, text) or _names(tokens), taken
+
+
+def _take_checkpoints(name: str, text: str,
+                      interval: int) -> List[Checkpoint]:
+    """Return the checkpoints of the preprocessed text, lexed with the named
+    lexer.
+    """
+    return checkpoints.take_checkpoints(
+        pools.get_lexer(name), text, interval)
+
+
+def _line_tokens(name: str, text: str, taken: List[Checkpoint], first: int,
+                 last: int) -> Names:
+    """Return the named tokens of lines `first` through `last` of the
+    preprocessed text, lexed with the named lexer from the given checkpoints.
+    """
+    return _names(checkpoints.line_tokens(
+        pools.get_lexer(name), text, taken, first, last))
+
+
+def _plain_lines(text: str, taken: List[Checkpoint], first: int,
+                 last: int) -> Iterator[Token]:
+    """Yield lines `first` through `last` of the preprocessed text as plain
+    text, finding them from the last checkpoint before them.
+    """
+    checkpoint = max(
+        (point for point in taken if point.line <= first), default=START)
+    start = checkpoint.offset
+    for _ in range(first - checkpoint.line):
+        start = text.find('\n', start) + 1
+        if not start:
+            return
+    stop = start
+    for _ in range(last - first + 1):
+        stop = text.find('\n', stop) + 1
+        if not stop:
+            stop = len(text)
+            break
+    if start < stop:
+        yield Text, text[start:stop]
+
+
+def lex(lexer: Lexer, text: str,
+        taken: Optional[List[Checkpoint]] = None) -> Iterator[Token]:
+    """Return the unfiltered tokens of the preprocessed text, appending the
+    checkpoints taken to the given list, if any. If the relative setting
+    allows so, lex it in a worker process, falling back to plain text if
+    that exceeds the limits of the sandbox.
+    """
+    if taken is None:
+        taken = []
+    interval = constants.CHECKPOINT_INTERVAL
+    if not constants.SANDBOX:
+        return checkpoints.checkpointed_tokens(lexer, text, interval, taken)
+
+    try:
+        tokens, result = run(_lex, lexers.lexer_name(lexer), text, interval)
+    except LimitExceeded:
+        logger.warning('Lexing by %s exceeded the sandbox limits', lexer.name)
+        taken.append(START)
+        return iter([(Text, text)])
+    taken.extend(result)
+    if isinstance(tokens, bytes):
+        return decode(tokens, text)
+    return _typed(tokens)
+
+
+def take_checkpoints(lexer: Lexer, text: str,
+                     interval: int) -> List[Checkpoint]:
+    """Lex the whole of the preprocessed text and return the checkpoints
+    taken every `interval` lines, in a worker process if the relative setting
+    allows so.
+    """
+    if not constants.SANDBOX:
+        return checkpoints.take_checkpoints(lexer, text, interval)
+
+    try:
+        return run(_take_checkpoints, lexers.lexer_name(lexer), text, interval)
+    except LimitExceeded:
+        logger.warning('Lexing by %s exceeded the sandbox limits', lexer.name)
+        return [START]
+
+
+def line_tokens(lexer: Lexer, text: str, taken: List[Checkpoint], first: int,
+                last: int) -> Iterator[Token]:
+    """Return the filtered tokens of lines `first` through `last` of the
+    preprocessed text, lexing it from the last checkpoint before them, in a
+    worker process if the relative setting allows so. Fall back to plain
+    text if that exceeds the limits of the sandbox.
+    """
+    if not constants.SANDBOX:
+        return checkpoints.line_tokens(lexer, text, taken, first, last)
+
+    try:
+        tokens = run(_line_tokens, lexers.lexer_name(lexer), text, taken,
+                     first, last)
+    except LimitExceeded:
+        logger.warning('Lexing by %s exceeded the sandbox limits', lexer.name)
+        return _plain_lines(text, taken, first, last)
+    return _typed(tokens)
+
+
+def guess_language(content: str, filename: str = '') -> str:
+    """Return the name of the lexer for the content, as `guess_language` in
+    `paste.lexers` does. If the content exceeds the relative settings in size
+    or line count, try the cheap detection tiers alone, else guess in a
+    worker process if the relative setting allows so. Fall back to plain text
+    if no language is found that way.
+    """
+    if content_within_limits(content):
+        if not constants.SANDBOX:
+            return lexers.guess_language(content, filename)
+        try:
+            return run(lexers.guess_language, content, filename)
+        except LimitExceeded:
+            logger.warning('Guessing language exceeded the sandbox limits')
+    return lexers.detect_language(content, filename).language or 'text'
@@ -0,0 +1,181 @@
+import logging
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+from django.db import DatabaseError, connections, router
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import FloatField, Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+from paste import constants
+from paste.models import Snippet
+
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'paste_snippet_search'
+
+# Relative weights of the title and the content of snippets, when ranking
+# SQLite matches by BM25.
+_WEIGHTS = (10.0, 1.0)
+
+_TERM_RE = re.compile(r'\w+')
+
+# Whether the index table exists, by database alias.
+_indexed: Dict[str, bool] = {}
+
+# The first SQLite version able to delete rows from contentless FTS5 tables.
+_CONTENTLESS_DELETE = (3, 43, 0)
+
+
+def _connection(using: Optional[str] = None) -> BaseDatabaseWrapper:
+    """Return the connection to the database snippets are written to, or
+    the given one.
+    """
+    return connections[using or router.db_for_write(Snippet)]
+
+
+def backend(using: Optional[str] = None) -> Optional[str]:
+    """Return the vendor of the database snippets are written to, or the
+    given one, if the relative setting allows so and the index is available
+    there, else None.
+    """
+    connection = _connection(using)
+    if not constants.SEARCH_INDEX or connection.vendor not in [
+            'sqlite', 'postgresql']:
+        return None
+    if connection.alias not in _indexed:
+        _indexed[connection.alias] = (
+            TABLE in connection.introspection.table_names())
+        if not _indexed[connection.alias]:
+            logger.warning(
+                'Search index missing from database %r, to be created by '
+                'the migrate or refreshsnippets search commands',
+                connection.alias)
+    return connection.vendor if _indexed[connection.alias] else None
+
+
+def create_index(using: str) -> None:
+    """Create the index in the given database if missing and supported
+    there: an FTS5 table on SQLite, contentless where SQLite can delete rows
+    from such tables, a table of `tsvector` values with a GIN index on
+    PostgreSQL.
+    """
+    connection = connections[using]
+    _indexed.pop(connection.alias, None)
+    if not constants.SEARCH_INDEX:
+        return
+
+    if connection.vendor == 'sqlite':
+        options = ''
+        if sqlite3.sqlite_version_info >= _CONTENTLESS_DELETE:
+            options = ", content='', contentless_delete=1"
+        statements = [
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} '
+            f'USING fts5(title, content{options})',
+        ]
+    elif connection.vendor == 'postgresql':
+        statements = [
+            f'CREATE TABLE IF NOT EXISTS {TABLE} '
+            f'(snippet_id bigint PRIMARY KEY, document tsvector NOT NULL)',
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_document '
+            f'ON {TABLE} USING GIN (document)',
+        ]
+    else:
+        return
+
+    try:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    except DatabaseError:
+        logger.warning('Search index not supported by database %r', using,
+                       exc_info=True)
+
+
+def _document(snippet: Snippet) -> List[str]:
+    """Return the title and the indexed part of the content of the snippet.
+    """
+    return [snippet.title,
+            str(snippet.content)[:constants.SEARCH_CONTENT_LENGTH]]
+
+
+def update_index(snippets: Iterable[Snippet],
+                 using: Optional[str] = None) -> None:
+    """Index the title and content of the snippets anew."""
+    vendor = backend(using)
+    if vendor is None:
+        return
+
+    snippets = list(snippets)
+    with _connection(using).cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {TABLE} (rowid, title, content) '
+                f'VALUES (%s, %s, %s)',
+                [[snippet.pk, *_document(snippet)] for snippet in snippets])
+        else:
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (snippet_id, document) VALUES (%s, '
+                f"setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                f'ON CONFLICT (snippet_id) '
+                f'DO UPDATE SET document = EXCLUDED.document',
+                [[snippet.pk, constants.SEARCH_CONFIG, title,
+                  constants.SEARCH_CONFIG, content]
+                 for snippet in snippets
+                 for title, content in [_document(snippet)]])
+
+
+def remove_from_index(pks: Iterable[int],
+                      using: Optional[str] = None) -> None:
+    """Drop the snippets with the given IDs from the index."""
+    vendor = backend(using)
+    if vendor is None:
+        return
+
+    column = 'rowid' if vendor == 'sqlite' else 'snippet_id'
+    with _connection(using).cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE {column} = %s',
+                           [[pk] for pk in pks])
+
+
+def search(queryset: QuerySet, query: str) -> QuerySet:
+    """Return the snippets of the queryset matching all the terms of the
+    query, best matches first, through the index if available. Else, return
+    those whose title or content contains every term, newest first.
+    """
+    terms = _TERM_RE.findall(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = backend(queryset.db)
+    snippet_id = f'{Snippet._meta.db_table}.{Snippet._meta.pk.column}'
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"' for term in terms)
+        weights = ', '.join(map(str, _WEIGHTS))
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [match],
+        )).annotate(rank=RawSQL(
+            f'SELECT bm25({TABLE}, {weights}) FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s AND rowid = {snippet_id}', [match],
+            output_field=FloatField(),
+        )).order_by('rank', '-created')
+    if vendor == 'postgresql':
+        tsquery = 'plainto_tsquery(%s::regconfig, %s)'
+        params = [constants.SEARCH_CONFIG, ' '.join(terms)]
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT snippet_id FROM {TABLE} WHERE document @@ {tsquery}',
+            params,
+        )).annotate(rank=RawSQL(
+            f'SELECT ts_rank_cd(document, {tsquery}) FROM {TABLE} '
+            f'WHERE snippet_id = {snippet_id}', params,
+            output_field=FloatField(),
+        )).order_by('-rank', '-created')
+
+    query_filter = Q()
+    for term in terms:
+        query_filter &= (Q(title__icontains=term) | Q(content__icontains=term)
+                         | Q(blob__content__icontains=term))
+    return queryset.filter(query_filter).order_by('-created')
@@ -1,7 +1,132 @@
-from rest_framework import serializers
+from typing import Any, Dict, List, Optional, Sequence
 
-from paste import constants
-from paste.models import Snippet
+from django.db import connections, router, transaction
+
+from rest_framework import serializers, status
+
+from paste import constants, search
+from paste.models import Rendering, Snippet
+from paste.rendering import build_rendering, prerender
+
+
+def _can_return_bulk_pks() -> bool:
+    """Return whether the database snippets are written to sets the primary
+    keys of bulk created rows.
+    """
+    features = connections[router.db_for_write(Snippet)].features
+    return getattr(
+        features, 'can_return_rows_from_bulk_insert',
+        getattr(features, 'can_return_ids_from_bulk_insert', False))
+
+
+def item_failure(status_code: int, errors: Any) -> Dict[str, Any]:
+    """Return the result of a batch item that could not be written."""
+    return {'status': status_code, 'errors': errors}
+
+
+class SnippetBatchSerializer(serializers.ListSerializer):
+    """Serializer of snippet batches. Each item is validated and written on
+    its own account, so that an invalid one does not hold back the rest, and
+    its outcome gets reported in `results`.
+    """
+
+    child: 'SnippetSerializer'
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Initialize, with no results yet."""
+        super().__init__(*args, **kwargs)
+        self.results: List[Dict[str, Any]] = []
+
+    def to_internal_value(self, data: Any) -> List[Optional[dict]]:
+        """Validate each item against its instance, if any. Record the errors
+        of the invalid ones, which are left as None.
+        """
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        instances = self.instance or [None] * len(data)
+        self.results = [{}] * len(data)
+        validated_data: List[Optional[dict]] = []
+        for index, (instance, item) in enumerate(zip(instances, data)):
+            self.child.instance = instance
+            try:
+                validated_data.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                validated_data.append(None)
+                self.results[index] = item_failure(
+                    status.HTTP_400_BAD_REQUEST, exc.detail)
+        self.child.instance = None
+        return validated_data
+
+    def save(self, **kwargs) -> List[Snippet]:
+        """Write the valid items, along with any given attributes, and return
+        the resulting instances.
+        """
+        validated_data = [
+            None if attrs is None else {**attrs, **kwargs}
+            for attrs in self.validated_data]
+        if self.instance is not None:
+            self.instance = self.update(self.instance, validated_data)
+        else:
+            self.instance = self.create(validated_data)
+        return self.instance
+
+    def create(self, validated_data: List[Optional[dict]]) -> List[Snippet]:
+        """Create the valid items, unless current user is anonymous and they
+        are trying to create private ones, in a single query if the database
+        allows so, indexing them for search. Prerender them if the relative
+        setting allows so.
+        """
+        created = {}
+        for index, attrs in enumerate(validated_data):
+            if attrs is None:
+                continue
+            try:
+                self.child.check_private(attrs)
+            except serializers.ValidationError as exc:
+                self.results[index] = item_failure(
+                    status.HTTP_400_BAD_REQUEST, exc.detail)
+                continue
+            instance = Snippet(**attrs)
+            instance.update_derived_fields()
+            created[index] = instance
+
+        with transaction.atomic():
+            if _can_return_bulk_pks():
+                Snippet.objects.bulk_create(created.values())
+                search.update_index(created.values())
+            else:
+                for instance in created.values():
+                    instance.save()
+            if constants.PRERENDER:
+                Rendering.objects.bulk_create(
+                    build_rendering(instance) for instance in created.values())
+
+        for index, instance in created.items():
+            self.results[index] = {
+                'status': status.HTTP_201_CREATED,
+                'data': self.child.to_representation(instance),
+            }
+        return list(created.values())
+
+    def update(self, instances: List[Snippet],
+               validated_data: List[Optional[dict]]) -> List[Snippet]:
+        """Update the instances of the valid items in a single transaction,
+        then prerender them if the relative setting allows so.
+        """
+        updated = {}
+        with transaction.atomic():
+            for index, (instance, attrs) in enumerate(
+                    zip(instances, validated_data)):
+                if attrs is not None:
+                    updated[index] = self.child.update(instance, attrs)
+
+        for index, instance in updated.items():
+            self.results[index] = {
+                'status': status.HTTP_200_OK,
+                'data': self.child.to_representation(instance),
+            }
+        return list(updated.values())
 
 
 class SnippetSerializer(serializers.ModelSerializer):
@@ -9,16 +134,49 @@ class SnippetSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Snippet
-        fields = '__all__'
+        exclude = ['blob']
         read_only_fields = ['owner']
+        list_serializer_class = SnippetBatchSerializer
 
-    def create(self, validated_data: dict) -> Snippet:
+    def check_private(self, validated_data: dict) -> None:
         """Check that if current user is anonymous they are not trying to
-        create a private snippet, then create new instance.
+        create a private snippet.
         """
         if (self.context['request'].user.is_anonymous
                 and validated_data.get('private', constants.DEFAULT_PRIVATE)):
             raise serializers.ValidationError(
                 'anonymous users cannot create private snippets')
 
-        return super().create(validated_data)
+    def create(self, validated_data: dict) -> Snippet:
+        """Check the privacy of the snippet to create, then create new
+        instance and prerender it if the relative setting allows so.
+        """
+        self.check_private(validated_data)
+        instance = super().create(validated_data)
+        if constants.PRERENDER:
+            prerender(instance)
+        return instance
+
+    def update(self, instance: Snippet, validated_data: dict) -> Snippet:
+        """Update the instance, then prerender it if the relative setting
+        allows so.
+        """
+        instance = super().update(instance, validated_data)
+        if constants.PRERENDER:
+            prerender(instance)
+        return instance
+
+
+class SnippetListSerializer(SnippetSerializer):
+    """Snippet model serializer for lists, leaving the content out, unless
+    specific fields are asked for.
+    """
+
+    def __init__(self, *args, fields: Optional[Sequence[str]] = None,
+                 **kwargs) -> None:
+        """Keep only the given fields, if any, else all but the content."""
+        super().__init__(*args, **kwargs)
+        excluded = {'content'} if fields is None else {
+            name for name in self.fields.keys() if name not in fields}
+        for name in excluded:
+            self.fields.pop(name)
@@ -0,0 +1,52 @@
+from typing import Any, Dict, Optional
+
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from paste import cache, metrics, search
+from paste.models import Snippet
+
+
+_INDEXED_FIELDS = {'title', 'content'}
+
+
+@receiver(post_delete, sender=Snippet)
+def invalidate_highlight(sender: type, instance: Snippet, **kwargs) -> None:
+    """Drop the cached highlighted content of a deleted snippet. Content
+    cached before a snippet gets saved needs no such handling, as it is
+    superseded by the new `updated` value being part of the cache key.
+    """
+    cache.invalidate(instance)
+
+
+@receiver(post_save, sender=Snippet)
+def update_search_index(sender: type, instance: Snippet, using: str,
+                        update_fields: Any = None, **kwargs) -> None:
+    """Index a saved snippet anew, unless neither its title nor its content
+    was saved.
+    """
+    if update_fields is None or _INDEXED_FIELDS.intersection(update_fields):
+        search.update_index([instance], using)
+
+
+@receiver(post_delete, sender=Snippet)
+def remove_from_search_index(sender: type, instance: Snippet, using: str,
+                             **kwargs) -> None:
+    """Drop a deleted snippet from the search index."""
+    search.remove_from_index([instance.pk], using)
+
+
+@receiver(post_migrate)
+def create_search_index(sender: AppConfig, using: str, **kwargs) -> None:
+    """Create the search index, if missing, once the app's tables are."""
+    if sender.name == 'paste':
+        search.create_index(using)
+
+
+@receiver(metrics.request_timed)
+def aggregate_metrics(sender: type, action: Optional[str], status: int,
+                      seconds: float, stages: Dict[str, float],
+                      size: Optional[int], **kwargs) -> None:
+    """Count a timed request to a snippet view in the in-process metrics."""
+    metrics.aggregator.observe(action, status, seconds, stages, size)
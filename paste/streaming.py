@@ -0,0 +1,188 @@
+import contextvars
+import queue
+import re
+import threading
+from contextlib import ExitStack
+from typing import (Any, ContextManager, Iterable, Iterator, List, Optional,
+                    Tuple)
+
+from pygments.formatters import HtmlFormatter
+
+
+# Characters of content encoded at a time.
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+_NON_ASCII_RE = re.compile(r'[^\x00-\x7f]')
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a requested byte range lies outside the content."""
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Return the start and stop of the single byte range the Range header
+    value asks for out of the given size, or None if it is malformed or asks
+    for several ranges. Raise RangeNotSatisfiable if the range lies outside
+    the content.
+    """
+    match = _RANGE_RE.fullmatch(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        stop = min(int(last) + 1, size) if last else size
+        if last and int(last) < start:
+            return None
+    elif last:
+        start, stop = max(size - int(last), 0), size
+        if not int(last):
+            raise RangeNotSatisfiable
+    else:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, stop
+
+
+def is_ascii(content: str) -> bool:
+    """Return whether every character of the content is ASCII, and so gets
+    encoded as a single byte.
+    """
+    if hasattr(content, 'isascii'):
+        return content.isascii()
+    return _NON_ASCII_RE.search(content) is None
+
+
+def encoded_size(content: str) -> int:
+    """Return the size of the UTF-8 encoded content, encoding a chunk of it
+    at a time if it is not ASCII.
+    """
+    if is_ascii(content):
+        return len(content)
+    return sum(len(content[position:position + CHUNK_SIZE].encode())
+               for position in range(0, len(content), CHUNK_SIZE))
+
+
+def encoded_chunks(content: str, start: int = 0,
+                   stop: Optional[int] = None) -> Iterator[bytes]:
+    """Yield the bytes of the UTF-8 encoded content from `start` up to
+    `stop`, or its end, encoding a chunk of it at a time.
+    """
+    if is_ascii(content):
+        if stop is None:
+            stop = len(content)
+        # Every character is encoded as a single byte.
+        for position in range(start, stop, CHUNK_SIZE):
+            yield content[
+                position:min(position + CHUNK_SIZE, stop)].encode()
+        return
+
+    offset = 0
+    for position in range(0, len(content), CHUNK_SIZE):
+        if stop is not None and offset >= stop:
+            return
+        chunk = content[position:position + CHUNK_SIZE].encode()
+        end = offset + len(chunk)
+        if end > start:
+            yield chunk[max(start - offset, 0):(
+                None if stop is None else stop - offset)]
+        offset = end
+
+
+class _Closed(Exception):
+    """Raised to stop formatting once its output is no longer wanted."""
+
+
+# Put once formatting is done, after the last chunk.
+_DONE = object()
+
+
+class ChunkingOutfile:
+    """File the output of a formatter is written to, handing it over a chunk
+    of about CHUNK_SIZE characters at a time through a bounded queue, so that
+    the formatter waits for chunks to be taken before writing more.
+    """
+
+    def __init__(self, chunks: 'queue.Queue[Any]') -> None:
+        self.chunks = chunks
+        self.pieces: List[str] = []
+        self.length = 0
+        self.closed = False
+
+    def write(self, piece: str) -> None:
+        """Add the piece to current chunk, handing it over once long enough.
+        """
+        self.pieces.append(piece)
+        self.length += len(piece)
+        if self.length >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Hand over current chunk, if any."""
+        if self.pieces:
+            self.put(''.join(self.pieces))
+            self.pieces = []
+            self.length = 0
+
+    def put(self, item: Any) -> None:
+        """Hand over the item, waiting for room in the queue. Raise _Closed
+        if the output is no longer wanted.
+        """
+        while not self.closed:
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise _Closed
+
+
+class StreamingHtmlFormatter(HtmlFormatter):
+    """HTML formatter able to yield its output a chunk at a time, rather than
+    writing it to a file.
+    """
+
+    def stream(self, tokensource: Iterable[Tuple[Any, str]],
+               timer: Optional[ContextManager[Any]] = None) -> Iterator[str]:
+        """Yield the formatted tokens a chunk at a time, as `format` writes
+        them, formatting them in a thread meanwhile, within the given context
+        manager, if any. Line numbers in a table are not supported, as they
+        need the whole output to be rendered first.
+        """
+        if not self.nowrap and self.linenos == 1:
+            raise ValueError('table line numbers cannot be streamed')
+
+        chunks: 'queue.Queue[Any]' = queue.Queue(maxsize=2)
+        outfile = ChunkingOutfile(chunks)
+
+        def produce() -> None:
+            result: Any = _DONE
+            try:
+                with timer or ExitStack():
+                    self.format(tokensource, outfile)
+                    outfile.flush()
+            except _Closed:
+                return
+            except Exception as error:
+                result = error
+            try:
+                outfile.put(result)
+            except _Closed:
+                pass
+
+        thread = threading.Thread(
+            target=contextvars.copy_context().run, args=[produce],
+            daemon=True)
+        thread.start()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _DONE:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            outfile.closed = True
@@ -0,0 +1,177 @@
+import math
+from abc import ABCMeta, abstractmethod
+from typing import TYPE_CHECKING, List, Optional
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.exceptions import ValidationError
+
+from rest_framework.request import Request
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework.views import APIView
+
+from paste import constants
+from paste.models import Snippet
+
+
+if TYPE_CHECKING:
+    from paste.views import SnippetViewSet
+
+
+def consume(cache: BaseCache, key: str, cost: int, capacity: int,
+            duration: int, now: float) -> float:
+    """Take `cost` tokens out of the bucket stored in the cache under the
+    key, holding up to `capacity` tokens and refilled with as many every
+    `duration` seconds. Return 0 if taken, else the seconds until they would
+    be.
+
+    The bucket is stored as the time, in milliseconds, it will be full again.
+    Taking tokens moves it forward by a single atomic increment, from now on
+    if already full, so that concurrent requests are never let through
+    together beyond its capacity. If another request moved it meanwhile, the
+    increment is corrected by as much as it was off.
+    """
+    weight = math.ceil(cost * duration * 1000 / capacity)
+    limit = duration * 1000
+    moment = int(now * 1000)
+    seen = cache.get(key)
+    if seen is None and cache.add(key, moment + weight, duration):
+        return 0.0
+
+    catch_up = max(moment - seen, 0) if seen is not None else 0
+    try:
+        full = cache.incr(key, catch_up + weight)
+    except ValueError:
+        cache.set(key, moment + weight, duration)
+        return 0.0
+    before = full - catch_up - weight
+    # Nonzero only if another request moved the bucket since seen.
+    excess = before + catch_up - max(before, moment)
+    full -= excess
+
+    if full - moment > limit:
+        cache.decr(key, excess + weight)
+        return (full - moment - limit) / 1000
+    if excess:
+        cache.decr(key, excess)
+    if hasattr(cache, 'touch'):
+        cache.touch(key, duration)
+    return 0.0
+
+
+class CostRateThrottle(SimpleRateThrottle, metaclass=ABCMeta):
+    """Throttle of the given actions of snippet views, charging each request
+    a token per as many bytes of content as the relative setting indicates,
+    out of a token bucket per client. The size of the bucket and its refill
+    rate are given by the rate of the relative setting, for anonymous or
+    authenticated users, named after the `kind` of the throttle.
+    """
+
+    cache_format = 'paste:throttle:%(scope)s:%(ident)s'
+    actions: List[str] = []
+    kind = ''
+    scope: str
+    num_requests: int
+    duration: int
+
+    def __init__(self) -> None:
+        """Do nothing, as the rate depends on the request."""
+
+    def get_rate(self) -> Optional[str]:
+        """Return the rate of current scope, if set."""
+        return constants.THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request: Request, view: APIView) -> str:
+        """Return the key of the client's bucket, by user if authenticated,
+        else by IP address.
+        """
+        if request.user.is_authenticated:
+            ident = str(request.user.pk)
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    @abstractmethod
+    def get_size(self, request: Request, view: APIView) -> int:
+        """Return the size, in bytes, of the content the request involves."""
+
+    def get_cost(self, request: Request, view: APIView) -> int:
+        """Return the number of tokens the request costs, at least one and at
+        most as many as the bucket holds.
+        """
+        size = self.get_size(request, view)
+        cost = math.ceil(size / constants.THROTTLE_UNIT)
+        return min(max(cost, 1), self.num_requests)
+
+    def allow_request(self, request: Request, view: APIView) -> bool:
+        """Take the tokens the request costs out of the client's bucket, if
+        enough are left. Allow requests to other actions, and any request if
+        no rate is set for the client.
+        """
+        self.remaining = 0.0
+        if getattr(view, 'action', None) not in self.actions:
+            return True
+
+        user = 'user' if request.user.is_authenticated else 'anon'
+        self.scope = f'{user}_{self.kind}'
+        self.rate = self.get_rate()
+        num_requests, duration = self.parse_rate(self.rate)
+        if num_requests is None or duration is None:
+            return True
+
+        self.num_requests, self.duration = num_requests, duration
+        self.remaining = consume(
+            caches[constants.THROTTLE_CACHE],
+            self.get_cache_key(request, view),
+            self.get_cost(request, view), self.num_requests, self.duration,
+            self.timer())
+        return not self.remaining
+
+    def wait(self) -> Optional[float]:
+        """Return the seconds until the request would be allowed."""
+        return self.remaining
+
+
+class CreateThrottle(CostRateThrottle):
+    """Throttle of snippet creation, single or in batches, charging requests
+    by the size of their body.
+    """
+
+    actions = ['create', 'bulk_create']
+    kind = 'create'
+
+    def get_size(self, request: Request, view: APIView) -> int:
+        """Return the size of the request's body, as the client declares it,
+        else, as for chunked uploads, as read.
+        """
+        try:
+            return int(request.META['CONTENT_LENGTH'])
+        except (KeyError, ValueError):
+            return len(request.body)
+
+    def allow_request(self, request: Request, view: APIView) -> bool:
+        """Throttle snippet creation, but not batch updates or deletions."""
+        if request.method != 'POST':
+            self.remaining = 0.0
+            return True
+        return super().allow_request(request, view)
+
+
+class HighlightThrottle(CostRateThrottle):
+    """Throttle of snippet highlighting, charging requests by the size of
+    the snippet's content.
+    """
+
+    actions = ['highlight']
+    kind = 'highlight'
+
+    def get_size(self, request: Request, view: 'SnippetViewSet') -> int:
+        """Return the size of the queried snippet's content, or 0 if it does
+        not exist, leaving it for the view to respond so.
+        """
+        try:
+            size = Snippet.objects.filter(**view.get_lookup()).values_list(
+                'size', flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            return 0
+        return size or 0
@@ -0,0 +1,53 @@
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from pygments.token import string_to_tokentype
+
+from paste.checkpoints import Token
+
+
+def token_name(token: Any) -> str:
+    """Return the name of the token type, without the leading `Token`."""
+    return '.'.join(token)
+
+
+def encode(tokens: Iterable[Token], text: str) -> Optional[bytes]:
+    """Return the tokens of the preprocessed text in compact form: the names
+    of their types, and the run-length encoded index of each type along with
+    the length of its run, as compressed JSON. Return None if the tokens do
+    not cover the text as is, so that they cannot be told by length alone.
+    """
+    types: Dict[Any, int] = {}
+    runs: List[int] = []
+    last = None
+    offset = 0
+    for token, value in tokens:
+        if not value:
+            continue
+        if not text.startswith(value, offset):
+            return None
+        offset += len(value)
+        index = types.setdefault(token, len(types))
+        if index == last:
+            runs[-1] += len(value)
+        else:
+            runs += [index, len(value)]
+            last = index
+    if offset != len(text):
+        return None
+
+    names = [token_name(token) for token in types]
+    data = json.dumps([names, runs], separators=(',', ':'))
+    return zlib.compress(data.encode())
+
+
+def decode(data: bytes, text: str) -> Iterator[Token]:
+    """Yield the tokens of the preprocessed text, as encoded."""
+    names, runs = json.loads(zlib.decompress(data).decode())
+    types = [string_to_tokentype(name) for name in names]
+    offset = 0
+    for i in range(0, len(runs), 2):
+        length = runs[i + 1]
+        yield types[runs[i]], text[offset:offset + length]
+        offset += length
@@ -2,11 +2,18 @@ from django.urls import include, path
 
 from rest_framework.routers import DefaultRouter
 
-from paste import views
+from paste import constants, views
 
 
+if constants.ASYNC_VIEWS:
+    from paste.async_views import AsyncSnippetViewSet as SnippetViewSet
+else:
+    SnippetViewSet = views.SnippetViewSet  # type: ignore
+
 router = DefaultRouter()
-router.register('', views.SnippetViewSet)
+router.register('styles', views.StyleViewSet, basename='style')
+router.register('metrics', views.MetricsViewSet, basename='metrics')
+router.register('', SnippetViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
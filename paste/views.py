@@ -1,21 +1,49 @@
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type, cast
+
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import router
 from django.db.models import Q, QuerySet
+from django.db.models.deletion import Collector
+from django.http import (Http404, HttpRequest, HttpResponse,
+                         StreamingHttpResponse)
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
-from rest_framework import viewsets
+from rest_framework import exceptions, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.renderers import StaticHTMLRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
 
-from pygments import highlight
-from pygments.formatters import HtmlFormatter
-from pygments.lexers import get_lexer_by_name, guess_lexer
-
-from paste import constants
+from paste import cache, constants, metrics, search
+from paste.choices import style_names
+from paste.filters import LIST_ACTIONS, SnippetFilter
 from paste.models import Snippet
-from paste.permissions import SnippetPermissions
-from paste.serializers import SnippetSerializer
+from paste.pagination import (BranchedQuerySet, SearchPagination,
+                              SnippetPagination)
+from paste.permissions import SnippetPermissions, StylePermissions
+from paste.renderers import CSSRenderer, PlainTextRenderer
+from paste.rendering import get_stylesheet, render_chunks
+from paste.serializers import (SnippetBatchSerializer, SnippetListSerializer,
+                               SnippetSerializer, item_failure)
+from paste.streaming import (RangeNotSatisfiable, encoded_chunks, encoded_size,
+                             parse_range)
+from paste.throttles import CreateThrottle, HighlightThrottle
+from paste.tokens import token_name
+
+
+_CONDITIONAL_HEADERS = [
+    'HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH',
+    'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_UNMODIFIED_SINCE',
+]
+
+_LINES_RE = re.compile(r'(\d+)(?:-(\d+))?')
 
 
 class SnippetViewSet(viewsets.ModelViewSet):
@@ -24,28 +52,275 @@ class SnippetViewSet(viewsets.ModelViewSet):
     - Snippet list: / (GET/POST)
     - Snippet detail: /{snippet-id}/ (GET/PUT/PATCH/DELETE)
     - User snippet list: /user/{user-id}/ (GET)
+    - Snippet search: /search/?q={terms} (GET)
     - Snippet highlight: /{snippet-id}/highlight/ (GET)
+    - Snippet raw content: /{snippet-id}/raw/ (GET)
+    - Snippet tokens: /{snippet-id}/tokens/ (GET)
+    - Snippet batch: /bulk/ (POST/PATCH/DELETE)
     """
 
     queryset = Snippet.objects.all()
     serializer_class = SnippetSerializer
     permission_classes = [SnippetPermissions]
+    pagination_class = SnippetPagination
+    filter_backends = [SnippetFilter]
+    throttle_classes = [*viewsets.ModelViewSet.throttle_classes,
+                        CreateThrottle, HighlightThrottle]
+
+    def initialize_request(self, request: HttpRequest, *args,
+                           **kwargs) -> Request:
+        """Begin timing the stages of current request, if the relative setting
+        allows so.
+        """
+        self.timings = metrics.start()
+        return super().initialize_request(request, *args, **kwargs)
+
+    def finalize_response(self, request: Request, response: Response,
+                          *args, **kwargs) -> Response:
+        """Send the signal of current request done, with its timings, if
+        timed, once the response is streamed if so.
+        """
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        metrics.finish(getattr(self, 'timings', None), type(self),
+                       self.action, response)
+        return response
 
     def get_queryset(self) -> QuerySet:
         """If current user is staff return all snippets. Else, return those
-        owned by current user and, if the relative setting allows so, all the
-        public ones.
+        matching any of the visibility filters. Fetch stored renderings
+        along, if needed. For lists, fetch only the fields to be returned.
+        """
+        queryset = self.get_unrestricted_queryset()
+        visibility = self.get_visibility()
+        if visibility is None:
+            return queryset
+
+        query = Q(pk__in=[])
+        for branch in visibility:
+            query |= branch
+        return queryset.filter(query)
+
+    def get_unrestricted_queryset(self) -> QuerySet:
+        """Return all the snippets, fetching stored renderings along, if
+        needed. For lists, fetch only the fields to be returned, along with
+        the blobs of their content, if any.
         """
         queryset = super().get_queryset()
+        if self.action == 'highlight' and constants.PRERENDER:
+            return queryset.select_related('rendering')
+        if self.action in LIST_ACTIONS:
+            fields = self.get_list_fields()
+            if fields is None:
+                return queryset.defer('content')
+            names = {field.name for field in Snippet._meta.concrete_fields}
+            names.intersection_update(fields)
+            if 'content' in names:
+                # Content stored in a blob is read from there.
+                names.add('blob')
+                queryset = queryset.select_related('blob')
+            return queryset.only(*names)
+        return queryset
+
+    def get_visibility(self) -> Optional[List[Q]]:
+        """Return the filters of the snippets current user can view, any of
+        which they must match: the public ones, if the relative setting
+        allows so, and their own, if authenticated. Return None if current
+        user is staff, viewing all of them.
+        """
         user = self.request.user
         if user.is_staff:
-            return queryset
+            return None
 
-        query = Q(private=False) if constants.LIST_FOREIGN else Q(pk__in=[])
+        # Compare through `in`, as an exact comparison to False compiles to
+        # `NOT private` on some backends, which indexes cannot serve.
+        visibility = ([Q(private__in=[False])] if constants.LIST_FOREIGN
+                      else [])
         if user.is_authenticated:
-            query |= Q(owner=user)
+            visibility.append(Q(owner=user))
+        return visibility
 
-        return queryset.filter(query)
+    def get_list_fields(self) -> Optional[List[str]]:
+        """Return the fields asked for by the `fields` query parameter, as a
+        comma-separated list, if given.
+        """
+        fields = self.request.query_params.get('fields')
+        if fields is None:
+            return None
+        return [name.strip() for name in fields.split(',') if name.strip()]
+
+    def get_serializer_class(self) -> Type[BaseSerializer]:
+        """Use the lightweight serializer for lists."""
+        if self.action in LIST_ACTIONS:
+            return SnippetListSerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs) -> BaseSerializer:
+        """Return a serializer instance, passing the fields asked for to the
+        lightweight one used for lists.
+        """
+        if self.action in LIST_ACTIONS:
+            kwargs.setdefault('fields', self.get_list_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_batch_serializer(self, *args, **kwargs) -> SnippetBatchSerializer:
+        """Return a serializer instance for a batch of snippets."""
+        return cast(SnippetBatchSerializer,
+                    self.get_serializer(*args, many=True, **kwargs))
+
+    def get_lookup(self) -> Dict[str, Any]:
+        """Return the filter the queried snippet is looked up by."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+    def get_version_queryset(self) -> QuerySet:
+        """Return the queryset of the snippets current user can access, with
+        only the fields needed to check permissions and tell their version
+        loaded.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset.select_related(None).only(
+            'updated', 'private', 'owner', 'size')
+
+    def get_version(self) -> Snippet:
+        """Return the queried snippet, with only the fields needed to check
+        permissions and tell its version loaded.
+        """
+        with metrics.stage('fetch'):
+            instance = get_object_or_404(
+                self.get_version_queryset(), **self.get_lookup())
+            self.check_object_permissions(self.request, instance)
+        metrics.annotate(size=instance.size)
+        return instance
+
+    def get_object(self) -> Snippet:
+        """Return the queried snippet, after checking permissions, timing its
+        fetching.
+        """
+        with metrics.stage('fetch'):
+            instance = super().get_object()
+        metrics.annotate(size=instance.size)
+        return instance
+
+    def paginate_queryset(self, queryset: QuerySet) -> Optional[List[Any]]:
+        """Return a page of the queryset, if paginated, timing its fetching.
+        If current user views snippets matching any of several visibility
+        filters, seek the page among those matching each one through its own
+        index, rather than sorting all of them.
+        """
+        visibility = self.get_visibility() or []
+        if (isinstance(self.paginator, SnippetPagination)
+                and len(visibility) > 1):
+            # The paginator only orders, filters and slices the queryset.
+            queryset = cast(QuerySet, BranchedQuerySet(
+                queryset, visibility, self.get_unrestricted_queryset()))
+        with metrics.stage('fetch'):
+            return super().paginate_queryset(queryset)
+
+    def get_version_headers(self, instance: Snippet) -> Dict[str, str]:
+        """Return the ETag and Last-Modified headers of the representation
+        of the snippet current request is after.
+        """
+        request = self.request
+        variant = [instance.pk, instance.updated.isoformat()]
+        if self.action in ['highlight', 'tokens']:
+            variant += [constants.DEFAULT_LANGUAGE, constants.GUESS_LEXER]
+        if self.action == 'highlight':
+            variant += [
+                'full' in request.query_params,
+                request.query_params.get('lines'), constants.LINK_STYLESHEET,
+                constants.DEFAULT_STYLE, self.is_streamed(instance)]
+        else:
+            variant.append(request.accepted_renderer.format)
+
+        digest = hashlib.sha1(repr(variant).encode()).hexdigest()
+        return {
+            'ETag': f'"{digest}"',
+            'Last-Modified': http_date(instance.updated.timestamp()),
+        }
+
+    def is_conditional(self) -> bool:
+        """Return whether current request has any preconditions."""
+        return any(name in self.request.META for name in _CONDITIONAL_HEADERS)
+
+    def evaluate_preconditions(self) -> Optional[HttpResponseBase]:
+        """If current request is conditional, evaluate its preconditions
+        against the version of the queried snippet, fetched without its
+        content. Return the response to send if they are not met.
+        """
+        if not self.is_conditional():
+            return None
+        return self.check_preconditions(self.get_version())
+
+    def check_preconditions(
+            self, instance: Snippet) -> Optional[HttpResponseBase]:
+        """Evaluate the preconditions of current request against the given
+        version of the queried snippet. Return the response to send if they
+        are not met.
+        """
+        headers = self.get_version_headers(instance)
+        response = get_conditional_response(
+            self.request, etag=headers['ETag'],
+            last_modified=int(instance.updated.timestamp()))
+        if response is not None:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+    def get_line_range(self) -> Optional[Tuple[int, int]]:
+        """Return the first and last line asked for by the `lines` query
+        parameter, as a single line number or a range of them, if given.
+        """
+        lines = self.request.query_params.get('lines')
+        if lines is None:
+            return None
+        match = _LINES_RE.fullmatch(lines.strip())
+        if match is not None:
+            first = int(match.group(1))
+            last = int(match.group(2) or first)
+            if 0 < first <= last:
+                return first, last
+        raise exceptions.ValidationError(
+            {'lines': ['expected a line number or a range of them']})
+
+    def is_streamed(self, instance: Snippet) -> bool:
+        """Return whether the snippet's content is large enough to be
+        streamed, according to the relative setting. Measure it if its size
+        is not stored yet.
+        """
+        size = instance.size or encoded_size(instance.content)
+        return size > constants.STREAMING_THRESHOLD
+
+    def versioned(self, response: HttpResponseBase,
+                  instance: Snippet) -> HttpResponseBase:
+        """Add the version headers of the snippet to the response."""
+        for name, value in self.get_version_headers(instance).items():
+            response[name] = value
+        return response
+
+    def retrieve(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        """Return the queried snippet, unless the client's copy is fresh."""
+        response = self.evaluate_preconditions()
+        if response is not None:
+            return response
+
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return self.versioned(Response(serializer.data), instance)
+
+    def update(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        """Update the queried snippet, unless the client's copy is stale."""
+        response = self.evaluate_preconditions()
+        if response is not None:
+            return response
+
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(
+            instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return self.versioned(Response(serializer.data), instance)
 
     def perform_create(self, serializer: SnippetSerializer) -> None:
         """Store current user if authenticated, then create new instance."""
@@ -58,46 +333,276 @@ class SnippetViewSet(viewsets.ModelViewSet):
         serializer.save(**kwargs)
 
     @action(detail=True, renderer_classes=[StaticHTMLRenderer])
-    def highlight(self, request: Request, **kwargs) -> Response:
-        """Highlight and return the snippet's content as HTML. If `full`
-        exists as a query parameter, send a full HTML document.
+    def highlight(self, request: Request, **kwargs) -> HttpResponseBase:
+        """Highlight and return the snippet's content as HTML, unless the
+        client's copy is fresh. If `full` exists as a query parameter, send a
+        full HTML document. If `lines` does, send only the lines asked for.
+        Else, stream the content, highlighted as it is sent, if it exceeds
+        the relative setting in size.
         """
+        lines = self.get_line_range()
+        response = self.evaluate_preconditions()
+        if response is not None:
+            return response
+
+        instance = self.get_object()
+        full = 'full' in request.query_params
+        if lines is None and self.is_streamed(instance):
+            response = StreamingHttpResponse(
+                render_chunks(instance, full, self.get_namespace()),
+                content_type='text/html; charset=utf-8')
+        else:
+            response = Response(self.highlighted(instance, full, lines))
+        return self.versioned(response, instance)
+
+    def get_namespace(self) -> str:
+        """Return the URL namespace current request was resolved within, for
+        links to other views to be reversed within it.
+        """
+        match = self.request.resolver_match
+        return match.namespace if match is not None else ''
+
+    def highlighted(self, instance: Snippet, full: bool,
+                    lines: Optional[Tuple[int, int]]) -> str:
+        """Return the snippet's highlighted content, or just the given lines
+        of it, if any.
+        """
+        namespace = self.get_namespace()
+        if lines is not None:
+            return cache.highlight_lines(instance, full, *lines, namespace)
+        return cache.highlight(instance, full, namespace)
+
+    def get_batch(self) -> List[Any]:
+        """Return the items of current batch request, after checking their
+        number.
+        """
+        items = self.request.data
+        if not isinstance(items, list):
+            raise exceptions.ValidationError('expected a list of items')
+        if len(items) > constants.MAX_BATCH_SIZE:
+            raise exceptions.ValidationError(
+                f'batches cannot exceed {constants.MAX_BATCH_SIZE} items')
+        return items
+
+    def get_batch_instances(
+            self, ids: List[Any]) -> Tuple[List[Any], Dict[int, Snippet]]:
+        """Fetch the snippets with the given IDs in a single query. Return
+        the result of every ID which cannot be written, with None for the rest,
+        along with the snippets that can, by index.
+        """
+        valid_ids = [pk for pk in ids if type(pk) is int]
+        snippets = self.get_queryset().in_bulk(valid_ids)
+        results: List[Any] = [None] * len(ids)
+        instances = {}
+        for index, pk in enumerate(ids):
+            if type(pk) is not int:
+                results[index] = item_failure(
+                    status.HTTP_400_BAD_REQUEST,
+                    {'id': ['a valid integer is required']})
+            elif pk not in snippets:
+                results[index] = item_failure(
+                    status.HTTP_404_NOT_FOUND, {'detail': 'not found'})
+            else:
+                try:
+                    self.check_object_permissions(self.request, snippets[pk])
+                except exceptions.APIException as exc:
+                    results[index] = item_failure(
+                        exc.status_code, {'detail': exc.detail})
+                else:
+                    instances[index] = snippets[pk]
+        return results, instances
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request: Request, **kwargs) -> Response:
+        """Create the snippets of the list in the request body, storing
+        current user if authenticated. Return the result of each one.
+        """
+        serializer = self.get_batch_serializer(data=self.get_batch())
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        serializer.save(**({'owner': user} if user.is_authenticated else {}))
+        return Response(
+            serializer.results, status=status.HTTP_207_MULTI_STATUS)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request: Request, **kwargs) -> Response:
+        """Partially update the snippets of the list in the request body,
+        each one indicated by its `id`. Return the result of each one.
+        """
+        items = self.get_batch()
+        results, instances = self.get_batch_instances([
+            item.get('id') if isinstance(item, dict) else None
+            for item in items])
+        indices = list(instances)
+        serializer = self.get_batch_serializer(
+            list(instances.values()), data=[items[i] for i in indices],
+            partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        for index, result in zip(indices, serializer.results):
+            results[index] = result
+        return Response(results, status=status.HTTP_207_MULTI_STATUS)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request: Request, **kwargs) -> Response:
+        """Delete the snippets with the IDs listed in the request body, as
+        fetched to check permissions. Return the result of each one.
+        """
+        results, instances = self.get_batch_instances(self.get_batch())
+        collector = Collector(using=router.db_for_write(Snippet))
+        collector.collect(list(instances.values()))
+        collector.delete()
+        for index in instances:
+            results[index] = {'status': status.HTTP_204_NO_CONTENT}
+        return Response(results, status=status.HTTP_207_MULTI_STATUS)
+
+    @action(detail=True, renderer_classes=[PlainTextRenderer])
+    def raw(self, request: Request, **kwargs) -> HttpResponseBase:
+        """Return the snippet's content as plain text, unless the client's
+        copy is fresh. Serve the single byte range the Range header asks for,
+        if any, unless an If-Range header does not match the current version.
+        Stream the content if it exceeds the relative setting in size.
+        """
+        response = self.evaluate_preconditions()
+        if response is not None:
+            return response
+
         instance = self.get_object()
+        headers = self.get_version_headers(instance)
+        content = instance.content
+        size = encoded_size(content)
+        start, stop = 0, size
+        status_code: int = status.HTTP_200_OK
+
+        header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if header and if_range in [None, headers['ETag'],
+                                   headers['Last-Modified']]:
+            try:
+                byte_range = parse_range(header, size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(
+                    status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+            if byte_range is not None:
+                start, stop = byte_range
+                status_code = status.HTTP_206_PARTIAL_CONTENT
 
-        if instance.language:
-            lexer = get_lexer_by_name(instance.language)
-        elif constants.GUESS_LEXER:
-            lexer = guess_lexer(instance.content)
+        chunks = encoded_chunks(content, start, stop)
+        if stop - start > constants.STREAMING_THRESHOLD:
+            response = StreamingHttpResponse(chunks, status=status_code)
         else:
-            lexer = get_lexer_by_name(constants.DEFAULT_LANGUAGE)
+            response = HttpResponse(b''.join(chunks), status=status_code)
+        response['Content-Type'] = 'text/plain; charset=utf-8'
+        response['Content-Length'] = stop - start
+        response['Accept-Ranges'] = 'bytes'
+        if status_code == status.HTTP_206_PARTIAL_CONTENT:
+            response['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        for name, value in headers.items():
+            response[name] = value
+        return response
 
-        style = instance.style or constants.DEFAULT_STYLE
-        options = (
-            {'title': instance.title} if instance.title
-            and instance.embed_title else {})
-        full = 'full' in request.query_params
+    @action(detail=True)
+    def tokens(self, request: Request, **kwargs) -> HttpResponseBase:
+        """Return the tokens of the snippet's content, as pairs of the name of
+        their type and their text, unless the client's copy is fresh.
+        """
+        response = self.evaluate_preconditions()
+        if response is not None:
+            return response
 
-        formatter = HtmlFormatter(
-            style=style, full=full, linenos=instance.line_numbers, **options)
-        html = highlight(instance.content, lexer, formatter)
-        if not full:
-            css = formatter.get_style_defs()
-            html = f'<style type="text/css">{css}</style>{html}'
+        instance = self.get_object()
+        tokens = [[token_name(token), value]
+                  for token, value in cache.stream_tokens(instance)]
+        return self.versioned(Response(tokens), instance)
 
-        return Response(html)
+    @action(detail=False, pagination_class=SearchPagination)
+    def search(self, request: Request, **kwargs) -> Response:
+        """Return the snippets current user can view whose title or content
+        matches all the terms of the `q` query parameter, best matches first.
+        """
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            raise exceptions.ValidationError({'q': ['expected search terms']})
+        results = search.search(
+            self.filter_queryset(self.get_queryset()), query)
+
+        page = self.paginate_queryset(results)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(results, many=True)
+        return Response(serializer.data)
 
     @action(detail=False, url_path='user/(?P<pk>[^/.]+)')
     def user(self, request: Request, pk: str, **kwargs) -> Response:
         """Return snippets belonging to user indicated by the ID in the URL.
+        Look the user up only if no snippets are found, to tell whether they
+        exist.
         """
-        User = get_user_model()
-        owner = get_object_or_404(User, pk=pk)
-        user_snippets = self.get_queryset().filter(owner=owner)
+        try:
+            user_snippets = self.filter_queryset(
+                self.get_queryset()).filter(owner_id=pk)
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
 
         page = self.paginate_queryset(user_snippets)
+        snippets = list(user_snippets) if page is None else page
+        if not snippets:
+            User = get_user_model()
+            get_object_or_404(User.objects.only('pk'), pk=pk)
+
+        serializer = self.get_serializer(snippets, many=True)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(user_snippets, many=True)
         return Response(serializer.data)
+
+
+class StyleViewSet(viewsets.ViewSet):
+    """Style-related views.
+
+    - Style stylesheet: /styles/{style-name}.css (GET)
+    """
+
+    permission_classes = [StylePermissions]
+    renderer_classes = [CSSRenderer]
+
+    def retrieve(
+            self, request: Request, pk: str, **kwargs) -> HttpResponseBase:
+        """Return the CSS definitions of the style indicated by the name in
+        the URL, to be cached by clients, unless their cached copy is still
+        fresh.
+        """
+        if pk not in style_names():
+            raise Http404
+
+        css, etag = get_stylesheet(pk)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(css)
+
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=constants.STYLESHEET_MAX_AGE)
+        return response
+
+
+class MetricsViewSet(viewsets.ViewSet):
+    """Metrics-related views, for staff only.
+
+    - Metrics: /metrics/ (GET)
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [PlainTextRenderer]
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """Return the metrics of the requests to snippet views this process
+        has served so far, in the Prometheus text format, if the relative
+        setting allows so.
+        """
+        if not constants.METRICS:
+            raise Http404
+        return Response(metrics.aggregator.render())
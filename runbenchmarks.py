@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARKS = os.path.join(ROOT, 'benchmarks')
+
+
+def available():
+    """Return the names of the benchmarks, in alphabetical order."""
+    return sorted(
+        name[:-3] for name in os.listdir(BENCHMARKS) if name.endswith('.py'))
+
+
+def run(name, large):
+    """Run the named benchmark in a fresh interpreter, as each one configures
+    Django its own way, and return its results. Time large content sizes
+    too, if asked to.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [ROOT, env.get('PYTHONPATH')]))
+    if large:
+        env['BENCHMARK_LARGE_SIZES'] = '1'
+    output = subprocess.check_output(
+        [sys.executable, os.path.join(BENCHMARKS, f'{name}.py')], env=env)
+    return json.loads(output)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run the benchmarks and print their results as JSON.')
+    parser.add_argument(
+        'names', nargs='*', metavar='name',
+        help=f'Benchmarks to run, out of: {", ".join(available())}. '
+             'All of them if omitted.')
+    parser.add_argument(
+        '--large', action='store_true',
+        help='Time content sizes of several megabytes too, which takes '
+             'several minutes.')
+    parser.add_argument(
+        '--output', help='File to write the results to, instead of stdout.')
+    options = parser.parse_args()
+    unknown = sorted(set(options.names) - set(available()))
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(unknown)}')
+
+    results = {name: run(name, options.large)
+               for name in options.names or available()}
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2)
+            output.write('\n')
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
@@ -21,13 +21,17 @@ setup(
     author='Aristotelis Mikropoulos',
     author_email='amikrop@gmail.com',
     url='https://github.com/amikrop/django-paste',
-    packages=['paste'],
+    packages=['paste', 'paste.management', 'paste.management.commands'],
     license='MIT',
     install_requires=[
         'Django',
         'djangorestframework',
         'Pygments',
+        'contextvars; python_version < "3.7"',
     ],
+    extras_require={
+        'zstd': ['zstandard'],
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Environment :: Web Environment',
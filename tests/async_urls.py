@@ -0,0 +1,16 @@
+from django.urls import include, path
+
+from rest_framework.routers import DefaultRouter
+
+from paste import views
+from paste.async_views import AsyncSnippetViewSet
+
+
+router = DefaultRouter()
+router.register('styles', views.StyleViewSet, basename='style')
+router.register('metrics', views.MetricsViewSet, basename='metrics')
+router.register('', AsyncSnippetViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -1,9 +1,6 @@
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.pagination import CursorPagination
-
-from paste.views import SnippetViewSet
 
 from tests.utils import constant, create_snippet, create_user
 
@@ -82,10 +79,6 @@ class SnippetDetailTestCaseMixin(SnippetTestCaseMixin):
         return reverse(f'snippet-{self.name}', kwargs={'pk': pk})
 
 
-class _SnippetPagination(CursorPagination):
-    page_size = 10
-
-
 class SnippetListTestCaseMixin(SnippetTestCaseMixin):
     """Snippet list-like test case common state and behavior."""
 
@@ -105,10 +98,13 @@ class SnippetListTestCaseMixin(SnippetTestCaseMixin):
     def check_pagination(self, **kwargs):
         """Check that this view is able to handle pagination."""
         for i in range(20):
-            create_snippet(i, **kwargs)
-        SnippetViewSet.pagination_class = _SnippetPagination
-        try:
+            create_snippet(str(i), **kwargs)
+        with constant('PAGE_SIZE', 10):
             response = self.get()
             self.assertEqual(len(response.data['results']), 10)
-        finally:
-            SnippetViewSet.pagination_class = None
+            self.assertIsNone(response.data['previous'])
+            next_page = self.client.get(response.data['next'])
+            self.assertEqual(len(next_page.data['results']), 10)
+        with constant('PAGE_SIZE', 0):
+            response = self.get()
+            self.assertIsInstance(response.data, list)
@@ -0,0 +1,6 @@
+from django.urls import include, path
+
+
+urlpatterns = [
+    path('paste/', include(('paste.urls', 'paste'), namespace='paste')),
+]
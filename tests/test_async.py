@@ -0,0 +1,118 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+import django
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from paste import async_views
+
+from tests.utils import constant, create_snippet, create_user
+
+
+@skipUnless(django.VERSION >= (4, 2), 'needs the Django 4.2 async client')
+@override_settings(ROOT_URLCONF='tests.async_urls')
+class AsyncSnippetViewSetTestCase(APITestCase):
+    """Tests for the snippet views running on the event loop."""
+
+    def setUp(self):
+        """Create a public and a private snippet."""
+        self.snippet = create_snippet(
+            'print("hello")\nprint("world")\n', language='python',
+            title='foo')
+        self.private = create_snippet(
+            'bar', private=True, owner=create_user('user'))
+
+    async def test_retrieve(self):
+        """Snippet detail GET must return the queried snippet."""
+        url = reverse('snippet-detail', kwargs={'pk': self.snippet.pk})
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['title'], 'foo')
+
+        response = await self.async_client.get(
+            url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_private(self):
+        """Snippet detail and highlight GET must not return private snippets
+        to those not authorized to view them.
+        """
+        for name in ['detail', 'highlight']:
+            url = reverse(f'snippet-{name}', kwargs={'pk': self.private.pk})
+            response = await self.async_client.get(url)
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_list(self):
+        """Snippet list GET must return the snippets current user can view,
+        paginated or not.
+        """
+        response = await self.async_client.get(reverse('snippet-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [self.snippet.pk])
+
+        with constant('PAGE_SIZE', 0):
+            response = await self.async_client.get(reverse('snippet-list'))
+        self.assertEqual(len(response.json()), 1)
+
+    async def test_highlight(self):
+        """Snippet highlight GET must highlight the queried snippet in the
+        executor.
+        """
+        executor = ThreadPoolExecutor(1)
+        async_views.set_executor(executor)
+        self.addCleanup(async_views.set_executor, None)
+        url = reverse('snippet-highlight', kwargs={'pk': self.snippet.pk})
+        with mock.patch.object(
+                executor, 'submit', wraps=executor.submit) as submit:
+            response = await self.async_client.get(url)
+            lines = await self.async_client.get(url + '?lines=2')
+        self.assertEqual(submit.call_count, 2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hello', response.content.decode())
+        self.assertNotIn('hello', lines.content.decode())
+        self.assertIn('world', lines.content.decode())
+
+    async def test_streaming(self):
+        """Snippet highlight GET must stream large snippets asynchronously,
+        producing each chunk in the executor.
+        """
+        executor = ThreadPoolExecutor(1)
+        async_views.set_executor(executor)
+        self.addCleanup(async_views.set_executor, None)
+        url = reverse('snippet-highlight', kwargs={'pk': self.snippet.pk})
+        with constant('STREAMING_THRESHOLD', 3), mock.patch.object(
+                executor, 'submit', wraps=executor.submit) as submit:
+            response = await self.async_client.get(url)
+            self.assertTrue(response.streaming)
+            self.assertTrue(response.is_async)
+            html = b''.join([chunk async for chunk in
+                             response.streaming_content]).decode()
+        self.assertIn('hello', html)
+        self.assertGreater(submit.call_count, 2)
+
+    async def test_offload_connections(self):
+        """Calls offloaded to the executor must have the stale database
+        connections of their thread closed after them.
+        """
+        with mock.patch('paste.async_views.close_old_connections') as close:
+            self.assertEqual(await async_views.offload(int, '42'), 42)
+        close.assert_called_once_with()
+
+    async def test_sync_actions(self):
+        """Snippet views without asynchronous handlers must run in a thread.
+        """
+        response = await self.async_client.post(
+            reverse('snippet-list'), {'content': 'baz'},
+            content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = reverse('snippet-raw', kwargs={'pk': self.snippet.pk})
+        response = await self.async_client.get(url)
+        self.assertEqual(
+            response.content.decode(), 'print("hello")\nprint("world")\n')
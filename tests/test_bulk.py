@@ -0,0 +1,139 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from paste.models import Rendering, Snippet
+from paste.serializers import _can_return_bulk_pks
+
+from tests.utils import constant, create_snippet, create_user
+
+
+class SnippetBulkTestCase(APITestCase):
+    """Tests for the snippet batch view."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create and store a dummy user and another one."""
+        cls.user = create_user('user')
+        cls.other_user = create_user('other')
+
+    def request(self, method_name, data):
+        """Send a request to the view's URL its type being specified by given
+        method name, with given data, as JSON, using the proper content-type
+        and return the response.
+        """
+        method = getattr(self.client, method_name)
+        return method(
+            reverse('snippet-bulk-create'), data=json.dumps(data),
+            content_type='application/json')
+
+    def statuses(self, response):
+        """Return the status of each item of the response."""
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        return [result['status'] for result in response.data]
+
+    def test_create(self):
+        """Snippet batch POST must create the valid snippets in a single
+        query, where the database returns their primary keys, else one by
+        one, reporting the result of each one.
+        """
+        items = [
+            {'content': 'foo\nbar', 'language': 'python'},
+            {'title': 'baz'},
+            {'content': 'baz', 'private': True},
+            {'content': 'qux', 'style': 'friendly'},
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.request('post', items)
+        inserts = [query for query in context.captured_queries
+                   if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1 if _can_return_bulk_pks() else 2)
+        self.assertEqual(self.statuses(response), [
+            status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST,
+            status.HTTP_400_BAD_REQUEST, status.HTTP_201_CREATED])
+        self.assertIn('content', response.data[1]['errors'])
+        snippets = Snippet.objects.order_by('pk')
+        self.assertEqual(
+            [snippet.content for snippet in snippets], ['foo\nbar', 'qux'])
+        self.assertEqual(snippets[0].line_count, 2)
+        self.assertEqual(response.data[0]['data']['id'], snippets[0].pk)
+
+    def test_create_owner(self):
+        """Snippet batch POST must store current user as the owner of the
+        snippets, if authenticated.
+        """
+        self.client.force_authenticate(self.user)
+        response = self.request('post', [{'content': 'foo', 'private': True}])
+        self.assertEqual(self.statuses(response), [status.HTTP_201_CREATED])
+        self.assertEqual(Snippet.objects.get().owner, self.user)
+
+    def test_create_prerender(self):
+        """Snippet batch POST must store the renderings of the snippets if the
+        PRERENDER setting is True.
+        """
+        with constant('PRERENDER'):
+            self.request('post', [{'content': 'foo'}, {'content': 'bar'}])
+        self.assertEqual(Rendering.objects.count(), 2)
+
+    def test_create_forbid_anonymous(self):
+        """Snippet batch POST must return a 403 Forbidden response to
+        anonymous users if the FORBID_ANONYMOUS_CREATE setting is True.
+        """
+        with constant('FORBID_ANONYMOUS_CREATE'):
+            response = self.request('post', [{'content': 'foo'}])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_batch(self):
+        """Snippet batch requests must return a 400 Bad Request response if
+        the request body is not a list, or has more items than the
+        MAX_BATCH_SIZE setting allows.
+        """
+        with constant('MAX_BATCH_SIZE', 2):
+            for method_name in ['post', 'patch', 'delete']:
+                for data in [{'content': 'foo'}, [1, 2, 3]]:
+                    response = self.request(method_name, data)
+                    self.assertEqual(
+                        response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update(self):
+        """Snippet batch PATCH must update the snippets current user is
+        allowed to, reporting the result of each one.
+        """
+        own = create_snippet('foo', owner=self.user)
+        foreign = create_snippet('bar', owner=self.other_user)
+        private = create_snippet('baz', owner=self.other_user, private=True)
+        self.client.force_authenticate(self.user)
+        response = self.request('patch', [
+            {'id': own.pk, 'content': 'foo\nfoo'},
+            {'id': foreign.pk, 'content': 'qux'},
+            {'id': private.pk, 'content': 'qux'},
+            {'id': own.pk, 'language': '123-invalid-abc'},
+            {'content': 'qux'},
+        ])
+        self.assertEqual(self.statuses(response), [
+            status.HTTP_200_OK, status.HTTP_403_FORBIDDEN,
+            status.HTTP_404_NOT_FOUND, status.HTTP_400_BAD_REQUEST,
+            status.HTTP_400_BAD_REQUEST])
+        self.assertEqual(response.data[0]['data']['content'], 'foo\nfoo')
+        own.refresh_from_db()
+        self.assertEqual(own.line_count, 2)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.content, 'bar')
+
+    def test_delete(self):
+        """Snippet batch DELETE must delete the snippets current user is
+        allowed to, reporting the result of each one.
+        """
+        own = create_snippet('foo', owner=self.user)
+        foreign = create_snippet('bar', owner=self.other_user)
+        self.client.force_authenticate(self.user)
+        response = self.request('delete', [own.pk, foreign.pk, 0, 'foo'])
+        self.assertEqual(self.statuses(response), [
+            status.HTTP_204_NO_CONTENT, status.HTTP_403_FORBIDDEN,
+            status.HTTP_404_NOT_FOUND, status.HTTP_400_BAD_REQUEST])
+        self.assertEqual(list(Snippet.objects.all()), [foreign])
@@ -4,9 +4,11 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 
 from paste import constants
+from paste.models import Rendering, Snippet
+from paste.rendering import get_rendering
 
 from tests.mixins import SnippetDetailTestCaseMixin
-from tests.utils import create_snippet, create_user
+from tests.utils import constant, create_snippet, create_user
 
 
 class SnippetDetailTestCase(SnippetDetailTestCaseMixin, APITestCase):
@@ -113,6 +115,76 @@ class SnippetDetailTestCase(SnippetDetailTestCaseMixin, APITestCase):
         self.assertTrue(response.data['private'])
         self.assertEqual(response.data['owner'], self.user.pk)
 
+    def test_patch_prerender(self):
+        """Snippet detail PATCH must store the rendering of the queried
+        snippet again if the PRERENDER setting is True.
+        """
+        with constant('PRERENDER'):
+            response = self.request('patch', language='text')
+        rendering = Rendering.objects.get(pk=response.data['id'])
+        self.assertEqual(rendering.lexer, 'text')
+        self.assertIsNotNone(get_rendering(rendering.snippet))
+
+    def test_get_not_modified(self):
+        """Snippet detail GET must return a 304 Not Modified response, after
+        a single query, if the client's copy of the queried snippet is fresh.
+        """
+        response = self.get()
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(
+            self.url(), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_get_modified(self):
+        """Snippet detail GET must return the queried snippet if the client's
+        copy of it is stale.
+        """
+        etag = self.get()['ETag']
+        snippet = Snippet.objects.get(pk=1)
+        snippet.title = 'foo'
+        snippet.save()
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'foo')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_not_modified_private(self):
+        """Snippet detail GET must not reveal whether the client's copy of a
+        private snippet it is not authorized to view is fresh.
+        """
+        snippet = create_snippet('foo', private=True, owner=self.user)
+        self.client.force_authenticate(self.user)
+        etag = self.get(pk=snippet.pk)['ETag']
+        self.client.force_authenticate(None)
+        response = self.client.get(
+            self.url(pk=snippet.pk), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_patch_if_match(self):
+        """Snippet detail PATCH must update the queried snippet only if the
+        client's copy of it is fresh, when requested so.
+        """
+        snippet = create_snippet('foo', owner=self.user)
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(
+            self.url(pk=snippet.pk), HTTP_ACCEPT='application/json')['ETag']
+        responses = [
+            self.client.patch(
+                self.url(pk=snippet.pk), data={'title': title},
+                format='json', HTTP_IF_MATCH=etag)
+            for title in ['bar', 'baz']]
+        self.assertEqual(responses[0].status_code, status.HTTP_200_OK)
+        self.assertNotEqual(responses[0]['ETag'], etag)
+        self.assertEqual(
+            responses[1].status_code, status.HTTP_412_PRECONDITION_FAILED)
+        snippet.refresh_from_db()
+        self.assertEqual(snippet.title, 'bar')
+
     def test_put_no_content(self):
         """Snippet detail PUT must return a 400 Bad Request response if no
         content field is set.
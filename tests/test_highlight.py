@@ -1,8 +1,19 @@
+import threading
 from html.parser import HTMLParser
+from unittest import mock
+
+from django.core.cache import cache
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from paste import pools
+from paste.cache import cache_key, cache_stats, reset_cache_stats
+from paste.checkpoints import take_checkpoints
+from paste.models import Rendering, Snippet
+from paste.rendering import prerender, render, render_chunks
+from paste.tokens import encode
+
 from tests.mixins import SnippetDetailTestCaseMixin
 from tests.utils import constant, create_snippet
 
@@ -54,6 +65,12 @@ class SnippetHighlightTestCase(SnippetDetailTestCaseMixin, APITestCase):
     name = 'highlight'
     not_allowed = ['delete', 'patch', 'post', 'put', 'trace']
 
+    def setUp(self):
+        """Create a dummy snippet, clear the cache and its counters."""
+        super().setUp()
+        cache.clear()
+        reset_cache_stats()
+
     def check_response(self, response, content):
         """Check that given response has a 200 OK status code, an HTML
         content-type and given content exists in its contents.
@@ -94,6 +111,16 @@ class SnippetHighlightTestCase(SnippetDetailTestCaseMixin, APITestCase):
         response = self.get(pk=snippet.pk)
         self.check_response(response, 'print("hello")')
 
+    def test_guessed_language(self):
+        """Snippet highlight GET must use the guessed language of the queried
+        snippet, without guessing it again.
+        """
+        snippet = create_snippet('print("hello")', language='')
+        with mock.patch('paste.rendering.guess_language') as guess_language:
+            response = self.get(pk=snippet.pk)
+        guess_language.assert_not_called()
+        self.check_response(response, 'print("hello")')
+
     def test_default_language(self):
         """Snippet highlight GET must return an HTML page of the queried
         snippet's highlighted contents using the default language, if its
@@ -118,3 +145,254 @@ class SnippetHighlightTestCase(SnippetDetailTestCaseMixin, APITestCase):
         for query_part in ['', '=', '=0', '=1' '=a', '=foo', '=k&full=test']:
             response = self.get(f'?full{query_part}')
             self.assertTrue(_is_full(response))
+
+    def test_hit(self):
+        """Snippet highlight GET must render the queried snippet once and
+        serve it from the cache afterwards, if the HIGHLIGHT_CACHE setting is
+        set.
+        """
+        with constant('HIGHLIGHT_CACHE', 'default'):
+            first = self.get()
+            second = self.get()
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_options(self):
+        """Snippet highlight GET must cache each set of highlighting options
+        separately.
+        """
+        with constant('HIGHLIGHT_CACHE', 'default'):
+            response = self.get()
+            full_response = self.get('?full')
+        self.assertFalse(_is_full(response))
+        self.assertTrue(_is_full(full_response))
+        self.assertEqual(cache_stats(), {'hits': 0, 'misses': 2})
+
+    def test_save(self):
+        """Snippet highlight GET must not serve content cached before the
+        queried snippet was saved.
+        """
+        snippet = create_snippet('foo')
+        with constant('HIGHLIGHT_CACHE', 'default'):
+            self.get(pk=snippet.pk)
+            snippet.content = 'bar'
+            snippet.save()
+            response = self.get(pk=snippet.pk)
+        self.check_response(response, 'bar')
+        self.assertEqual(cache_stats(), {'hits': 0, 'misses': 2})
+
+    def test_delete(self):
+        """Deleting a snippet must remove its highlighted content from the
+        cache.
+        """
+        snippet = Snippet.objects.get(pk=1)
+        key = cache_key(snippet, False)
+        with constant('HIGHLIGHT_CACHE', 'default'):
+            self.get()
+            self.assertIsNotNone(cache.get(key))
+            snippet.delete()
+        self.assertIsNone(cache.get(key))
+
+    def test_shared(self):
+        """Snippet highlight GET must serve snippets with the same content,
+        stored in a blob, and the same options from the same cached content.
+        """
+        with constant('DEDUPLICATE_CONTENT'):
+            snippets = [create_snippet('foo', filename='a.py')
+                        for _ in range(2)]
+        with constant('HIGHLIGHT_CACHE', 'default'):
+            first = self.get(pk=snippets[0].pk)
+            second = self.get(pk=snippets[1].pk)
+            snippets[0].delete()
+            third = self.get(pk=snippets[1].pk)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.data, third.data)
+        self.assertEqual(cache_stats(), {'hits': 2, 'misses': 1})
+
+    def test_restyle(self):
+        """Snippet highlight GET must format the cached tokens of the queried
+        snippet, rather than lex it again, when only its formatting options
+        changed.
+        """
+        snippet = create_snippet('print("hello")', language='python')
+        with constant('HIGHLIGHT_CACHE', 'default'), \
+                mock.patch('paste.cache.encode', wraps=encode) as encoded:
+            first = self.get(pk=snippet.pk)
+            snippet.style = 'monokai'
+            snippet.line_numbers = False
+            snippet.save()
+            second = self.get(pk=snippet.pk)
+            third = self.get('?full', pk=snippet.pk)
+        encoded.assert_called_once()
+        self.assertNotEqual(first.data, second.data)
+        self.check_response(second, 'print("hello")')
+        self.check_response(third, 'print("hello")')
+        self.assertEqual(cache_stats(), {'hits': 0, 'misses': 3})
+
+    def test_streaming(self):
+        """Snippet highlight GET must stream the highlighted content of
+        snippets larger than the STREAMING_THRESHOLD setting, without caching
+        it.
+        """
+        with constant('STREAMING_THRESHOLD', 3), \
+                constant('HIGHLIGHT_CACHE', 'default'):
+            response = self.get()
+            full_response = self.get('?full')
+        self.assertTrue(response.streaming)
+        html = b''.join(response.streaming_content).decode()
+        self.assertTrue(html.startswith('<style'))
+        self.assertIn('linenos', html)
+        full_html = b''.join(full_response.streaming_content).decode()
+        self.assertIn('<html>', full_html)
+        self.assertIn('foobaz', full_html)
+        self.assertEqual(cache_stats(), {'hits': 0, 'misses': 0})
+
+    def test_render_chunks(self):
+        """Highlighted content yielded a chunk at a time must be the same as
+        that rendered at once, apart from the line numbers.
+        """
+        snippet = create_snippet(
+            'def foo():\n    return 42\n' * 5000, language='python',
+            line_numbers=False)
+        for full in [False, True]:
+            self.assertEqual(
+                ''.join(render_chunks(snippet, full)), render(snippet, full))
+        self.assertGreater(len(list(render_chunks(snippet, False))), 1)
+
+    def test_render_chunks_closed(self):
+        """Formatting chunks must stop once they are no longer wanted, and
+        its errors be raised where the chunks are read.
+        """
+        snippet = create_snippet(
+            'def foo():\n    return 42\n' * 5000, language='python',
+            line_numbers=False)
+        before = set(threading.enumerate())
+        chunks = render_chunks(snippet, True)
+        next(chunks)
+        chunks.close()
+        for thread in set(threading.enumerate()) - before:
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+
+        formatter = pools.get_formatter({'style': 'default'})
+        with self.assertRaises(ZeroDivisionError):
+            list(formatter.stream(1 / 0 for _ in range(1)))
+
+    def test_streaming_unmeasured(self):
+        """Snippet highlight GET must stream the content of snippets whose
+        size is not stored yet, if large enough.
+        """
+        Snippet.objects.update(size=0)
+        with constant('STREAMING_THRESHOLD', 3):
+            self.assertTrue(self.get().streaming)
+
+    def test_lines(self):
+        """Snippet highlight GET must return only the lines asked for by the
+        `lines` query parameter, numbered as in the whole content.
+        """
+        content = ''.join(f'line_{i} = {i}\n' for i in range(1, 31))
+        snippet = create_snippet(content, language='python')
+        with constant('CHECKPOINT_INTERVAL', 4):
+            response = self.get('?lines=10-12', pk=snippet.pk)
+        text = _response_text(response)
+        for i in range(10, 13):
+            self.assertIn(f'line_{i} = {i}', text)
+            self.assertIn(str(i), text.split('line_')[0])
+        self.assertNotIn('line_9 ', text)
+        self.assertNotIn('line_13 ', text)
+
+        response = self.get('?lines=7', pk=snippet.pk)
+        self.assertIn('line_7 ', _response_text(response))
+        self.assertNotIn('line_8 ', _response_text(response))
+
+    def test_lines_invalid(self):
+        """Snippet highlight GET must return a 400 Bad Request response if the
+        `lines` query parameter is not a line number or a range of them.
+        """
+        for lines in ['', 'a', '0-2', '3-2', '1-2-3']:
+            response = self.get(f'?lines={lines}')
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lines_checkpoints(self):
+        """Snippet highlight GET must take the lexer checkpoints of the
+        queried snippet once, and reuse them from the cache.
+        """
+        with constant('HIGHLIGHT_CACHE', 'default'), mock.patch(
+                'paste.cache.take_checkpoints',
+                wraps=take_checkpoints) as take:
+            self.get('?lines=1')
+            self.get('?lines=1-2')
+        take.assert_called_once()
+
+    def test_lines_prerendered(self):
+        """Snippet highlight GET must use the lexer checkpoints stored along
+        with the queried snippet's rendering, if prerendering is enabled.
+        """
+        snippet = create_snippet('print("hello")\n' * 10, language='python')
+        prerender(snippet)
+        with constant('PRERENDER'):
+            with mock.patch('paste.cache.take_checkpoints') as take:
+                response = self.get('?lines=3-4', pk=snippet.pk)
+        take.assert_not_called()
+        self.check_response(response, 'print("hello")')
+
+    def test_disabled(self):
+        """Snippet highlight GET must not use the cache if the HIGHLIGHT_CACHE
+        setting is not set.
+        """
+        self.get()
+        self.get()
+        self.assertEqual(cache_stats(), {'hits': 0, 'misses': 0})
+
+    def test_prerendered(self):
+        """Snippet highlight GET must serve the stored rendering of the
+        queried snippet if the PRERENDER setting is True.
+        """
+        snippet = Snippet.objects.get(pk=1)
+        prerender(snippet)
+        Rendering.objects.filter(pk=1).update(html='<p>stored</p>')
+        with constant('PRERENDER'):
+            response = self.get()
+            full_response = self.get('?full')
+        self.check_response(response, 'stored')
+        self.check_response(full_response, 'foobaz bar')
+
+    def test_prerendered_fetch(self):
+        """Snippet highlight GET of a prerendered snippet must neither build a
+        formatter nor its style definitions.
+        """
+        snippet = Snippet.objects.get(pk=1)
+        prerender(snippet)
+        self.get()
+        with constant('PRERENDER'), mock.patch(
+                'paste.rendering.pools.get_formatter') as get_formatter:
+            response = self.get()
+        get_formatter.assert_not_called()
+        self.check_response(response, 'foobaz bar')
+
+    def test_prerendered_stale(self):
+        """Snippet highlight GET must not serve a stored rendering which is
+        stale.
+        """
+        snippet = Snippet.objects.get(pk=1)
+        prerender(snippet)
+        Rendering.objects.filter(pk=1).update(html='<p>stored</p>')
+        snippet.style = 'friendly'
+        snippet.save()
+        with constant('PRERENDER'):
+            response = self.get()
+        self.check_response(response, 'foobaz bar')
+
+    def test_not_modified(self):
+        """Snippet highlight GET must return a 304 Not Modified response, after
+        a single query, if the client's copy of the queried snippet's
+        highlighted content is fresh.
+        """
+        etag = self.get()['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(
+            self.url() + '?full', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
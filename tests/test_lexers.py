@@ -0,0 +1,188 @@
+from unittest import mock
+
+from rest_framework.test import APITestCase
+
+from pygments.lexers import guess_lexer
+
+from paste.lexers import detect_language, guess_language, lexer_name
+
+from tests.utils import create_snippet
+
+
+_CORPUS = [
+    '#!/usr/bin/env python3\nprint(1)\n',
+    '#!/usr/bin/python\nimport os\n',
+    '#!/bin/bash\necho hi\n',
+    '#!/bin/sh\necho hi\n',
+    '#!/bin/zsh\necho hi\n',
+    '#!/usr/bin/perl\nprint "x";\n',
+    '#!/usr/bin/env ruby\nputs 1\n',
+    '<?xml version="1.0"?>\n<a/>\n',
+    '<!DOCTYPE html>\n<html></html>\n',
+    'diff --git a/x b/x\n--- a/x\n+++ b/x\n@@ -1 +1 @@\n-a\n+b\n',
+    'x = 1\n# vim: set ft=python:\n',
+    'x = 1\n# vim: filetype=ruby\n',
+]
+
+_KEYWORD_CORPUS = {
+    'python': 'import os\n\n\ndef main(self, value):\n    if value is None:\n'
+              '        return self.x\n    elif value:\n'
+              '        return lambda x: x\n',
+    'javascript': 'const x = require("x");\nfunction f(a) {\n'
+                  '  if (typeof a === "undefined") {\n    console.log(a);\n'
+                  '  }\n  return a;\n}\nmodule.exports = f;\n',
+    'java': 'public class Foo extends Bar implements Baz {\n'
+            '  public static void main(String[] args) throws Exception {\n'
+            '    boolean b = true;\n    System.out.println("hi");\n  }\n}\n',
+    'c': '#include <stdio.h>\n#include <stdlib.h>\n\nint main(void) {\n'
+         '  char *p = malloc(sizeof(char) * 10);\n'
+         '  if (p == NULL) return 1;\n  printf("%s", p);\n  free(p);\n'
+         '  return 0;\n}\n',
+    'cpp': '#include <iostream>\n#include <vector>\n\nnamespace foo {\n'
+           'template <typename T>\nvoid f(std::vector<T> v) {\n'
+           '  std::cout << v.size() << std::endl;\n}\n}\n',
+    'csharp': 'using System;\n\nnamespace Foo {\n'
+              '  public sealed class Bar {\n'
+              '    public static void Main() {\n'
+              '      foreach (var x in xs) {\n'
+              '        Console.WriteLine(x);\n      }\n    }\n  }\n}\n',
+    'go': 'package main\n\nimport "fmt"\n\nfunc main() {\n'
+          '\tch := make(chan int)\n\tdefer close(ch)\n'
+          '\tfmt.Println("hi")\n}\n',
+    'rust': 'use std::io;\n\nfn main() {\n'
+            '    let mut v: Vec<usize> = Vec::new();\n'
+            '    let x = v.pop().unwrap();\n}\n\nimpl Foo for Bar {}\n',
+    'ruby': 'class Foo\n  attr_accessor :bar\n\n  def baz\n    if bar\n'
+            '      puts "x"\n    elsif qux\n      puts "y"\n    end\n'
+            '  end\nend\n',
+    'bash': 'for f in *.txt; do\n  if [ -f "$f" ]; then\n    echo "$f"\n'
+            '  fi\ndone\n',
+    'sql': 'SELECT id, name\nFROM users\n'
+           'WHERE id IN (SELECT user_id FROM orders);\n',
+    'php': '<?php\nfunction foo($x) {\n  echo $x;\n}\n',
+}
+
+
+class LanguageDetectionTestCase(APITestCase):
+    """Tests for the cheap language detection tiers."""
+
+    def test_corpus(self):
+        """Detection must be confident about, and agree with Pygments on,
+        the language of each content of the corpus.
+        """
+        for content in _CORPUS:
+            detection = detect_language(content)
+            self.assertEqual(
+                detection.language, lexer_name(guess_lexer(content)))
+
+    def test_keywords(self):
+        """Detection must be confident about the language of ordinary code,
+        by its signature or its distinctive keywords, and agree with
+        Pygments where Pygments guesses right.
+        """
+        for language, content in _KEYWORD_CORPUS.items():
+            self.assertEqual(detect_language(content).language, language)
+        for language in ['python', 'c']:
+            content = _KEYWORD_CORPUS[language]
+            self.assertEqual(lexer_name(guess_lexer(content)), language)
+
+    def test_keywords_mixed(self):
+        """Detection must not be confident if the keywords of a language do
+        not clearly outnumber those of the rest.
+        """
+        content = 'def foo(self):\n    puts x\n    elsif y\n    end\n'
+        self.assertIsNone(detect_language(content).language)
+
+    def test_keywords_noise(self):
+        """Detection must not count the keywords of string literals,
+        comments and prose, nor common words outside of statements.
+        """
+        for content in [
+                'def find(cursor, pk):\n'
+                '    cursor.execute("SELECT name FROM users WHERE id = ?",\n'
+                '                   (pk,))\n'
+                '    return cursor.fetchone()\n',
+                'x = 1  # SELECT name FROM users WHERE id = 1\n',
+                '# Notes\n\nUse `def` to define a function, `self` for the '
+                'instance and `None` for nothing.\n',
+                'Use def to define a function. Methods take self first, '
+                'and\nreturn None unless they return something else.\n',
+                'Then we went to the end of the road, where my friend had '
+                'a local\nshop. The sub was fine, and then we went home.\n']:
+            self.assertIsNone(detect_language(content).language)
+
+    def test_tiers(self):
+        """Detection must report each tier tried, stopping at the first
+        confident one.
+        """
+        detection = detect_language('#!/bin/sh\n# vim: ft=python\n')
+        self.assertEqual(detection.language, 'bash')
+        self.assertEqual(
+            [(tier.name, tier.language) for tier in detection.tiers],
+            [('filename', None), ('shebang', 'bash')])
+        for tier in detection.tiers:
+            self.assertGreaterEqual(tier.seconds, 0)
+
+    def test_filename(self):
+        """Detection must take the filename into account first."""
+        detection = detect_language('#!/bin/sh\n', 'setup.py')
+        self.assertEqual(detection.language, 'python')
+        self.assertEqual(len(detection.tiers), 1)
+
+    def test_emacs(self):
+        """Detection must take Emacs modelines into account."""
+        for line in ['# -*- mode: ruby -*-', '# -*- ruby -*-',
+                     '# -*- coding: utf-8; mode: ruby -*-']:
+            self.assertEqual(detect_language(f'{line}\nx\n').language, 'ruby')
+
+    def test_unsure(self):
+        """Detection must not be confident about content with no hints."""
+        detection = detect_language('foo bar\n', 'foo')
+        self.assertIsNone(detection.language)
+        self.assertEqual(len(detection.tiers), 5)
+
+    def test_large(self):
+        """Guessing must not scan large content if a tier is confident."""
+        content = '#!/usr/bin/env node\n' + 'x = 1;\n' * 150000
+        with mock.patch('paste.lexers.guess_lexer') as guess:
+            language = guess_language(content)
+        guess.assert_not_called()
+        self.assertEqual(language, 'javascript')
+
+    def test_large_code(self):
+        """Guessing must not scan large ordinary code, whose language the
+        keywords tell.
+        """
+        content = 'def item(value):\n    return value * 2\n' * 30000
+        with mock.patch('paste.lexers.guess_lexer') as guess:
+            language = guess_language(content)
+        guess.assert_not_called()
+        self.assertEqual(language, 'python')
+
+    def test_fallback_bounded(self):
+        """Guessing must fall back to Pygments on the beginning of large
+        content alone.
+        """
+        content = 'foo bar\n' * 100000
+        with mock.patch('paste.lexers.guess_lexer',
+                        side_effect=guess_lexer) as guess:
+            guess_language(content)
+        [(text,), _] = guess.call_args
+        self.assertLess(len(text), len(content))
+        self.assertTrue(content.startswith(text))
+
+    def test_fallback(self):
+        """Guessing must fall back to Pygments if no tier is confident."""
+        content = 'def foo():\n    return 42\n'
+        self.assertEqual(
+            guess_language(content), lexer_name(guess_lexer(content)))
+
+    def test_snippet_filename(self):
+        """A snippet must have its language guessed again when its filename
+        changes.
+        """
+        snippet = create_snippet('x = 1\n', filename='x.rb')
+        self.assertEqual(snippet.guessed_language, 'ruby')
+        snippet.filename = 'x.py'
+        snippet.save()
+        self.assertEqual(snippet.guessed_language, 'python')
@@ -1,11 +1,14 @@
 import json
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from paste import constants
+from paste.models import Rendering, Snippet
 
 from tests.mixins import SnippetListTestCaseMixin
 from tests.utils import constant, create_snippet, create_user
@@ -28,14 +31,37 @@ class SnippetListTestCase(SnippetListTestCaseMixin, APITestCase):
             content_type='application/json')
 
     def test_get_success(self):
-        """Snippet list GET must return all the viewable snippets."""
+        """Snippet list GET must return all the viewable snippets, newest
+        first.
+        """
         create_snippet('foo')
         create_snippet('bar')
         response = self.get()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(response.data[0]['content'], 'foo')
-        self.assertEqual(response.data[1]['content'], 'bar')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['preview'], 'bar')
+        self.assertEqual(response.data['results'][1]['preview'], 'foo')
+        self.assertNotIn('content', response.data['results'][0])
+
+    def test_get_fields(self):
+        """Snippet list GET must return only the fields given by the `fields`
+        query parameter, if any, and fetch only those from the database.
+        """
+        snippet = create_snippet('foo', title='bar')
+        with CaptureQueriesContext(connection) as context:
+            response = self.get('?fields=id,%20content,unknown')
+        self.assertEqual(
+            response.data['results'], [{'id': snippet.pk, 'content': 'foo'}])
+        self.assertNotIn('title', context.captured_queries[-1]['sql'])
+
+    def test_get_deferred_content(self):
+        """Snippet list GET must not fetch the snippets' content from the
+        database, unless asked for.
+        """
+        create_snippet('foo')
+        with CaptureQueriesContext(connection) as context:
+            self.get()
+        self.assertNotIn('"content"', context.captured_queries[-1]['sql'])
 
     def test_get_private(self):
         """Snippet list GET must return private snippets only to those
@@ -47,7 +73,7 @@ class SnippetListTestCase(SnippetListTestCaseMixin, APITestCase):
 
         def check(i):
             response = self.get()
-            self.assertEqual(len(response.data), expected[i])
+            self.assertEqual(len(response.data['results']), expected[i])
 
         self.check_for_users(check, owner)
 
@@ -61,11 +87,80 @@ class SnippetListTestCase(SnippetListTestCaseMixin, APITestCase):
 
         def check(i):
             response = self.get()
-            self.assertEqual(len(response.data), expected[i])
+            self.assertEqual(len(response.data['results']), expected[i])
 
         with constant('LIST_FOREIGN', False):
             self.check_for_users(check)
 
+    def ids(self, query_string):
+        """Send a GET request with the query string and return the IDs of the
+        snippets listed.
+        """
+        response = self.get(query_string)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result['id'] for result in response.data['results']]
+
+    def test_get_filter_language(self):
+        """Snippet list GET must return only the snippets in the language
+        given by the `language` query parameter, whether set or guessed.
+        """
+        python = create_snippet('foo', language='python')
+        with constant('GUESS_LEXER'):
+            guessed = create_snippet('#!/usr/bin/env python\nfoo\n')
+        create_snippet('foo', language='c')
+        self.assertEqual(self.ids('?language=python'), [guessed.pk, python.pk])
+
+    def test_get_filter_owner(self):
+        """Snippet list GET must return only the snippets owned by the user
+        given by the `owner` query parameter.
+        """
+        snippet = create_snippet('foo', owner=self.user)
+        create_snippet('bar', owner=self.staff_user)
+        create_snippet('baz')
+        self.assertEqual(self.ids(f'?owner={self.user.pk}'), [snippet.pk])
+
+    def test_get_filter_private(self):
+        """Snippet list GET must return only the private or public snippets,
+        as the `private` query parameter asks for, out of the viewable ones.
+        """
+        private = create_snippet('foo', private=True, owner=self.user)
+        public = create_snippet('bar', owner=self.user)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.ids('?private=true'), [private.pk])
+        self.assertEqual(self.ids('?private=false'), [public.pk])
+
+    def test_get_filter_dates(self):
+        """Snippet list GET must return only the snippets created after or
+        before, or updated since, the dates and times given by the relative
+        query parameters.
+        """
+        snippets = [create_snippet(str(i)) for i in range(3)]
+        moments = [
+            snippet.created.isoformat().replace('+', '%2B')
+            for snippet in snippets]
+        self.assertEqual(
+            self.ids(f'?created_after={moments[0]}'),
+            [snippets[2].pk, snippets[1].pk])
+        self.assertEqual(
+            self.ids(f'?created_after={moments[0]}'
+                     f'&created_before={moments[2]}'),
+            [snippets[1].pk])
+        self.assertEqual(self.ids('?created_before=2000-01-01'), [])
+        snippets[0].save()
+        self.assertEqual(
+            self.ids(f'?updated_since={moments[2]}'),
+            [snippets[2].pk, snippets[0].pk])
+
+    def test_get_filter_invalid(self):
+        """Snippet list GET must return a 400 Bad Request response listing
+        the filter query parameters with invalid values.
+        """
+        response = self.get(
+            '?owner=foo&private=maybe&created_after=yesterday&language=')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertCountEqual(
+            response.data, ['owner', 'private', 'created_after', 'language'])
+
     def test_post_success(self):
         """Snippet list POST must create a new snippet."""
         response = self.post(
@@ -81,6 +176,16 @@ class SnippetListTestCase(SnippetListTestCaseMixin, APITestCase):
         self.assertEqual(response.data['private'], constants.DEFAULT_PRIVATE)
         self.assertIsNone(response.data['owner'])
 
+    def test_post_prerender(self):
+        """Snippet list POST must store the rendering of the newly created
+        snippet if the PRERENDER setting is True.
+        """
+        with constant('PRERENDER'):
+            response = self.post(content='print(42)', language='python')
+        rendering = Rendering.objects.get(pk=response.data['id'])
+        self.assertIn('print', rendering.html)
+        self.assertEqual(rendering.lexer, 'python')
+
     def test_post_owner(self):
         """Snippet list POST must store currently authenticated user as the
         newly created snippet's owner.
@@ -152,3 +257,100 @@ class SnippetListTestCase(SnippetListTestCaseMixin, APITestCase):
     def test_pagination(self):
         """Snippet list must be able to handle pagination."""
         self.check_pagination()
+
+    def test_pagination_ties(self):
+        """Snippet list pages must neither skip nor repeat snippets created
+        at the same time, newest primary key first.
+        """
+        snippets = [create_snippet(str(i)) for i in range(5)]
+        Snippet.objects.update(created=snippets[0].created)
+        pks = []
+        with constant('PAGE_SIZE', 2):
+            response = self.get()
+            while True:
+                pks += [snippet['id'] for snippet in response.data['results']]
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+        self.assertEqual(pks, [snippet.pk for snippet in reversed(snippets)])
+
+    def test_query_plan(self):
+        """Snippet list must seek its page of public snippets through the
+        relative index, without sorting them.
+        """
+        create_snippet('foo')
+        with CaptureQueriesContext(connection) as context:
+            self.get()
+        sql = context.captured_queries[-1]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn(Snippet._meta.indexes[0].name, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_pagination_visibility(self):
+        """Snippet list pages of an authenticated user must hold the public
+        snippets and their own private ones, newest first, both forwards and
+        backwards.
+        """
+        other = create_user('other')
+        visible = []
+        for i in range(9):
+            owner = [self.user, other, None][i % 3]
+            private = i % 2 == 0 and owner is not None
+            snippet = create_snippet(str(i), owner=owner, private=private)
+            if owner == self.user or not private:
+                visible.append(snippet.pk)
+        self.client.force_authenticate(self.user)
+        pages = []
+        with constant('PAGE_SIZE', 2):
+            response = self.get()
+            while True:
+                pages.append(
+                    [snippet['id'] for snippet in response.data['results']])
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+            self.assertEqual(sum(pages, []), visible[::-1])
+            for page in reversed(pages[:-1]):
+                response = self.client.get(response.data['previous'])
+                self.assertEqual(
+                    [snippet['id'] for snippet in response.data['results']],
+                    page)
+
+    def test_query_plan_owner(self):
+        """Snippet list must seek its page of public snippets and of current
+        user's own through the relative indexes, sorting no more snippets
+        than both pages hold.
+        """
+        create_snippet('foo')
+        create_snippet('bar', owner=self.user, private=True)
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as context:
+            self.get()
+        sql = context.captured_queries[-1]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn(Snippet._meta.indexes[0].name, plan)
+        self.assertIn(Snippet._meta.indexes[1].name, plan)
+        self.assertIn('INTEGER PRIMARY KEY', plan)
+        self.assertNotIn('SCAN', plan)
+        self.assertEqual(sql.count('LIMIT'), 3)
+
+    def test_filter_query_plan(self):
+        """Snippet list GET must seek the snippets created within the range
+        the query parameters give through the relative index, without sorting
+        them.
+        """
+        create_snippet('foo')
+        self.client.force_authenticate(self.staff_user)
+        with CaptureQueriesContext(connection) as context:
+            self.get('?created_after=2000-01-01&created_before=2100-01-01')
+        sql = context.captured_queries[-1]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn(Snippet._meta.indexes[6].name, plan)
+        self.assertIn('created>? AND created<?', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,187 @@
+from unittest import skipUnless
+
+import django
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from paste import metrics
+from paste.models import Snippet
+
+from tests.utils import constant, create_snippet, create_user
+
+
+class MetricsTestCase(APITestCase):
+    """Tests for the timing of requests to snippet views and the metrics
+    view.
+    """
+
+    def setUp(self):
+        """Create a snippet, collect the signals of requests timed and forget
+        the metrics of previous tests.
+        """
+        self.snippet = create_snippet(
+            'print("hello")\n' * 10, language='python', title='foo')
+        self.timed = []
+        metrics.request_timed.connect(self.receive)
+        self.addCleanup(metrics.request_timed.disconnect, self.receive)
+        metrics.aggregator.reset()
+        self.addCleanup(metrics.aggregator.reset)
+
+    def receive(self, sender, **kwargs):
+        """Store the arguments of a request timed signal."""
+        self.timed.append(kwargs)
+
+    def url(self, name='highlight'):
+        """Return the URL of the named view of the snippet."""
+        return reverse(f'snippet-{name}', kwargs={'pk': self.snippet.pk})
+
+    def test_disabled(self):
+        """Requests must not be timed, and the metrics view must not be
+        found, unless the relative setting allows so.
+        """
+        self.client.get(self.url())
+        self.assertEqual(self.timed, [])
+        self.client.force_authenticate(create_user('staff', is_staff=True))
+        response = self.client.get(reverse('metrics-list'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_staff(self):
+        """Metrics GET must be forbidden to anonymous and non staff users."""
+        with constant('METRICS'):
+            response = self.client.get(reverse('metrics-list'))
+            self.assertIn(response.status_code, [
+                status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+            self.client.force_authenticate(create_user('user'))
+            response = self.client.get(reverse('metrics-list'))
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_highlight(self):
+        """Snippet highlight GET must report the time spent on each stage,
+        along with the content size and the lexer.
+        """
+        with constant('METRICS'), constant('HIGHLIGHT_CACHE', ''):
+            response = self.client.get(self.url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [timed] = self.timed
+        self.assertEqual(timed['action'], 'highlight')
+        self.assertEqual(timed['status'], status.HTTP_200_OK)
+        self.assertEqual(timed['size'], self.snippet.size)
+        self.assertEqual(timed['lexer'], 'python')
+        self.assertTrue(
+            {'fetch', 'lex', 'format', 'style'}.issubset(timed['stages']))
+        self.assertNotIn('guess', timed['stages'])
+        self.assertGreaterEqual(
+            timed['seconds'], sum(timed['stages'].values()))
+
+    def test_guess(self):
+        """Snippet highlight GET must report the time spent on guessing the
+        language of the content, if done.
+        """
+        Snippet.objects.filter(pk=self.snippet.pk).update(
+            language='', guessed_language='')
+        with constant('METRICS'), constant('HIGHLIGHT_CACHE', ''):
+            self.client.get(self.url())
+        [timed] = self.timed
+        self.assertIn('guess', timed['stages'])
+        self.assertTrue(timed['lexer'])
+
+    def test_streamed(self):
+        """Streamed snippet highlight GET must be reported once streamed,
+        including the time spent on lexing and formatting.
+        """
+        with constant('METRICS'), constant('STREAMING_THRESHOLD', 1):
+            response = self.client.get(self.url())
+            self.assertTrue(response.streaming)
+            self.assertEqual(self.timed, [])
+            b''.join(response.streaming_content)
+        [timed] = self.timed
+        self.assertTrue({'fetch', 'lex', 'format'}.issubset(timed['stages']))
+
+    def test_list(self):
+        """Snippet list GET must report the time spent on fetching."""
+        with constant('METRICS'):
+            self.client.get(reverse('snippet-list'))
+        [timed] = self.timed
+        self.assertEqual(timed['action'], 'list')
+        self.assertIn('fetch', timed['stages'])
+        self.assertIsNone(timed['size'])
+
+    def test_metrics(self):
+        """Metrics GET must return request counts and histograms, per action,
+        in the Prometheus text format.
+        """
+        with constant('METRICS'):
+            self.client.get(self.url())
+            self.client.get(self.url())
+            self.client.get(reverse('snippet-detail', kwargs={'pk': 999}))
+            self.client.force_authenticate(
+                create_user('staff', is_staff=True))
+            response = self.client.get(reverse('metrics-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn(
+            'paste_requests_total{action="highlight",status="200"} 2', text)
+        self.assertIn(
+            'paste_requests_total{action="retrieve",status="404"} 1', text)
+        self.assertIn('paste_request_duration_seconds_bucket'
+                      '{action="highlight",le="+Inf"} 2', text)
+        self.assertIn('paste_stage_duration_seconds_count'
+                      '{action="highlight",stage="fetch"} 2', text)
+        self.assertIn('# TYPE paste_request_duration_seconds histogram', text)
+
+    @skipUnless(django.VERSION >= (4, 2), 'needs the Django 4.2 async client')
+    @override_settings(ROOT_URLCONF='tests.async_urls')
+    async def test_async(self):
+        """Asynchronous snippet highlight GET must report the time spent on
+        each stage, including those run in the executor.
+        """
+        with constant('METRICS'), constant('HIGHLIGHT_CACHE', ''):
+            response = await self.async_client.get(self.url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [timed] = self.timed
+        self.assertEqual(timed['action'], 'highlight')
+        self.assertTrue(
+            {'fetch', 'lex', 'format', 'style'}.issubset(timed['stages']))
+
+
+class TimingsTestCase(SimpleTestCase):
+    """Tests for timing stages and aggregating metrics."""
+
+    def test_nested(self):
+        """Time spent in a nested stage must be left out of the enclosing
+        one, and stages must not be timed outside requests.
+        """
+        with metrics.stage('format'):
+            pass
+        timings = metrics.Timings()
+        token = metrics._current.set(timings)
+        self.addCleanup(metrics._current.reset, token)
+        with metrics.stage('format'):
+            for _ in metrics.timed('lex', range(3)):
+                pass
+            with metrics.stage('format'):
+                pass
+        self.assertEqual(set(timings.stages), {'format', 'lex'})
+        self.assertGreaterEqual(timings.stages['format'], 0)
+
+    def test_histogram(self):
+        """Histograms must count values cumulatively by upper bound."""
+        aggregator = metrics.Aggregator()
+        with constant('METRICS_BUCKETS', [0.1, 1.0]):
+            for seconds in [0.05, 0.1, 0.5, 2.0]:
+                aggregator.observe('list', 200, seconds, {}, 100)
+        text = aggregator.render()
+        for line in [
+                'paste_request_duration_seconds_bucket'
+                '{action="list",le="0.1"} 2',
+                'paste_request_duration_seconds_bucket'
+                '{action="list",le="1.0"} 3',
+                'paste_request_duration_seconds_bucket'
+                '{action="list",le="+Inf"} 4',
+                'paste_request_duration_seconds_count{action="list"} 4',
+                'paste_content_bytes_total{action="list"} 400']:
+            self.assertIn(line, text)
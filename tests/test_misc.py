@@ -1,10 +1,34 @@
+import os
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
+from rest_framework import status
 from rest_framework.test import APITestCase
 
+from pygments.lexers import get_all_lexers, get_lexer_by_name
+from pygments.token import Text
+
+from paste import pools, sandbox, search
+from paste.checkpoints import (START, checkpointed_tokens, line_tokens, loads,
+                               preprocess, resumable, take_checkpoints)
+from paste.choices import (language_choices, style_choices, validate_language,
+                           validate_style)
 from paste.constants import _setting
+from paste.fields import MARKER, Compressed
+from paste.lexers import guess_language
+from paste.models import Blob, Rendering, Snippet
+from paste.rendering import get_lexer, get_rendering, prerender, render
 
-from tests.utils import create_snippet
+from tests.utils import constant, create_snippet
 
 
 class SnippetModelTestCase(APITestCase):
@@ -24,6 +48,469 @@ class SnippetModelTestCase(APITestCase):
         snippet = create_snippet('foo')
         self.assertEqual(str(snippet), f'{_("Untitled")} ({snippet.pk})')
 
+    def test_guessed_language(self):
+        """A snippet without language must have its language guessed when
+        created, and guessed again only when its content changes.
+        """
+        with mock.patch(
+                'paste.models.guess_language', return_value='python') as guess:
+            snippet = create_snippet('print(42)')
+            self.assertEqual(snippet.guessed_language, 'python')
+            snippet.refresh_from_db()
+            snippet.title = 'foo'
+            snippet.save()
+            self.assertEqual(guess.call_count, 1)
+            snippet.content = 'print(43)'
+            snippet.save()
+            self.assertEqual(guess.call_count, 2)
+
+    def test_guessed_language_set(self):
+        """A snippet with language must not have its language guessed, and
+        must forget the guessed one when its content changes.
+        """
+        snippet = create_snippet('print(42)')
+        snippet.language = 'python'
+        snippet.save()
+        self.assertTrue(snippet.guessed_language)
+        snippet.content = '42'
+        snippet.save()
+        self.assertEqual(snippet.guessed_language, '')
+
+    def test_guessed_language_disabled(self):
+        """A snippet must not have its language guessed if the GUESS_LEXER
+        setting is False.
+        """
+        with constant('GUESS_LEXER', False):
+            snippet = create_snippet('print(42)')
+        self.assertEqual(snippet.guessed_language, '')
+
+    def test_metadata(self):
+        """A snippet must have its size, line count and preview computed when
+        created, and computed again when its content changes, even if saved
+        with given fields to update.
+        """
+        snippet = create_snippet('print("\u03bb")\n42\n')
+        self.assertEqual(snippet.size, 15)
+        self.assertEqual(snippet.line_count, 2)
+        self.assertEqual(snippet.preview, 'print("\u03bb")\n42\n')
+        snippet.content = 'x' * 300
+        snippet.save(update_fields=['content'])
+        snippet.refresh_from_db()
+        self.assertEqual(snippet.size, 300)
+        self.assertEqual(snippet.line_count, 1)
+        self.assertEqual(snippet.preview, 'x' * 200)
+
+    def test_choices_deconstruct(self):
+        """The language and style fields must deconstruct into references to
+        the functions validating their values, rather than their choices.
+        """
+        for name, function, validator in [
+                ('language', language_choices, validate_language),
+                ('style', style_choices, validate_style)]:
+            field = Snippet._meta.get_field(name)
+            kwargs = field.deconstruct()[3]
+            self.assertNotIn('choices', kwargs)
+            self.assertEqual(kwargs['validators'], [validator])
+            self.assertEqual(
+                list(getattr(Snippet, f'{name.upper()}_CHOICES')), function())
+
+    def test_choices_validate(self):
+        """Snippet list POST must reject languages and styles not among
+        their choices.
+        """
+        for name in ['language', 'style']:
+            response = self.client.post(
+                reverse('snippet-list'), {'content': 'foo', name: 'foo'})
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(name, response.data)
+        response = self.client.post(reverse('snippet-list'), {
+            'content': 'foo', 'language': 'python', 'style': 'friendly'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class ContentFieldTestCase(APITestCase):
+    """Tests for the compressed content field."""
+
+    def stored(self, snippet):
+        """Return the snippet's content, as stored in the database."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT content FROM paste_snippet WHERE id = %s',
+                [snippet.pk])
+            return cursor.fetchone()[0]
+
+    def test_compressed(self):
+        """Content must be stored compressed if the COMPRESS_CONTENT setting
+        is True and it is long enough, and decompressed when read.
+        """
+        content = 'INFO request handled\n' * 100
+        with constant('COMPRESS_CONTENT'):
+            snippet = create_snippet(content)
+        self.assertTrue(self.stored(snippet).startswith(MARKER))
+        self.assertLess(len(self.stored(snippet)), len(content) // 5)
+        snippet = Snippet.objects.get()
+        self.assertIsInstance(snippet.__dict__['content'], Compressed)
+        self.assertEqual(snippet.content, content)
+        self.assertEqual(snippet.__dict__['content'], content)
+
+    def test_uncompressed(self):
+        """Content must be stored as is if the COMPRESS_CONTENT setting is
+        False, or it is shorter than the COMPRESS_THRESHOLD setting.
+        """
+        content = 'x' * 100
+        for settings in [(False, 10), (True, 1000)]:
+            with constant('COMPRESS_CONTENT', settings[0]), \
+                    constant('COMPRESS_THRESHOLD', settings[1]):
+                snippet = create_snippet(content)
+            self.assertEqual(self.stored(snippet), content)
+
+    def test_marker(self):
+        """Content beginning with the marker of stored compressed content must
+        be read back as is.
+        """
+        snippet = create_snippet(f'{MARKER}z foo')
+        self.assertEqual(Snippet.objects.get().content, f'{MARKER}z foo')
+        self.assertNotEqual(self.stored(snippet), snippet.content)
+
+    def test_save_unread(self):
+        """Saving a snippet without reading its compressed content must store
+        it as it was, without deriving anything from it again.
+        """
+        with constant('COMPRESS_CONTENT'):
+            snippet = create_snippet('print(42)\n' * 200)
+        stored = self.stored(snippet)
+        snippet = Snippet.objects.get()
+        snippet.title = 'foo'
+        with mock.patch('paste.models.guess_language') as guess:
+            snippet.save()
+            self.assertEqual(self.stored(snippet), stored)
+            snippet.content
+            snippet.save()
+        guess.assert_not_called()
+        self.assertEqual(self.stored(snippet), snippet.content)
+
+
+class BlobTestCase(APITestCase):
+    """Tests for the storage of snippet content in blobs."""
+
+    def test_deduplicated(self):
+        """Snippets with the same content must have it stored once, in a
+        blob, if the DEDUPLICATE_CONTENT setting is True.
+        """
+        with constant('DEDUPLICATE_CONTENT'):
+            first = create_snippet('foo')
+            second = create_snippet('foo')
+            third = create_snippet('bar')
+        self.assertEqual(first.blob, second.blob)
+        self.assertNotEqual(first.blob, third.blob)
+        self.assertEqual(Blob.objects.count(), 2)
+        self.assertEqual(
+            list(Snippet.objects.values_list('content', flat=True)),
+            [''] * 3)
+        self.assertEqual(
+            [snippet.content for snippet in Snippet.objects.all()],
+            ['foo', 'foo', 'bar'])
+
+    def test_save(self):
+        """Saving a snippet with its content stored in a blob must keep it
+        there, unless the content changes, and the DEDUPLICATE_CONTENT
+        setting is False.
+        """
+        with constant('DEDUPLICATE_CONTENT'):
+            snippet = create_snippet('foo')
+        snippet = Snippet.objects.get()
+        self.assertEqual(snippet.content, 'foo')
+        snippet.title = 'baz'
+        snippet.save()
+        self.assertEqual(Snippet.objects.values_list('content').get(), ('',))
+        snippet.content = 'bar'
+        snippet.save()
+        snippet = Snippet.objects.get()
+        self.assertIsNone(snippet.blob)
+        self.assertEqual(snippet.content, 'bar')
+
+    def test_deferred(self):
+        """A snippet must read its content from its blob when loaded
+        deferred.
+        """
+        with constant('DEDUPLICATE_CONTENT'):
+            create_snippet('foo')
+        self.assertEqual(Snippet.objects.defer('content').get().content, 'foo')
+        self.assertEqual(Snippet.objects.only('content').get().content, 'foo')
+
+    def test_collect(self):
+        """The collectblobs command must delete the blobs no snippet refers
+        to, once not stored for the grace period given.
+        """
+        with constant('DEDUPLICATE_CONTENT'):
+            create_snippet('foo')
+            snippet = create_snippet('bar')
+        snippet.content = 'baz'
+        snippet.save()
+        out = StringIO()
+        call_command('collectblobs', stdout=out)
+        self.assertEqual(out.getvalue(), '0 blobs deleted\n')
+        out = StringIO()
+        call_command('collectblobs', grace=0, stdout=out)
+        self.assertEqual(out.getvalue(), '1 blobs deleted\n')
+        self.assertEqual(Blob.objects.get().content, 'foo')
+
+    def test_collect_stored(self):
+        """The collectblobs command must not delete the blobs stored again
+        within the grace period, even if no snippet refers to them yet.
+        """
+        Blob.store('foo')
+        Blob.objects.update(stored=timezone.now() - timedelta(hours=2))
+        Blob.store('foo')
+        out = StringIO()
+        call_command('collectblobs', stdout=out)
+        self.assertEqual(out.getvalue(), '0 blobs deleted\n')
+
+    def test_search(self):
+        """Snippet search GET without an index must find the snippets by the
+        content of their blobs.
+        """
+        with constant('DEDUPLICATE_CONTENT'), constant('SEARCH_INDEX', False):
+            snippet = create_snippet('foo bar')
+            response = self.client.get(f'{reverse("snippet-search")}?q=bar')
+        self.assertEqual(
+            [result['id'] for result in response.data['results']],
+            [snippet.pk])
+
+
+def _lines(tokens):
+    """Return the given tokens split by line."""
+    return [(token, piece) for token, value in tokens
+            for piece in value.splitlines(True)]
+
+
+class CheckpointsTestCase(APITestCase):
+    """Tests for lexing from checkpoints."""
+
+    content = ''.join(
+        f'def foo_{i}():\n    """Return\n    {i}.\n    """\n    return {i}\n'
+        for i in range(40))
+
+    def test_take(self):
+        """Checkpoints must be taken at line boundaries, every given number of
+        lines at least, beginning with the start of the content.
+        """
+        lexer = get_lexer_by_name('python')
+        text = preprocess(lexer, self.content)
+        checkpoints = take_checkpoints(lexer, text, 7)
+        self.assertEqual(checkpoints[0], START)
+        self.assertGreater(len(checkpoints), 10)
+        for previous, checkpoint in zip(checkpoints, checkpoints[1:]):
+            self.assertGreaterEqual(checkpoint.line - previous.line, 7)
+            self.assertEqual(text[checkpoint.offset - 1], '\n')
+            self.assertEqual(
+                text.count('\n', 0, checkpoint.offset) + 1, checkpoint.line)
+
+    def test_same_tokens(self):
+        """Tokens yielded while taking checkpoints must be the same as those
+        of the lexer itself, for every bundled lexer able to resume.
+        """
+        content = self.content + (
+            '<html><body class="x">&amp; {{ foo }}</body></html>\n'
+            '#include <stdio.h>\nint main(void) { /* x */ return 0; } // y\n'
+            '{"a": [1, 2.5, true, null], \'b\': `c`}\n$x = @(1..3) -> x;\n')
+        for info in get_all_lexers():
+            aliases = info[1]
+            if not aliases:
+                continue
+            lexer = get_lexer_by_name(aliases[0])
+            if not resumable(lexer):
+                continue
+            text = preprocess(lexer, content)
+            with self.subTest(lexer=aliases[0]):
+                self.assertEqual(
+                    list(checkpointed_tokens(lexer, text, 3, [])),
+                    [(token, value) for _, token, value
+                     in lexer.get_tokens_unprocessed(text)])
+
+    def test_not_resumable(self):
+        """Lexers unable to resume from a checkpoint must get just the first
+        one.
+        """
+        lexer = get_lexer_by_name('ruby')
+        text = preprocess(lexer, 'puts 42\n' * 20)
+        self.assertEqual(take_checkpoints(lexer, text, 5), [START])
+
+    def test_line_tokens(self):
+        """Tokens of a range of lines lexed from a checkpoint must be the same
+        as those of the whole content.
+        """
+        lexer = get_lexer_by_name('python')
+        text = preprocess(lexer, self.content)
+        checkpoints = take_checkpoints(lexer, text, 7)
+        lines = _lines(lexer.get_tokens(text))
+        numbered = []
+        number = 1
+        for token, piece in lines:
+            numbered.append((number, (token, piece)))
+            number += piece.endswith('\n')
+        for first, last in [(1, 1), (3, 9), (8, 8), (50, 120), (199, 250)]:
+            expected = [token for number, token in numbered
+                        if first <= number <= last]
+            self.assertEqual(_lines(line_tokens(
+                lexer, text, checkpoints, first, last)), expected)
+
+    def test_prerender(self):
+        """Prerendering a snippet must store the checkpoints taken while
+        lexing it.
+        """
+        snippet = create_snippet(self.content, language='python')
+        with constant('CHECKPOINT_INTERVAL', 7):
+            rendering = prerender(snippet)
+        lexer = get_lexer_by_name('python')
+        self.assertEqual(
+            loads(rendering.checkpoints),
+            take_checkpoints(lexer, preprocess(lexer, self.content), 7))
+
+
+class SandboxTestCase(APITestCase):
+    """Tests for lexing within limits."""
+
+    def setUp(self):
+        """Stop the worker processes after each test."""
+        self.addCleanup(sandbox.shutdown)
+
+    def test_limits(self):
+        """Snippets exceeding the maximum size or line count must get
+        highlighted as plain text, without their language guessed, measuring
+        them if not stored yet.
+        """
+        snippet = create_snippet('x = 1\ny = 2\n', language='python')
+        self.assertEqual(get_lexer(snippet).name, 'Python')
+        unmeasured = Snippet.objects.get(pk=snippet.pk)
+        unmeasured.size = unmeasured.line_count = 0
+        for setting, value in [('HIGHLIGHT_MAX_SIZE', 11),
+                               ('HIGHLIGHT_MAX_LINES', 1)]:
+            with constant(setting, value):
+                self.assertEqual(get_lexer(snippet).name, 'Text only')
+                self.assertEqual(get_lexer(unmeasured).name, 'Text only')
+                with mock.patch('paste.lexers.guess_lexer') as guess:
+                    self.assertEqual(
+                        sandbox.guess_language('foo bar\nbaz\n'), 'text')
+                guess.assert_not_called()
+
+    def test_sandboxed(self):
+        """Lexing and guessing in worker processes must give the same results
+        as in the current one.
+        """
+        snippet = create_snippet(
+            'def foo():\n    return 42\n' * 20, language='python')
+        lexer = get_lexer(snippet)
+        text = preprocess(lexer, snippet.content)
+        expected = take_checkpoints(lexer, text, 7)
+        with constant('CHECKPOINT_INTERVAL', 7):
+            html = render(snippet, False)
+            lines = _lines(line_tokens(lexer, text, expected, 5, 9))
+            with constant('SANDBOX'):
+                self.assertEqual(render(snippet, False), html)
+                self.assertEqual(
+                    sandbox.take_checkpoints(lexer, text, 7), expected)
+                self.assertEqual(_lines(sandbox.line_tokens(
+                    lexer, text, expected, 5, 9)), lines)
+                self.assertEqual(
+                    sandbox.guess_language('#!/bin/sh\necho 42\n'), 'bash')
+
+    def test_fallback(self):
+        """Lexing exceeding the limits of the sandbox must fall back to plain
+        text.
+        """
+        lexer = get_lexer_by_name('python')
+        text = preprocess(lexer, 'x = 1\ny = 2\nz = 3\n')
+        with constant('SANDBOX'), mock.patch(
+                'paste.sandbox.run', side_effect=sandbox.LimitExceeded), \
+                self.assertLogs('paste.sandbox', 'WARNING'):
+            self.assertEqual(list(sandbox.lex(lexer, text)), [(Text, text)])
+            self.assertEqual(
+                list(sandbox.line_tokens(lexer, text, [START], 2, 3)),
+                [(Text, 'y = 2\nz = 3\n')])
+            self.assertEqual(sandbox.take_checkpoints(lexer, text, 1), [START])
+
+    def test_timeout(self):
+        """Jobs running longer than the timeout must exceed the limits, and
+        have their worker replaced.
+        """
+        with constant('SANDBOX_TIMEOUT', 1), constant('SANDBOX_WORKERS', 1):
+            pid = sandbox.run(os.getpid)
+            with self.assertRaises(sandbox.LimitExceeded):
+                sandbox.run(time.sleep, 5)
+            self.assertNotEqual(sandbox.run(os.getpid), pid)
+
+    def test_queued(self):
+        """Time spent waiting for an idle worker must not count against the
+        timeout of a job.
+        """
+        results = []
+        with constant('SANDBOX_TIMEOUT', 1), constant('SANDBOX_WORKERS', 1):
+            sandbox.run(os.getpid)
+            threads = [threading.Thread(
+                target=lambda: results.append(sandbox.run(time.sleep, 1.5)))
+                for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results, [None, None])
+
+    def test_memory(self):
+        """Jobs allocating more memory than the limit must exceed the limits.
+        """
+        with constant('SANDBOX_MEMORY', 1024 ** 3):
+            with self.assertRaises(sandbox.LimitExceeded):
+                sandbox.run(bytearray, 2 * 1024 ** 3)
+
+    def test_recycle(self):
+        """Workers must be replaced after the given number of jobs."""
+        with constant('SANDBOX_WORKERS', 1), constant('SANDBOX_MAX_JOBS', 2):
+            pids = [sandbox.run(os.getpid) for _ in range(4)]
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+
+class PoolTestCase(APITestCase):
+    """Tests for the lexer and formatter pools."""
+
+    def setUp(self):
+        """Start with an empty pool."""
+        self.pool = pools.Pool(lambda key: object())
+
+    def test_reuse(self):
+        """A pool must return the same object for the same key."""
+        self.assertIs(self.pool.get('foo'), self.pool.get('foo'))
+        self.assertIs(
+            pools.get_formatter({'style': 'default', 'full': False}),
+            pools.get_formatter({'full': False, 'style': 'default'}))
+
+    def test_size(self):
+        """A pool must discard its least recently used object when it gets
+        larger than the POOL_SIZE setting indicates.
+        """
+        with constant('POOL_SIZE', 2):
+            first = self.pool.get('foo')
+            second = self.pool.get('bar')
+            self.pool.get('foo')
+            self.pool.get('baz')
+            self.assertEqual(len(self.pool), 2)
+            self.assertIs(self.pool.get('foo'), first)
+            self.assertIsNot(self.pool.get('bar'), second)
+
+    def test_warm(self):
+        """Warming must pool the lexers and formatters the relative settings
+        indicate.
+        """
+        pools.lexers.clear()
+        pools.formatters.clear()
+        with constant('WARM_LANGUAGES', ['python', 'c']), \
+                constant('WARM_STYLES', ['friendly']):
+            pools.warm()
+        self.assertEqual(len(pools.lexers), 2)
+        self.assertEqual(len(pools.formatters), 4)
+
 
 class SettingsTestCase(APITestCase):
     """Tests for the app settings."""
@@ -50,3 +537,137 @@ class SettingsTestCase(APITestCase):
         with self.settings(PASTE={'FORBID_ANONYMOUS': True}):
             value = _setting('FORBID_ANONYMOUS', False)
         self.assertTrue(value)
+
+
+class RefreshSnippetsTestCase(APITestCase):
+    """Tests for the refreshsnippets management command."""
+
+    def refresh(self, *args):
+        """Call the command with given arguments and return its output."""
+        out = StringIO()
+        call_command('refreshsnippets', *args, batch_size=2, stdout=out)
+        return out.getvalue()
+
+    def test_all(self):
+        """The command must run all the tasks if none is given, and refuse
+        unknown ones.
+        """
+        create_snippet('foo')
+        output = self.refresh()
+        self.assertEqual(output.splitlines(), [
+            'content: 0 snippets updated', 'language: 0 snippets updated',
+            'metadata: 0 snippets updated', 'render: 1 snippets updated',
+            'search: 1 snippets updated'])
+        with self.assertRaisesMessage(CommandError, 'unknown tasks: foo'):
+            self.refresh('render', 'foo')
+
+    def test_render(self):
+        """The command must store the renderings of snippets lacking a fresh
+        one.
+        """
+        snippets = [create_snippet(str(i)) for i in range(5)]
+        prerender(snippets[0])
+        snippets[1].save()
+        prerender(snippets[2])
+        snippets[2].save()
+        output = self.refresh('render')
+        self.assertEqual(output, 'render: 4 snippets updated\n')
+        self.assertEqual(Rendering.objects.count(), 5)
+        for snippet in snippets:
+            snippet.refresh_from_db()
+            self.assertIsNotNone(get_rendering(snippet))
+
+    def test_language(self):
+        """The command must store the guessed language of snippets lacking
+        one.
+        """
+        with constant('GUESS_LEXER', False):
+            create_snippet('<?php echo 42; ?>')
+            create_snippet('42', language='python')
+        output = self.refresh('language')
+        self.assertEqual(output, 'language: 1 snippets updated\n')
+        self.assertEqual(
+            list(Snippet.objects.order_by('pk').values_list(
+                'guessed_language', flat=True)),
+            [guess_language('<?php echo 42; ?>'), ''])
+
+    def test_metadata(self):
+        """The command must store the size, line count and preview of snippets
+        lacking them.
+        """
+        for i in range(3):
+            create_snippet(f'{i}\n{i}')
+        Snippet.objects.filter(pk__lt=3).update(size=0, line_count=0)
+        output = self.refresh('metadata')
+        self.assertEqual(output, 'metadata: 2 snippets updated\n')
+        self.assertEqual(
+            list(Snippet.objects.values_list('size', 'line_count')),
+            [(3, 2)] * 3)
+
+    def test_content(self):
+        """The command must store the content of snippets compressed if the
+        COMPRESS_CONTENT setting is True, else uncompressed.
+        """
+        content = 'print(42)\n' * 200
+        create_snippet(content)
+        create_snippet('42')
+        with constant('COMPRESS_CONTENT'):
+            output = self.refresh('content')
+            self.assertEqual(output, 'content: 1 snippets updated\n')
+        self.assertEqual(
+            Snippet.objects.values_list('content', flat=True)[0], content)
+        stored = Snippet.objects.filter(line_count=200).values_list(
+            'content', flat=True)[0]
+        self.assertTrue(stored.data.startswith(MARKER))
+        output = self.refresh('content')
+        self.assertEqual(output, 'content: 1 snippets updated\n')
+        self.assertEqual(
+            list(Snippet.objects.values_list('content', flat=True)),
+            [content, '42'])
+
+    def test_search(self):
+        """The command must index the title and content of snippets for
+        search anew.
+        """
+        for i in range(3):
+            create_snippet(f'foo {i}')
+        search.remove_from_index(Snippet.objects.values_list('pk', flat=True))
+        output = self.refresh('search')
+        self.assertEqual(output, 'search: 3 snippets updated\n')
+        self.assertEqual(
+            search.search(Snippet.objects.all(), 'foo').count(), 3)
+
+    def test_search_missing(self):
+        """The command must create the search index if missing, as for
+        databases migrated before it existed, which get a warning meanwhile.
+        """
+        create_snippet('foo')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {search.TABLE}')
+        search._indexed.clear()
+        with self.assertLogs('paste.search', 'WARNING'):
+            self.assertIsNone(search.backend())
+        output = self.refresh('search')
+        self.assertEqual(output, 'search: 1 snippets updated\n')
+        self.assertEqual(search.backend(), 'sqlite')
+        self.assertEqual(
+            search.search(Snippet.objects.all(), 'foo').count(), 1)
+
+    def test_content_deduplicated(self):
+        """The command must store the content of snippets in blobs if the
+        DEDUPLICATE_CONTENT setting is True, else in the snippets.
+        """
+        for content in ['foo', 'foo', 'bar']:
+            create_snippet(content)
+        with constant('DEDUPLICATE_CONTENT'):
+            output = self.refresh('content')
+        self.assertEqual(output, 'content: 3 snippets updated\n')
+        self.assertEqual(Blob.objects.count(), 2)
+        self.assertEqual(
+            list(Snippet.objects.values_list('content', flat=True)),
+            [''] * 3)
+        output = self.refresh('content')
+        self.assertEqual(output, 'content: 3 snippets updated\n')
+        self.assertEqual(
+            list(Snippet.objects.values_list('content', 'blob')),
+            [('foo', None), ('foo', None), ('bar', None)])
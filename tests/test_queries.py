@@ -0,0 +1,146 @@
+import json
+
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from paste.serializers import _can_return_bulk_pks
+
+from tests.utils import constant, create_snippet, create_user
+
+
+class QueryBudgetTestCase(APITestCase):
+    """Tests pinning the maximum number of database queries of each view,
+    for snippets owned by current user, so that checking permissions and
+    listing never fetch the owners.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create and store a dummy user, owning a few private snippets."""
+        cls.user = create_user('user')
+        cls.snippets = [
+            create_snippet('print(42)\n', title='foo', private=True,
+                           owner=cls.user)
+            for _ in range(3)]
+
+    def setUp(self):
+        """Authenticate as the dummy user."""
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, url, data=None):
+        """Send a request of the method to the URL, with the data as JSON,
+        and return the response.
+        """
+        return getattr(self.client, method)(
+            url, data=None if data is None else json.dumps(data),
+            content_type='application/json')
+
+    def assert_budget(self, queries, method, url, data=None,
+                      status_code=status.HTTP_200_OK):
+        """Assert that a request of the method to the URL, with the data,
+        succeeds within the number of queries.
+        """
+        with self.assertNumQueries(queries):
+            response = self.request(method, url, data)
+        self.assertEqual(response.status_code, status_code)
+
+    def test_list(self):
+        """Snippet list GET must make a single query."""
+        self.assert_budget(1, 'get', reverse('snippet-list'))
+
+    def test_user(self):
+        """User snippet list GET must make a single query, unless the user
+        owns no viewable snippets, when it looks the user up.
+        """
+        self.assert_budget(
+            1, 'get', reverse('snippet-user', kwargs={'pk': self.user.pk}))
+        self.client.force_authenticate(None)
+        self.assert_budget(
+            2, 'get', reverse('snippet-user', kwargs={'pk': self.user.pk}))
+        self.assert_budget(
+            2, 'get', reverse('snippet-user', kwargs={'pk': 999}),
+            status_code=status.HTTP_404_NOT_FOUND)
+
+    def test_list_content(self):
+        """Snippet list GET of selected fields must make a single query,
+        even for the content stored in blobs.
+        """
+        with constant('DEDUPLICATE_CONTENT'):
+            for index in range(2):
+                create_snippet(f'print({index})\n', owner=self.user)
+            self.assert_budget(
+                1, 'get', f'{reverse("snippet-list")}?fields=id,content')
+
+    def test_search(self):
+        """Snippet search GET must make a query for the page and one for the
+        count of the results.
+        """
+        self.assert_budget(2, 'get', f'{reverse("snippet-search")}?q=foo')
+
+    def test_detail(self):
+        """Snippet detail GET must make a single query, and a single one more
+        if conditional.
+        """
+        url = reverse('snippet-detail', kwargs={'pk': self.snippets[0].pk})
+        self.assert_budget(1, 'get', url)
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH='"foo"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_write(self):
+        """Snippet detail PATCH, PUT and DELETE must fetch the snippet once,
+        then write it and its search index entry.
+        """
+        url = reverse('snippet-detail', kwargs={'pk': self.snippets[0].pk})
+        self.assert_budget(3, 'patch', url, {'title': 'bar'})
+        self.assert_budget(3, 'put', url, {'content': 'bar'})
+        self.assert_budget(
+            4, 'delete', url, status_code=status.HTTP_204_NO_CONTENT)
+
+    def test_create(self):
+        """Snippet list POST must write the snippet and its search index
+        entry.
+        """
+        self.assert_budget(
+            2, 'post', reverse('snippet-list'), {'content': 'foo'},
+            status_code=status.HTTP_201_CREATED)
+
+    def test_highlight(self):
+        """Snippet highlight, raw content and tokens GET must make a single
+        query.
+        """
+        for name in ['highlight', 'raw', 'tokens']:
+            url = reverse(f'snippet-{name}',
+                          kwargs={'pk': self.snippets[0].pk})
+            self.assert_budget(1, 'get', url)
+
+    def test_highlight_prerendered(self):
+        """Snippet highlight GET must fetch the stored rendering along with
+        the snippet.
+        """
+        url = reverse('snippet-highlight', kwargs={'pk': self.snippets[0].pk})
+        with constant('PRERENDER'):
+            self.request('patch', reverse(
+                'snippet-detail', kwargs={'pk': self.snippets[0].pk}),
+                {'title': 'bar'})
+            self.assert_budget(1, 'get', url)
+
+    def test_bulk(self):
+        """Snippet batch requests must fetch the snippets in a single query,
+        whatever their number, and write each one once, creating them all at
+        once where the database returns their primary keys.
+        """
+        url = reverse('snippet-bulk-create')
+        ids = [snippet.pk for snippet in self.snippets]
+        self.assert_budget(
+            4 if _can_return_bulk_pks() else 6, 'post', url,
+            [{'content': 'foo'}, {'content': 'bar'}],
+            status_code=status.HTTP_207_MULTI_STATUS)
+        self.assert_budget(
+            9, 'patch', url, [{'id': pk, 'title': 'bar'} for pk in ids],
+            status_code=status.HTTP_207_MULTI_STATUS)
+        self.assert_budget(
+            6, 'delete', url, ids, status_code=status.HTTP_207_MULTI_STATUS)
@@ -0,0 +1,121 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from paste.models import Snippet
+
+from tests.mixins import SnippetDetailTestCaseMixin
+from tests.utils import constant, create_snippet, create_user
+
+
+class SnippetRawTestCase(SnippetDetailTestCaseMixin, APITestCase):
+    """Tests for the snippet raw content view."""
+
+    name = 'raw'
+    not_allowed = ['delete', 'patch', 'post', 'put', 'trace']
+
+    def request_range(self, value, **kwargs):
+        """Send a GET request for the given byte range of the dummy snippet,
+        with given extra headers, and return the response.
+        """
+        return self.client.get(self.url(), HTTP_RANGE=value, **kwargs)
+
+    def test_get(self):
+        """Snippet raw content GET must return the content as plain text,
+        along with its length in bytes.
+        """
+        snippet = create_snippet('café\n')
+        response = self.get(pk=snippet.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(response['Content-Length'], '6')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response.content.decode(), 'café\n')
+
+    def test_private(self):
+        """Snippet raw content GET must not return private snippets to those
+        not authorized to view them.
+        """
+        snippet = create_snippet('foo', private=True, owner=create_user('a'))
+        response = self.get(pk=snippet.pk)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_range(self):
+        """Snippet raw content GET must return only the byte range asked for
+        by the Range header.
+        """
+        for value, content, content_range in [
+                ('bytes=0-5', b'foobaz', 'bytes 0-5/10'),
+                ('bytes=7-', b'bar', 'bytes 7-9/10'),
+                ('bytes=-4', b' bar', 'bytes 6-9/10'),
+                ('bytes=3-100', b'baz bar', 'bytes 3-9/10')]:
+            response = self.request_range(value)
+            self.assertEqual(
+                response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(response.content, content)
+            self.assertEqual(response['Content-Range'], content_range)
+            self.assertEqual(response['Content-Length'], str(len(content)))
+
+    def test_range_multibyte(self):
+        """Snippet raw content GET must count the byte range asked for in
+        bytes of the UTF-8 encoded content.
+        """
+        snippet = create_snippet('λλλ')
+        response = self.client.get(
+            self.url(pk=snippet.pk), HTTP_RANGE='bytes=2-3')
+        self.assertEqual(response.content.decode(), 'λ')
+
+    def test_stale_size(self):
+        """Snippet raw content GET must measure the content it sends, rather
+        than trust the size stored along with it.
+        """
+        snippet = create_snippet('λλλ')
+        for size in [0, 3]:
+            Snippet.objects.filter(pk=snippet.pk).update(size=size)
+            response = self.client.get(self.url(pk=snippet.pk))
+            self.assertEqual(response.content.decode(), 'λλλ')
+            self.assertEqual(response['Content-Length'], '6')
+            response = self.client.get(
+                self.url(pk=snippet.pk), HTTP_RANGE='bytes=2-')
+            self.assertEqual(response.content.decode(), 'λλ')
+            self.assertEqual(response['Content-Range'], 'bytes 2-5/6')
+
+    def test_range_ignored(self):
+        """Snippet raw content GET must return the whole content if the Range
+        header is malformed, asks for several ranges, or an If-Range header
+        does not match the current version.
+        """
+        for value, kwargs in [
+                ('bytes=a-b', {}), ('bytes=0-1,3-4', {}),
+                ('bytes=0-1', {'HTTP_IF_RANGE': '"stale"'})]:
+            response = self.request_range(value, **kwargs)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, b'foobaz bar')
+
+    def test_range_not_satisfiable(self):
+        """Snippet raw content GET must return a 416 Range Not Satisfiable
+        response if the Range header asks for bytes beyond the content.
+        """
+        response = self.request_range('bytes=10-')
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_streaming(self):
+        """Snippet raw content GET must stream content larger than the
+        STREAMING_THRESHOLD setting.
+        """
+        with constant('STREAMING_THRESHOLD', 3):
+            response = self.get()
+            small = self.request_range('bytes=0-2')
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), b'foobaz bar')
+        self.assertFalse(small.streaming)
+
+    def test_not_modified(self):
+        """Snippet raw content GET must return a 304 Not Modified response if
+        the client's copy is fresh.
+        """
+        etag = self.get()['ETag']
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
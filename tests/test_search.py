@@ -0,0 +1,143 @@
+import json
+
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from paste import search
+
+from tests.mixins import SnippetListTestCaseMixin
+from tests.utils import constant, create_snippet, create_user
+
+
+class SnippetSearchTestCase(SnippetListTestCaseMixin, APITestCase):
+    """Tests for the snippet search view."""
+
+    not_allowed = ['delete', 'patch', 'post', 'put', 'trace']
+
+    def url(self, query='foo'):
+        """Return the snippet search URL, for the given query."""
+        return f'{reverse("snippet-search")}?q={query}'
+
+    def ids(self, query):
+        """Search for the query and return the IDs of the results."""
+        response = self.client.get(self.url(query))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result['id'] for result in response.data['results']]
+
+    def test_indexed(self):
+        """Snippet search GET must be served by the index."""
+        self.assertEqual(search.backend(), 'sqlite')
+
+    def test_get_success(self):
+        """Snippet search GET must return the snippets matching all the terms
+        of the query, title matches first, without their content.
+        """
+        in_content = create_snippet('print(foo, bar)')
+        in_title = create_snippet('print(bar)', title='foo')
+        create_snippet('print(foo)')
+        create_snippet('print(baz)', title='bar')
+        self.assertEqual(
+            self.ids('foo%20bar'), [in_title.pk, in_content.pk])
+        response = self.get()
+        self.assertNotIn('content', response.data['results'][0])
+
+    def test_get_syntax(self):
+        """Snippet search GET must take the query as plain terms, ignoring
+        any characters other than word ones.
+        """
+        snippet = create_snippet('foo "bar" AND NOT (baz*)')
+        self.assertEqual(self.ids('"bar"%20AND%20NOT%20(baz*'), [snippet.pk])
+        self.assertEqual(self.ids('"NEAR('), [])
+
+    def test_get_empty(self):
+        """Snippet search GET must return a 400 Bad Request response, if no
+        query is given.
+        """
+        for url in [reverse('snippet-search'), self.url('%20')]:
+            response = self.client.get(url)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('q', response.data)
+
+    def test_get_private(self):
+        """Snippet search GET must return private snippets only to those
+        authorized to view them.
+        """
+        owner = create_user('owner')
+        create_snippet('foo', private=True, owner=owner)
+        expected = [0, 0, 1, 1]
+
+        def check(i):
+            self.assertEqual(len(self.ids('foo')), expected[i])
+
+        self.check_for_users(check, owner)
+
+    def test_get_fields(self):
+        """Snippet search GET must return only the fields given by the
+        `fields` query parameter, if any.
+        """
+        snippet = create_snippet('foo', title='bar')
+        response = self.get('&fields=id,content')
+        self.assertEqual(
+            response.data['results'], [{'id': snippet.pk, 'content': 'foo'}])
+
+    def test_update(self):
+        """Snippet search GET must find snippets by their title and content
+        as last saved, and not find deleted ones.
+        """
+        snippet = create_snippet('foo')
+        snippet.content = 'bar'
+        snippet.save()
+        self.assertEqual(self.ids('foo'), [])
+        self.assertEqual(self.ids('bar'), [snippet.pk])
+        snippet.title = 'baz'
+        snippet.save(update_fields=['title'])
+        self.assertEqual(self.ids('baz'), [snippet.pk])
+        snippet.delete()
+        self.assertEqual(self.ids('bar'), [])
+
+    def test_bulk(self):
+        """Snippet search GET must find bulk created snippets."""
+        response = self.client.post(
+            reverse('snippet-bulk-create'),
+            data=json.dumps([{'content': 'foo'}, {'content': 'foo bar'}]),
+            content_type='application/json')
+        ids = [result['data']['id'] for result in response.data]
+        self.assertCountEqual(self.ids('foo'), ids)
+
+    def test_content_length(self):
+        """Snippet search GET must find snippets only by the part of their
+        content within the SEARCH_CONTENT_LENGTH setting.
+        """
+        with constant('SEARCH_CONTENT_LENGTH', 8):
+            create_snippet('foo bar baz')
+        self.assertEqual(len(self.ids('bar')), 1)
+        self.assertEqual(self.ids('baz'), [])
+
+    def test_unindexed(self):
+        """Snippet search GET must return the snippets whose title or content
+        contains all the terms, newest first, if the SEARCH_INDEX setting is
+        False.
+        """
+        first = create_snippet('foo bar')
+        second = create_snippet('foobar', title='bar')
+        create_snippet('foo')
+        with constant('SEARCH_INDEX', False):
+            self.assertEqual(self.ids('foo%20bar'), [second.pk, first.pk])
+
+    def test_pagination(self):
+        """Snippet search GET must return the results a page at a time."""
+        for i in range(20):
+            create_snippet(f'foo {i}')
+        with constant('PAGE_SIZE', 10):
+            response = self.get()
+            self.assertEqual(len(response.data['results']), 10)
+            self.assertIsNone(response.data['previous'])
+            next_page = self.client.get(response.data['next'])
+            self.assertEqual(len(next_page.data['results']), 10)
+            self.assertIsNone(next_page.data['next'])
+        with constant('PAGE_SIZE', 0):
+            response = self.get()
+            self.assertEqual(len(response.data), 20)
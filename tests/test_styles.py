@@ -0,0 +1,90 @@
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from paste import constants
+
+from tests.utils import constant, create_snippet
+
+
+class StyleTestCase(APITestCase):
+    """Tests for the style stylesheet view."""
+
+    def url(self, name='friendly'):
+        """Return the stylesheet URL, for the given style name."""
+        return reverse('style-detail', kwargs={'pk': name, 'format': 'css'})
+
+    def test_get_success(self):
+        """Style stylesheet GET must return the style's CSS definitions, to be
+        cached by clients.
+        """
+        response = self.client.get(self.url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/css'))
+        self.assertIn(b'.hll', response.content)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn(
+            f'max-age={constants.STYLESHEET_MAX_AGE}',
+            response['Cache-Control'])
+
+    def test_not_modified(self):
+        """Style stylesheet GET must return a 304 Not Modified response if
+        the client's cached copy is fresh.
+        """
+        etag = self.client.get(self.url())['ETag']
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH='"foo"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_found(self):
+        """Style stylesheet GET must return a 404 Not Found response for a
+        non-existent style.
+        """
+        response = self.client.get(self.url('123-invalid-abc'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_forbid_anonymous(self):
+        """Style stylesheet GET must return a 403 Forbidden response to
+        anonymous users if the FORBID_ANONYMOUS setting is True.
+        """
+        with constant('FORBID_ANONYMOUS'):
+            response = self.client.get(self.url())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_highlight_link(self):
+        """Snippet highlight GET must link to the stylesheet instead of
+        including the CSS definitions, if the LINK_STYLESHEET setting is True.
+        """
+        snippet = create_snippet('foo', style='friendly')
+        url = reverse('snippet-highlight', kwargs={'pk': snippet.pk})
+        with constant('LINK_STYLESHEET'):
+            html = self.client.get(url).data
+        self.assertIn(f'href="{self.url()}"', html)
+        self.assertNotIn('<style', html)
+        html = self.client.get(url).data
+        self.assertNotIn(self.url(), html)
+        self.assertIn('<style', html)
+
+    @override_settings(ROOT_URLCONF='tests.namespaced_urls')
+    def test_highlight_link_namespaced(self):
+        """Snippet highlight GET must link to the stylesheet within the URL
+        namespace the app is included in, streamed or not.
+        """
+        snippet = create_snippet('foo', style='friendly')
+        url = reverse('paste:snippet-highlight', kwargs={'pk': snippet.pk})
+        stylesheet = reverse(
+            'paste:style-detail', kwargs={'pk': 'friendly', 'format': 'css'})
+        with constant('LINK_STYLESHEET'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(f'href="{stylesheet}"', response.data)
+            with constant('STREAMING_THRESHOLD', 1):
+                response = self.client.get(url)
+                html = b''.join(response.streaming_content).decode()
+            self.assertIn(f'href="{stylesheet}"', html)
+        self.assertEqual(self.client.get(stylesheet).status_code,
+                         status.HTTP_200_OK)
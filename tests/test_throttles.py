@@ -0,0 +1,152 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from paste.throttles import CostRateThrottle, CreateThrottle, consume
+
+from tests.utils import constant, create_snippet, create_user
+
+
+class ThrottleTestCase(APITestCase):
+    """Tests for throttling snippet creation and highlighting by cost."""
+
+    def setUp(self):
+        """Create a small and a large snippet, and empty the cache the
+        buckets are stored in.
+        """
+        self.small = create_snippet('foo', language='python')
+        self.large = create_snippet('x' * 300, language='python')
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def highlight(self, snippet):
+        """Return the response to highlighting the snippet."""
+        return self.client.get(
+            reverse('snippet-highlight', kwargs={'pk': snippet.pk}))
+
+    def create(self, content):
+        """Return the response to creating a snippet of the content."""
+        return self.client.post(
+            reverse('snippet-list'), {'content': content}, format='json')
+
+    def test_disabled(self):
+        """Requests must not be throttled if no rates are set."""
+        for _ in range(5):
+            self.assertEqual(self.highlight(self.large).status_code,
+                             status.HTTP_200_OK)
+            self.assertEqual(self.create('x' * 300).status_code,
+                             status.HTTP_201_CREATED)
+
+    def test_highlight(self):
+        """Snippet highlight GET must be charged by the size of the snippet's
+        content, throttling the client once its bucket runs out.
+        """
+        rates = {'anon_highlight': '4/hour'}
+        with constant('THROTTLE_RATES', rates), constant('THROTTLE_UNIT', 100):
+            self.assertEqual(self.highlight(self.large).status_code,
+                             status.HTTP_200_OK)
+            self.assertEqual(self.highlight(self.small).status_code,
+                             status.HTTP_200_OK)
+            response = self.highlight(self.large)
+            self.assertEqual(response.status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertGreater(int(response['Retry-After']), 0)
+            self.assertEqual(
+                self.client.get(reverse(
+                    'snippet-raw', kwargs={'pk': self.large.pk})).status_code,
+                status.HTTP_200_OK)
+
+            self.client.force_authenticate(create_user('user'))
+            self.assertEqual(self.highlight(self.large).status_code,
+                             status.HTTP_200_OK)
+
+    def test_highlight_missing(self):
+        """Snippet highlight GET of a missing snippet must be charged a
+        single token and not be found.
+        """
+        rates = {'anon_highlight': '1/hour'}
+        with constant('THROTTLE_RATES', rates):
+            response = self.client.get(
+                reverse('snippet-highlight', kwargs={'pk': 999}))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.highlight(self.small).status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_create(self):
+        """Snippet list and batch POST must be charged by the size of the
+        request body, separately for anonymous and authenticated users.
+        """
+        rates = {'anon_create': '3/hour', 'user_create': '10/hour'}
+        with constant('THROTTLE_RATES', rates), constant('THROTTLE_UNIT', 200):
+            self.assertEqual(self.create('x' * 300).status_code,
+                             status.HTTP_201_CREATED)
+            response = self.client.post(
+                reverse('snippet-bulk-create'), [{'content': 'x' * 300}],
+                format='json')
+            self.assertEqual(response.status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(self.create('foo').status_code,
+                             status.HTTP_201_CREATED)
+            self.assertEqual(self.create('foo').status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+
+            self.client.force_authenticate(create_user('user'))
+            self.assertEqual(self.create('x' * 300).status_code,
+                             status.HTTP_201_CREATED)
+
+    def test_create_chunked(self):
+        """Snippet creation without a declared body size must be charged by
+        the size of the body read.
+        """
+        request = APIRequestFactory().post(
+            reverse('snippet-list'), {'content': 'x' * 300}, format='json')
+        size = int(request.META.pop('CONTENT_LENGTH'))
+        self.assertGreater(size, 300)
+        self.assertEqual(
+            CreateThrottle().get_size(Request(request), None), size)
+
+    def test_abstract(self):
+        """Throttles must tell the size of the content requests involve."""
+        with self.assertRaises(TypeError):
+            CostRateThrottle()
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    """Tests for the token bucket stored in the cache."""
+
+    def setUp(self):
+        """Empty the cache the buckets are stored in."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_consume(self):
+        """Tokens must be taken while enough are left, and refilled at the
+        given rate, up to the capacity of the bucket.
+        """
+        self.assertEqual(consume(cache, 'bucket', 6, 10, 10, 100.0), 0)
+        self.assertEqual(consume(cache, 'bucket', 4, 10, 10, 100.0), 0)
+        self.assertEqual(consume(cache, 'bucket', 2, 10, 10, 100.0), 2)
+        self.assertEqual(consume(cache, 'bucket', 2, 10, 10, 101.0), 1)
+        self.assertEqual(consume(cache, 'bucket', 2, 10, 10, 102.0), 0)
+
+        self.assertEqual(consume(cache, 'bucket', 10, 10, 10, 1000.0), 0)
+        self.assertEqual(consume(cache, 'bucket', 1, 10, 10, 1000.0), 1)
+
+    def test_concurrent(self):
+        """Tokens taken by requests that saw the bucket full at once must be
+        charged once from now on, however their increments interleave.
+        """
+        self.assertEqual(consume(cache, 'bucket', 2, 10, 10, 100.0), 0)
+        self.assertEqual(consume(cache, 'bucket', 2, 10, 10, 200.0), 0)
+        with mock.patch.object(cache, 'get', return_value=102000):
+            self.assertEqual(consume(cache, 'bucket', 3, 10, 10, 200.0), 0)
+        self.assertEqual(cache.get('bucket'), 205000)
+        with mock.patch.object(cache, 'get', return_value=102000):
+            self.assertEqual(consume(cache, 'bucket', 6, 10, 10, 200.0), 1)
+        self.assertEqual(cache.get('bucket'), 205000)
@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.core.cache import cache
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from pygments.lexers import get_lexer_by_name
+from pygments.token import Token
+
+from paste.checkpoints import preprocess
+from paste.tokens import decode, encode
+
+from tests.mixins import SnippetDetailTestCaseMixin
+from tests.utils import constant, create_snippet, create_user
+
+
+class SnippetTokensTestCase(SnippetDetailTestCaseMixin, APITestCase):
+    """Tests for the snippet tokens view."""
+
+    name = 'tokens'
+    not_allowed = ['delete', 'patch', 'post', 'put', 'trace']
+
+    def setUp(self):
+        """Create a dummy snippet and clear the cache."""
+        super().setUp()
+        cache.clear()
+
+    def test_get(self):
+        """Snippet tokens GET must return the tokens of the queried snippet's
+        content, as pairs of the name of their type and their text.
+        """
+        snippet = create_snippet('x = 42\n', language='python')
+        response = self.get(pk=snippet.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(['Name', 'x'], response.data)
+        self.assertIn(['Literal.Number.Integer', '42'], response.data)
+        self.assertEqual(
+            ''.join(value for _, value in response.data), 'x = 42\n')
+
+    def test_private(self):
+        """Snippet tokens GET must not return private snippets to those not
+        authorized to view them.
+        """
+        snippet = create_snippet('foo', private=True, owner=create_user('a'))
+        response = self.get(pk=snippet.pk)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cached(self):
+        """Snippet tokens GET must lex snippets with the same content and
+        language once, and decode their tokens from the cache afterwards.
+        """
+        snippets = [create_snippet('x = 42\n', language='python')
+                    for _ in range(2)]
+        with constant('HIGHLIGHT_CACHE', 'default'), \
+                mock.patch('paste.cache.decode', wraps=decode) as decoded:
+            first = self.get(pk=snippets[0].pk)
+            second = self.get(pk=snippets[1].pk)
+        decoded.assert_called_once()
+        self.assertEqual(first.data, second.data)
+
+    def test_not_modified(self):
+        """Snippet tokens GET must return a 304 Not Modified response if the
+        client's copy is fresh.
+        """
+        response = self.get()
+        response = self.client.get(
+            self.url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class TokenStreamTestCase(APITestCase):
+    """Tests for the compact form of token streams."""
+
+    def test_round_trip(self):
+        """Encoded tokens must decode to the same text, with runs of tokens
+        of the same type merged.
+        """
+        lexer = get_lexer_by_name('python')
+        text = preprocess(lexer, 'def foo():\n    return "bar"\n' * 10)
+        tokens = list(lexer.get_tokens(text))
+        decoded = list(decode(encode(tokens, text), text))
+        self.assertEqual(''.join(value for _, value in decoded), text)
+        self.assertLessEqual(len(decoded), len(tokens))
+        self.assertEqual(decoded[:2], tokens[:2])
+        self.assertEqual(decoded[0], (Token.Keyword, 'def'))
+
+    def test_mismatch(self):
+        """Tokens not covering the text as is must not get encoded."""
+        tokens = [(Token.Text, 'foo')]
+        self.assertIsNone(encode(tokens, 'bar'))
+        self.assertIsNone(encode(tokens, 'foobar'))
@@ -29,9 +29,20 @@ class SnippetUserTestCase(SnippetListTestCaseMixin, APITestCase):
         create_snippet('test', owner=self.staff_user)
         response = self.get()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(response.data[0]['id'], self.snippet.pk)
-        self.assertEqual(response.data[1]['id'], snippet.pk)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['id'], snippet.pk)
+        self.assertEqual(response.data['results'][1]['id'], self.snippet.pk)
+
+    def test_get_filter(self):
+        """User snippet list GET must return only the queried user's snippets
+        matching the filter query parameters.
+        """
+        snippet = create_snippet('bar', owner=self.user, language='python')
+        create_snippet('baz', language='python')
+        response = self.get('?language=python')
+        self.assertEqual(
+            [result['id'] for result in response.data['results']],
+            [snippet.pk])
 
     def test_get_private(self):
         """User snippet list GET must return private snippets only to those
@@ -43,7 +54,7 @@ class SnippetUserTestCase(SnippetListTestCaseMixin, APITestCase):
 
         def check(i):
             response = self.get()
-            self.assertEqual(len(response.data), expected[i])
+            self.assertEqual(len(response.data['results']), expected[i])
 
         self.check_for_users(check, some_user)
 
@@ -57,7 +68,7 @@ class SnippetUserTestCase(SnippetListTestCaseMixin, APITestCase):
 
         def check(i):
             response = self.get()
-            self.assertEqual(len(response.data), expected[i])
+            self.assertEqual(len(response.data['results']), expected[i])
 
         with constant('LIST_FOREIGN', False):
             self.check_for_users(check, user)